@@ -0,0 +1,135 @@
+"""
+Configuración de gunicorn para el servicio de productos.
+
+gunicorn la carga sola al arrancar desde este directorio (o con
+`gunicorn -c gunicorn.conf.py`); los argumentos de línea de comandos tienen
+prioridad. Todo se ajusta con variables de entorno:
+
+- SERVER_MODE: `wsgi` (workers síncronos, o gthread con GUNICORN_THREADS > 1)
+  o `asgi` (workers uvicorn con lecturas async). Los streams SSE sólo se
+  sirven con gthread o asgi: un worker síncrono quedaría tomado por el stream.
+- GUNICORN_WORKERS: cantidad de workers; `auto` (por defecto) la calcula con
+  las CPU disponibles para el proceso (afinidad y cuota de cgroup):
+  2 x CPU + 1 síncronos, CPU + 1 gthread, CPU uvicorn; como máximo
+  GUNICORN_MAX_WORKERS. Se exporta como SERVER_WORKERS para los settings.
+- GUNICORN_PRELOAD: importa la aplicación y la prepara (products/warmup.py)
+  en el maestro antes del fork; los workers comparten esa memoria
+  (copy-on-write) y arrancan en milisegundos.
+- GUNICORN_WARMUP: cada worker abre sus conexiones y atiende algunas
+  peticiones internas antes de aceptar tráfico, para que la primera petición
+  real tarde lo mismo que las siguientes.
+- GUNICORN_MAX_REQUESTS / GUNICORN_MAX_REQUESTS_JITTER: el worker se recicla
+  ordenadamente tras atender esa cantidad de peticiones (con desfase
+  aleatorio para que no se reinicien todos a la vez); 0 lo desactiva.
+"""
+import gc
+import os
+
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi')
+WARMUP = os.environ.get('GUNICORN_WARMUP', 'True') == 'True'
+
+
+def available_cpus():
+    """CPU que puede usar este proceso: afinidad y, en contenedores, la cuota de cgroup v2."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def default_workers(mode, threads, cpus, limit):
+    if mode == 'asgi':
+        # Un bucle de eventos por núcleo: la concurrencia la da el bucle
+        workers = cpus
+    elif threads > 1:
+        workers = cpus + 1
+    else:
+        # Workers síncronos: mientras uno espera a la DB otro usa la CPU
+        workers = 2 * cpus + 1
+    return max(1, min(workers, limit))
+
+
+threads = int(os.environ.get('GUNICORN_THREADS', '1'))
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'products_service.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'products_service.wsgi:application'
+    worker_class = 'gthread' if threads > 1 else 'sync'
+
+if os.environ.get('GUNICORN_WORKERS', 'auto') == 'auto':
+    workers = default_workers(
+        SERVER_MODE, threads, available_cpus(), int(os.environ.get('GUNICORN_MAX_WORKERS', '16')),
+    )
+else:
+    workers = int(os.environ['GUNICORN_WORKERS'])
+# Para la aplicación (settings): con varios workers las cachés en memoria del
+# proceso no sirven para compartir estado. Por eso los workers se fijan con
+# GUNICORN_WORKERS y no con -w
+os.environ['SERVER_WORKERS'] = str(workers)
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True') == 'True'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '10000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', str(max_requests // 10)))
+
+if preload_app:
+    # Sin recolector mientras se importa la aplicación en el maestro: al
+    # recorrer los objetos escribiría en sus cabeceras y cada worker terminaría
+    # copiando esas páginas. Se congela en when_ready y se reactiva en post_fork
+    gc.disable()
+
+
+def when_ready(server):
+    if preload_app:
+        from products import warmup
+
+        if WARMUP:
+            warmup.prepare()
+        # Nada de conexiones ni hilos heredados por los workers
+        warmup.close()
+        gc.freeze()
+    server.log.info(
+        "Servidor listo: %s workers %s (preload=%s, warm-up=%s, max_requests=%s)",
+        server.num_workers, server.cfg.worker_class_str, preload_app, WARMUP, max_requests,
+    )
+
+
+def post_fork(server, worker):
+    gc.enable()
+
+
+def post_worker_init(worker):
+    if not WARMUP:
+        return
+    from products import warmup
+
+    try:
+        if not preload_app:
+            warmup.prepare()
+        warmup.connect()
+        warmup.exercise(worker.wsgi)
+    except Exception:
+        # Un worker que no pudo calentarse (p. ej. la DB no responde) atiende
+        # igual: gunicorn detiene el servidor entero si un worker no arranca
+        worker.log.warning("Calentamiento del worker fallido", exc_info=True)
+
+
+def worker_exit(server, worker):
+    import sys
+
+    # Entradas de auditoría pendientes antes de que el worker termine
+    audit = sys.modules.get('products.audit')
+    if audit is not None:
+        audit.trail.close()
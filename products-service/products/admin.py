@@ -1,5 +1,11 @@
 from django.contrib import admin
-from products.models import Product
+from django.db import transaction
+from products import cache as product_cache
+from products import events
+from products import inventory
+from products.changes import record_deletions
+from products.models import AuditEntry, InventorySummary, Product
+from products.serializers import ProductSerializer
 
 
 @admin.register(Product)
@@ -8,3 +14,66 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = ['created_at']
     search_fields = ['name', 'sku']
 
+    # Los cambios del admin también mantienen el resumen de inventario, dejan
+    # las marcas de borrado de /api/products/changes/ y, al confirmarse,
+    # invalidan la caché de respuestas y publican sus eventos SSE
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            before = inventory.current_values(Product.objects.filter(pk=obj.pk)) if change else []
+            super().save_model(request, obj, form, change)
+            inventory.record(before=before, after=[(obj.quantity, obj.price)])
+        product_cache.invalidate()
+        events.publish_on_commit('product.updated' if change else 'product.created', ProductSerializer(obj).data)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            product_id, sku = obj.pk, obj.sku
+            before = inventory.current_values(Product.objects.filter(pk=product_id))
+            super().delete_model(request, obj)
+            record_deletions([(product_id, sku)])
+            inventory.record(before=before)
+        product_cache.invalidate()
+        events.publish_on_commit('product.deleted', {'id': product_id, 'sku': sku})
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            rows = list(queryset.values_list('id', 'sku'))
+            before = inventory.current_values(queryset)
+            super().delete_queryset(request, queryset)
+            record_deletions(rows)
+            inventory.record(before=before)
+        product_cache.invalidate()
+        events.publish_products_on_commit('product.deleted', [{'id': pk, 'sku': sku} for pk, sku in rows])
+
+
+@admin.register(AuditEntry)
+class AuditEntryAdmin(admin.ModelAdmin):
+    """Sólo lectura: el registro de auditoría no se edita ni se borra."""
+    list_display = ['created_at', 'action', 'outcome', 'username', 'product_id', 'sku', 'request_id']
+    list_filter = ['action', 'outcome']
+    search_fields = ['username', 'sku', 'request_id']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(InventorySummary)
+class InventorySummaryAdmin(admin.ModelAdmin):
+    """Sólo lectura: se corrige con `manage.py rebuild_inventory`."""
+    list_display = ['slot', 'products', 'units', 'stock_value', 'low_stock', 'out_of_stock', 'updated_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
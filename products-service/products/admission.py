@@ -0,0 +1,487 @@
+"""
+Control de admisión: límites de peticiones por usuario/rol y de peticiones
+simultáneas (`AdmissionMiddleware`, activo con `ADMISSION_CONTROL=True`).
+
+- Límites por ruta y método (`ADMISSION_RULES_FILE`, por defecto
+  products/ratelimits.json): la ruta con el prefijo más largo que admite el
+  método gana y cada uno de sus `limits` es un token bucket (`rate` fichas
+  por segundo, hasta `burst` acumuladas) por usuario, rol o IP según `key`,
+  con la identidad que dejó `JWTAuthenticationMiddleware`. `roles` cambia el
+  límite de un rol (`null`: sin límite); con varios roles vale el más amplio.
+  Sin ficha la respuesta es 429 con `Retry-After`.
+- Peticiones simultáneas por proceso en las rutas que van a la DB
+  (`ADMISSION_PATHS`): pasado `ADMISSION_MAX_CONCURRENT` la respuesta es 503
+  con `Retry-After` en el acto, sin esperar turno. Los streams SSE
+  (`ADMISSION_EXEMPT_PATHS`) tienen su propio límite.
+
+Backends de los contadores (`ADMISSION_BACKEND`):
+- `local`: buckets en memoria de cada worker (sin E/S; el límite efectivo es
+  el configurado por el número de workers).
+- `cache`: contadores compartidos en la caché `products` (Redis/Memcached).
+  La API de caché de Django no tiene compare-and-set, así que cada bucket se
+  aproxima con una ventana fija de `burst / rate` segundos que admite
+  `burst` peticiones: misma tasa media, ráfagas de hasta 2 x `burst` en el
+  cambio de ventana. Si la caché falla se deja pasar la petición. En ASGI
+  el incr va a un hilo: el bucle de eventos no espera a Redis.
+
+El límite de simultaneidad es siempre por proceso: un contador compartido
+quedaría ocupado para siempre si un worker muere a mitad de una petición.
+"""
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+KEYS = ('user', 'role', 'ip')
+# Segundos entre avisos de un backend compartido caído
+FAILURE_LOG_INTERVAL = 10
+
+
+class AdmissionRulesError(ValueError):
+    pass
+
+
+class Limit:
+    __slots__ = ('rate', 'burst')
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise AdmissionRulesError(f'rate debe ser positivo: {rate!r}')
+        self.rate = float(rate)
+        self.burst = max(1, int(burst if burst is not None else math.ceil(rate)))
+
+
+class Bucket:
+    """Un elemento de `limits`: límite por defecto y por rol."""
+    __slots__ = ('name', 'key', 'limit', 'roles')
+
+    def __init__(self, name, key, limit, roles):
+        self.name = name
+        self.key = key
+        self.limit = limit
+        # rol -> Limit (None: sin límite)
+        self.roles = roles
+
+    def limit_for(self, roles):
+        """(rol, límite) que aplica a los roles del token; límite None si alguno no tiene límite."""
+        chosen = None
+        for role in roles:
+            if role not in self.roles:
+                continue
+            limit = self.roles[role]
+            if limit is None:
+                return role, None
+            if chosen is None or limit.rate > chosen[1].rate:
+                chosen = role, limit
+        return chosen or (roles[0] if roles else 'anonymous', self.limit)
+
+
+class AdmissionRules:
+
+    def __init__(self, routes):
+        # [(prefijo, métodos o None, [Bucket])], del prefijo más largo al más corto
+        self.routes = routes
+
+    @classmethod
+    def compile(cls, data):
+        routes = []
+        for index, route in enumerate(data['routes']):
+            methods = route.get('methods')
+            buckets = []
+            for position, item in enumerate(route['limits']):
+                if item.get('key', 'user') not in KEYS:
+                    raise AdmissionRulesError(f"key desconocida en {route['path']}: {item['key']!r}")
+                roles = {
+                    role: None if value is None else Limit(value['rate'], value.get('burst'))
+                    for role, value in item.get('roles', {}).items()
+                }
+                buckets.append(Bucket(
+                    f'{index}.{position}', item.get('key', 'user'), Limit(item['rate'], item.get('burst')), roles,
+                ))
+            routes.append((route['path'], frozenset(method.upper() for method in methods) if methods else None,
+                           tuple(buckets)))
+        routes.sort(key=lambda item: len(item[0]), reverse=True)
+        return cls(tuple(routes))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as rules_file:
+            return cls.compile(json.load(rules_file))
+
+    def resolve(self, method, path):
+        """Buckets de la petición; () fuera de las rutas con límite."""
+        for prefix, methods, buckets in self.routes:
+            if path.startswith(prefix) and (methods is None or method in methods):
+                return buckets
+        return ()
+
+
+class LocalBuckets:
+    """Token buckets en memoria del proceso, como mucho `ADMISSION_MAX_KEYS` (los menos usados salen)."""
+
+    def __init__(self):
+        self.max_keys = getattr(settings, 'ADMISSION_MAX_KEYS', 10000)
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, limit):
+        """Consume una ficha: 0 si la petición pasa o los segundos hasta la siguiente."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    # Un bucket descartado vuelve lleno: como mucho regala una ráfaga
+                    self._buckets.popitem(last=False)
+                bucket = self._buckets[key] = [float(limit.burst), now]
+            else:
+                self._buckets.move_to_end(key)
+                tokens = bucket[0] + (now - bucket[1]) * limit.rate
+                bucket[0] = tokens if tokens < limit.burst else limit.burst
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / limit.rate
+
+    async def atake(self, key, limit):
+        # Sin E/S: CPU y un lock, en el propio bucle
+        return self.take(key, limit)
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBuckets:
+    """Ventana fija por bucket en la caché compartida `products`."""
+
+    def get_cache(self):
+        return caches[getattr(settings, 'PRODUCTS_CACHE_ALIAS', 'products')]
+
+    def take(self, key, limit):
+        window = limit.burst / limit.rate
+        now = time.time()
+        slot = int(now // window)
+        # Nombres de usuario arbitrarios no son claves válidas en Memcached
+        cache_key = f'products:ratelimit:{hashlib.md5(key.encode()).hexdigest()}:{slot}'
+        cache = self.get_cache()
+        try:
+            count = cache.incr(cache_key)
+        except ValueError:
+            cache.add(cache_key, 0, timeout=math.ceil(window) + 1)
+            count = cache.incr(cache_key)
+        if count <= limit.burst:
+            return 0.0
+        return (slot + 1) * window - now
+
+    async def atake(self, key, limit):
+        # En un hilo y no con cache.aincr: en Django 4.2 aincr es get + set
+        # (no atómico) incluso en Redis, y el contador se compartiría mal
+        return await sync_to_async(self.take, thread_sensitive=False)(key, limit)
+
+    def reset(self):
+        pass
+
+
+class AdmissionStats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.throttled = 0
+        self.shed = 0
+        self.backend_errors = 0
+
+    def incr(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'throttled': self.throttled,
+                'shed': self.shed,
+                'backend_errors': self.backend_errors,
+                'in_flight': in_flight.value,
+            }
+
+
+class InFlight:
+    """Peticiones en curso en las rutas con límite de simultaneidad (por proceso)."""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, limit):
+        with self._lock:
+            if self.value >= limit:
+                return False
+            self.value += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.value -= 1
+
+
+stats = AdmissionStats()
+in_flight = InFlight()
+
+_rules = None
+_buckets = None
+_lock = threading.Lock()
+
+
+def get_rules():
+    global _rules
+    if _rules is None:
+        with _lock:
+            if _rules is None:
+                _rules = AdmissionRules.load(settings.ADMISSION_RULES_FILE)
+    return _rules
+
+
+def get_buckets():
+    global _buckets
+    if _buckets is None:
+        with _lock:
+            if _buckets is None:
+                backends = getattr(settings, 'ADMISSION_BACKENDS', {'local': 'products.admission.LocalBuckets'})
+                _buckets = import_string(backends[getattr(settings, 'ADMISSION_BACKEND', 'local')])()
+    return _buckets
+
+
+def reset():
+    global _rules, _buckets
+    _rules = _buckets = None
+    stats.reset()
+
+
+def identity(request, key, role):
+    if key == 'role':
+        return f'role:{role}'
+    user_info = getattr(request, 'user_info', None)
+    username = user_info.get('username') if user_info else None
+    if key == 'user' and username:
+        return f'user:{username}'
+    # Peticiones sin usuario: por IP (detrás de Kong, la del gateway)
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def request_limits(request):
+    """(clave del contador, límite) de cada bucket con límite que aplica a la petición."""
+    buckets = get_rules().resolve(request.method, request.path_info)
+    if not buckets:
+        return
+    roles = tuple(getattr(request, 'user_roles', ()) or ())
+    for bucket in buckets:
+        role, limit = bucket.limit_for(roles)
+        if limit is not None:
+            yield f'{bucket.name}:{identity(request, bucket.key, role)}', limit
+
+
+def check_rate(request):
+    """
+    Segundos a esperar si algún bucket de la petición está vacío; 0 si pasa.
+    Se detiene en el primero vacío: quien agotó su límite por usuario no
+    sigue gastando el de su rol.
+    """
+    counters = get_buckets()
+    for key, limit in request_limits(request):
+        try:
+            wait = counters.take(key, limit)
+        except Exception as exc:
+            # Sin contadores compartidos se atiende igual: el límite protege, no autoriza
+            backend_failed(exc)
+            continue
+        if wait:
+            return wait
+    return 0.0
+
+
+async def acheck_rate(request):
+    """Como `check_rate`, sin E/S en el hilo del bucle de eventos."""
+    counters = get_buckets()
+    for key, limit in request_limits(request):
+        try:
+            wait = await counters.atake(key, limit)
+        except Exception as exc:
+            backend_failed(exc)
+            continue
+        if wait:
+            return wait
+    return 0.0
+
+
+_failure_logged_at = None
+
+
+def backend_failed(exc):
+    # Con la caché caída fallarían todas las peticiones: un aviso cada FAILURE_LOG_INTERVAL
+    global _failure_logged_at
+    stats.incr('backend_errors')
+    now = time.monotonic()
+    if _failure_logged_at is None or now - _failure_logged_at >= FAILURE_LOG_INTERVAL:
+        _failure_logged_at = now
+        logger.warning(
+            "Error en el backend de límites de peticiones: %s", exc,
+            extra={'event': 'admission_backend_failed'},
+        )
+
+
+def retry_after(seconds):
+    return str(max(1, math.ceil(seconds)))
+
+
+class AdmissionMiddleware(MiddlewareMixin):
+    """Límites por usuario/rol (429) y de simultaneidad (503); va después del middleware JWT."""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.max_concurrent = getattr(settings, 'ADMISSION_MAX_CONCURRENT', 0)
+        self.concurrency_paths = tuple(getattr(settings, 'ADMISSION_PATHS', ('/api/products/',)))
+        self.exempt_paths = tuple(getattr(settings, 'ADMISSION_EXEMPT_PATHS', ()))
+        self.retry_after = getattr(settings, 'ADMISSION_RETRY_AFTER', 1)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response, release = self.admit(request)
+        if response is not None:
+            return response
+        streaming = False
+        try:
+            response = self.get_response(request)
+            streaming = self.release_on_close(response, release)
+        finally:
+            if not streaming:
+                release()
+        return response
+
+    async def __acall__(self, request):
+        response, release = await self.aadmit(request)
+        if response is not None:
+            return response
+        streaming = False
+        try:
+            response = await self.get_response(request)
+            streaming = self.release_on_close(response, release)
+        finally:
+            if not streaming:
+                release()
+        return response
+
+    def admit(self, request):
+        """(respuesta de rechazo o None, función que libera el lugar ocupado)."""
+        return self.decide(request, check_rate(request))
+
+    async def aadmit(self, request):
+        # Con el backend `cache` los contadores se consultan fuera del bucle
+        return self.decide(request, await acheck_rate(request))
+
+    def decide(self, request, wait):
+        if wait:
+            stats.incr('throttled')
+            logger.info(
+                "Límite de peticiones excedido: %s %s", request.method, request.path_info,
+                extra={'event': 'request_throttled', 'method': request.method, 'path': request.path_info,
+                       'role': getattr(request, 'user_role', None)},
+            )
+            return self.reject(request, 429, 'Demasiadas peticiones; reintente más tarde.', retry_after(wait)), None
+
+        if not self.limits_concurrency(request.path_info):
+            return None, _noop
+        if not in_flight.acquire(self.max_concurrent):
+            stats.incr('shed')
+            logger.info(
+                "Servicio saturado: %s peticiones en curso", self.max_concurrent,
+                extra={'event': 'request_shed', 'method': request.method, 'path': request.path_info},
+            )
+            return self.reject(request, 503, 'Servicio saturado; reintente.', str(self.retry_after)), None
+        return None, _once(in_flight.release)
+
+    def limits_concurrency(self, path):
+        return (self.max_concurrent > 0 and path.startswith(self.concurrency_paths)
+                and not path.startswith(self.exempt_paths))
+
+    def release_on_close(self, response, release):
+        """
+        True si el lugar queda en manos de la respuesta: la exportación sigue
+        leyendo de la DB mientras se envía, así que se libera al terminar el
+        envío o al cerrarla el servidor (`response.close()`), lo que ocurra antes.
+        """
+        if not response.streaming:
+            return False
+        content_class = AsyncReleasingContent if response.is_async else ReleasingContent
+        response.streaming_content = content_class(response.streaming_content, release)
+        return True
+
+    def reject(self, request, status, detail, seconds):
+        # Ya registrado en admit: LoggedResponseFilter omite la línea de django.request
+        request.response_logged = True
+        response = JsonResponse({'detail': detail}, status=status)
+        response['Retry-After'] = seconds
+        return response
+
+
+class ReleasingContent:
+    """
+    Contenido de un streaming que libera el lugar al agotarse o al cerrarse.
+    `StreamingHttpResponse` registra `close()` entre los cierres de la
+    respuesta, así que un cliente que corta antes del final también libera.
+    """
+
+    def __init__(self, content, release):
+        self.content = content
+        self.release = release
+
+    def __iter__(self):
+        try:
+            yield from self.content
+        finally:
+            self.release()
+
+    def close(self):
+        self.release()
+
+
+class AsyncReleasingContent(ReleasingContent):
+    __iter__ = None
+
+    async def __aiter__(self):
+        try:
+            async for part in self.content:
+                yield part
+        finally:
+            self.release()
+
+
+def _noop():
+    pass
+
+
+def _once(release):
+    released = False
+
+    def release_once():
+        nonlocal released
+        if not released:
+            released = True
+            release()
+    return release_once
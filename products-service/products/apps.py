@@ -4,4 +4,18 @@ from django.apps import AppConfig
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
+    
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from products.metrics import db_timer
+        from products.policy import get_policy
+        
+        # Un error en la política debe impedir arrancar, no aparecer en la primera petición
+        get_policy()
+        
+        def install_db_timer(sender, connection, **kwargs):
+            if db_timer not in connection.execute_wrappers:
+                connection.execute_wrappers.append(db_timer)
+        
+        connection_created.connect(install_db_timer, weak=False, dispatch_uid='products.metrics.db_timer')
 
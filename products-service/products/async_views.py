@@ -0,0 +1,119 @@
+"""
+Vistas async de lectura de productos (despliegue ASGI).
+
+DRF no ejecuta vistas async, así que el listado y el detalle por GET se
+sirven con vistas de Django nativas que reutilizan las mismas piezas que
+`ProductViewSet` (permiso RBAC, filtros, paginación por cursor, encoder de
+lectura y caché con ETag) y consultan con el ORM async. El resto de métodos
+se delega al ViewSet síncrono. Se enrutan sólo con `PRODUCTS_ASYNC_READS`
+(lo activa `products_service/asgi.py`).
+"""
+from time import perf_counter
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from products import cache as product_cache
+from products import metrics
+from products.views import ProductViewSet
+
+SAFE_READ_METHODS = ('GET', 'HEAD')
+
+sync_collection = sync_to_async(ProductViewSet.as_view({'get': 'list', 'post': 'create'}))
+sync_item = sync_to_async(ProductViewSet.as_view({
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+}))
+
+
+def render_json(data, status_code):
+    return HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status_code)
+
+
+def get_read_view(request):
+    # Instancia del ViewSet sólo como contenedor de configuración (no despacha)
+    view = ProductViewSet(action='list', format_kwarg=None)
+    view.request = Request(request)
+    view.args = ()
+    view.kwargs = {}
+    return view
+
+
+def check_permissions(view):
+    start = perf_counter()
+    try:
+        for permission in view.get_permissions():
+            if not permission.has_permission(view.request, view):
+                raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+    finally:
+        metrics.record('permission', start)
+
+
+async def handle_read(request, read):
+    try:
+        view = get_read_view(request)
+        check_permissions(view)
+        return await read(view)
+    except Http404:
+        return render_json({'detail': exceptions.NotFound.default_detail}, status.HTTP_404_NOT_FOUND)
+    except exceptions.APIException as exc:
+        detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        return render_json(detail, exc.status_code)
+
+
+async def read_list(view):
+    request = view.request
+    encoder = view.get_read_encoder()
+    queryset = view.filter_queryset(view.get_queryset()).values(*encoder.query_fields)
+    page = await view.paginator.apaginate_queryset(queryset, request, view=view)
+    start = perf_counter()
+    data = [encoder.encode(row) for row in page]
+    metrics.record('serialize', start)
+    return view.get_paginated_response(data)
+
+
+async def read_detail(view, pk):
+    encoder = view.get_read_encoder()
+    queryset = view.filter_queryset(view.get_queryset()).values(*encoder.query_fields)
+    row = await queryset.filter(pk=pk).afirst()
+    if row is None:
+        raise Http404
+    start = perf_counter()
+    data = encoder.encode(row)
+    metrics.record('serialize', start)
+    return Response(data)
+
+
+async def product_collection(request):
+    if request.method not in SAFE_READ_METHODS:
+        return await sync_collection(request)
+
+    async def read(view):
+        cache = product_cache.get_cache()
+        key = product_cache.list_key(await product_cache.aget_version(cache), view.request)
+        return await product_cache.acached_response(request, key, lambda: read_list(view))
+
+    return await handle_read(request, read)
+
+
+async def product_item(request, pk):
+    if request.method not in SAFE_READ_METHODS:
+        return await sync_item(request, pk=str(pk))
+
+    async def read(view):
+        cache = product_cache.get_cache()
+        key = product_cache.detail_key(await product_cache.aget_version(cache), pk, view.request)
+        return await product_cache.acached_response(request, key, lambda: read_detail(view, pk))
+
+    return await handle_read(request, read)
+
+
+# Como las vistas de DRF: la autenticación es por JWT, no por sesión/cookie
+product_collection.csrf_exempt = True
+product_item.csrf_exempt = True
@@ -0,0 +1,306 @@
+"""
+Registro de auditoría asíncrono por lotes (`AuditEntry`).
+
+Las eliminaciones, modificaciones, operaciones masivas, movimientos de stock
+y accesos denegados dejan una entrada sin añadir un INSERT a la latencia de
+la petición:
+
+- La petición arma la entrada (usuario, roles, request_id, producto,
+  detalle) y la deja en una cola acotada del proceso
+  (`AUDIT_QUEUE_SIZE`). Las acciones que modifican datos se encolan al
+  confirmarse la transacción.
+- Un hilo escritor la vacía con `bulk_create` en lotes de hasta
+  `AUDIT_BATCH_SIZE` entradas, o antes si la más antigua lleva
+  `AUDIT_FLUSH_INTERVAL` segundos esperando.
+- Contrapresión: con la cola llena la petición espera hasta
+  `AUDIT_ENQUEUE_TIMEOUT` segundos. Si el escritor sigue sin dar abasto, la
+  entrada se escribe en la propia petición; no se descarta ninguna. Desde
+  código async (vistas y middleware ASGI) esa espera y esa escritura van a
+  un hilo del executor del bucle: encolar nunca bloquea el bucle de eventos.
+- Al terminar el proceso (atexit) se escribe lo pendiente. Si un lote
+  falla se escribe de a una entrada: una fila inválida queda en el log
+  (`audit_write_failed`) sin arrastrar a las demás. Si la DB falla, lo
+  pendiente se reintenta y, agotados los reintentos, también queda en el log.
+
+`AUDIT_ASYNC=False` escribe cada entrada en la petición, como referencia.
+"""
+import asyncio
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_ipv46_address
+from django.db import DataError, IntegrityError, connections, router, transaction
+from django.utils import timezone
+
+from products.models import AuditEntry
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+# Reintentos de un lote cuando la DB falla (segundos de espera entre ellos)
+RETRY_DELAYS = (0.1, 0.5, 1, 2, 5)
+
+
+class AuditTrail:
+
+    def __init__(self, queue_size=10000, batch_size=500, flush_interval=1.0,
+                 enqueue_timeout=1.0, asynchronous=True):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.asynchronous = asynchronous
+        self.counters = {'written': 0, 'batches': 0, 'backpressure': 0, 'sync_writes': 0, 'failed': 0}
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.close)
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            queue_size=getattr(settings, 'AUDIT_QUEUE_SIZE', 10000),
+            batch_size=getattr(settings, 'AUDIT_BATCH_SIZE', 500),
+            flush_interval=getattr(settings, 'AUDIT_FLUSH_INTERVAL', 1.0),
+            enqueue_timeout=getattr(settings, 'AUDIT_ENQUEUE_TIMEOUT', 1.0),
+            asynchronous=getattr(settings, 'AUDIT_ASYNC', True),
+        )
+
+    def submit(self, entry):
+        if self.asynchronous:
+            if self._pid != os.getpid():
+                self.start()
+            try:
+                self.queue.put_nowait(entry)
+                return
+            except queue.Full:
+                self.counters['backpressure'] += 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._submit_blocking(entry)
+        else:
+            loop.run_in_executor(None, self._submit_from_loop, entry)
+
+    def _submit_blocking(self, entry):
+        if self.asynchronous:
+            try:
+                self.queue.put(entry, timeout=self.enqueue_timeout)
+                return
+            except queue.Full:
+                self.counters['sync_writes'] += 1
+        self.write([entry])
+
+    def _submit_from_loop(self, entry):
+        try:
+            self._submit_blocking(entry)
+        finally:
+            # Conexiones del hilo del executor, que Django no cierra
+            connections.close_all()
+
+    def start(self):
+        # Tras un fork (workers de gunicorn) el hilo del padre no existe en el hijo
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self._run, name='products-audit', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        try:
+            stopping = False
+            while not stopping:
+                first = self.queue.get()
+                if first is _STOP:
+                    self.queue.task_done()
+                    break
+                batch = [first]
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        entry = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if entry is _STOP:
+                        self.queue.task_done()
+                        stopping = True
+                        break
+                    batch.append(entry)
+                self.write(batch, RETRY_DELAYS)
+                for _ in batch:
+                    self.queue.task_done()
+        finally:
+            connections.close_all()
+
+    def write(self, entries, retry_delays=()):
+        for delay in (*retry_delays, None):
+            try:
+                AuditEntry.objects.bulk_create([AuditEntry(**entry) for entry in entries])
+                self.counters['written'] += len(entries)
+                self.counters['batches'] += 1
+                return
+            except Exception as exc:
+                logger.error(
+                    "Error escribiendo %d entradas de auditoría: %s", len(entries), exc,
+                    extra={'event': 'audit_flush_failed', 'entries': len(entries)},
+                )
+                # Conexión posiblemente rota: la siguiente consulta abre otra
+                connections[router.db_for_write(AuditEntry)].close()
+                if len(entries) > 1:
+                    entries = self.write_each(entries)
+                    if not entries:
+                        return
+                if delay is None:
+                    break
+                time.sleep(delay)
+        self.log_failed(entries)
+
+    def write_each(self, entries):
+        """
+        Escribe las entradas de a una. Las que la DB rechaza por sí mismas van
+        al log; si falla la DB, devuelve lo que queda para reintentarlo.
+        """
+        for index, entry in enumerate(entries):
+            try:
+                AuditEntry.objects.create(**entry)
+            except (DataError, IntegrityError, ValueError, TypeError):
+                connections[router.db_for_write(AuditEntry)].close()
+                self.log_failed([entry])
+            except Exception:
+                connections[router.db_for_write(AuditEntry)].close()
+                return entries[index:]
+            else:
+                self.counters['written'] += 1
+        return []
+
+    def log_failed(self, entries):
+        self.counters['failed'] += len(entries)
+        for entry in entries:
+            logger.error(
+                "Entrada de auditoría no escrita: %s", entry['action'],
+                extra={'event': 'audit_write_failed', 'audit': entry},
+            )
+
+    def flush(self, timeout=None):
+        """Espera a que se escriba lo encolado; False si vence `timeout`."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        if self._pid != os.getpid() or self._thread is None:
+            return
+        if timeout is None:
+            timeout = getattr(settings, 'AUDIT_SHUTDOWN_TIMEOUT', 10)
+        thread, self._thread = self._thread, None
+        self._pid = None
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+        # Lo que el hilo no alcanzó a escribir se escribe aquí
+        pending = []
+        while True:
+            try:
+                entry = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not _STOP:
+                pending.append(entry)
+            self.queue.task_done()
+        if pending:
+            self.write(pending)
+
+    def stats(self):
+        return {**self.counters, 'queued': self.queue.qsize()}
+
+
+trail = AuditTrail.from_settings()
+
+
+def fit(name, value):
+    """Texto recortado al max_length del campo de AuditEntry."""
+    return str(value or '')[:AuditEntry._meta.get_field(name).max_length]
+
+
+def client_ip(meta):
+    # GenericIPAddressField rechazaría la fila (y con ella el lote) en PostgreSQL
+    try:
+        validate_ipv46_address(meta.get('REMOTE_ADDR') or '')
+    except ValidationError:
+        return None
+    return meta['REMOTE_ADDR']
+
+
+def build_entry(request, action, outcome=AuditEntry.OUTCOME_OK, product_id=None, sku='', detail=None):
+    # Usuario, roles y ruta vienen del cliente (token y URL): cada texto se
+    # ajusta al modelo para que una entrada no haga fallar su lote
+    user_info = getattr(request, 'user_info', None) or {}
+    return {
+        'created_at': timezone.now(),
+        'action': fit('action', action),
+        'outcome': fit('outcome', outcome),
+        'username': fit('username', user_info.get('username')),
+        'roles': fit('roles', ','.join(map(str, getattr(request, 'user_roles', ()) or ()))),
+        'product_id': product_id,
+        'sku': fit('sku', sku),
+        'method': fit('method', request.method),
+        'path': fit('path', request.path_info),
+        'request_id': fit('request_id', getattr(request, 'request_id', '')),
+        'remote_addr': client_ip(request.META),
+        'detail': detail or {},
+    }
+
+
+def record(request, action, **fields):
+    trail.submit(build_entry(request, action, **fields))
+
+
+def record_on_commit(request, action, **fields):
+    # La entrada se arma ya (con la hora de la acción) y se encola si la
+    # transacción se confirma
+    entry = build_entry(request, action, **fields)
+    transaction.on_commit(lambda: trail.submit(entry))
+
+
+def record_denied(request, resource, action):
+    # Las denegaciones anónimas no se auditan: cualquiera podría llenar la
+    # cola y la tabla con peticiones sin token (quedan en el log como
+    # `access_denied`); sí cualquier intento autenticado
+    if not getattr(request, 'user_info', None):
+        return
+    record(request, 'access.denied', outcome=AuditEntry.OUTCOME_DENIED,
+           detail={'resource': resource, 'action': action})
+
+
+def filter_entries(filters):
+    """Entradas según los filtros ya validados (AuditQuerySerializer)."""
+    queryset = AuditEntry.objects.all()
+    if 'user' in filters:
+        queryset = queryset.filter(username=filters['user'])
+    if 'product' in filters:
+        queryset = queryset.filter(product_id=filters['product'])
+    if 'action' in filters:
+        queryset = queryset.filter(action=filters['action'])
+    if 'outcome' in filters:
+        queryset = queryset.filter(outcome=filters['outcome'])
+    if 'since' in filters:
+        queryset = queryset.filter(created_at__gte=filters['since'])
+    if 'until' in filters:
+        queryset = queryset.filter(created_at__lt=filters['until'])
+    return queryset
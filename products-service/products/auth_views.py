@@ -21,6 +21,18 @@ TEST_USERS = {
         'role': 'OPERARIO',
         'username': 'operario',
         'email': 'operario@warehouse.com'
+    },
+    'supervisor': {
+        'password': 'supervisor123',
+        'role': 'SUPERVISOR',
+        'username': 'supervisor',
+        'email': 'supervisor@warehouse.com'
+    },
+    'auditor': {
+        'password': 'auditor123',
+        'role': 'AUDITOR',
+        'username': 'auditor',
+        'email': 'auditor@warehouse.com'
     }
 }
 
@@ -54,7 +66,10 @@ def login(request):
     user_data = TEST_USERS.get(username)
     
     if not user_data or user_data['password'] != password:
-        logger.warning(f"Intento de login fallido para usuario: {username}")
+        logger.warning(
+            "Intento de login fallido para usuario: %s", username,
+            extra={'event': 'login_failed', 'user': username},
+        )
         return Response(
             {"detail": "Credenciales inválidas"},
             status=status.HTTP_401_UNAUTHORIZED
@@ -62,7 +77,10 @@ def login(request):
     
     token = generate_jwt_token(user_data)
     
-    logger.info(f"Login exitoso para usuario: {username} con rol: {user_data['role']}")
+    logger.info(
+        "Login exitoso para usuario: %s con rol: %s", username, user_data['role'],
+        extra={'event': 'login', 'user': username, 'role': user_data['role']},
+    )
     
     return Response({
         "token": token,
@@ -89,6 +107,16 @@ def test_users(request):
                 "username": "operario",
                 "password": "operario123",
                 "role": "OPERARIO"
+            },
+            "supervisor": {
+                "username": "supervisor",
+                "password": "supervisor123",
+                "role": "SUPERVISOR"
+            },
+            "auditor": {
+                "username": "auditor",
+                "password": "auditor123",
+                "role": "AUDITOR"
             }
         }
     }, status=status.HTTP_200_OK)
@@ -0,0 +1,119 @@
+"""
+Operaciones masivas sobre productos (sincronización desde bodega).
+
+Cada elemento se valida por separado; los válidos se aplican en una sola
+transacción con `bulk_create` (upsert por SKU vía ON CONFLICT) y los
+inválidos se reportan con sus errores sin afectar al resto del lote.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from products import inventory
+from products.changes import record_deletions
+from products.models import Product
+from products.serializers import ProductBulkItemSerializer
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def upsert_products(items, batch_size):
+    results = [None] * len(items)
+    valid = {}
+    # Un solo serializer para todo el lote, como hace ListSerializer: construir
+    # los campos por elemento domina el costo en lotes grandes
+    serializer = ProductBulkItemSerializer()
+
+    for index, item in enumerate(items):
+        try:
+            data = serializer.run_validation(item)
+        except ValidationError as exc:
+            results[index] = {'index': index, 'status': 'invalid', 'errors': exc.detail}
+            continue
+
+        sku = data['sku']
+        if sku in valid:
+            # Si un SKU se repite en el lote gana la última aparición
+            previous_index = valid[sku][0]
+            results[previous_index] = {
+                'index': previous_index,
+                'status': 'invalid',
+                'errors': {'sku': [f"SKU duplicado en el lote (ver elemento {index})"]},
+            }
+        valid[sku] = (index, data)
+
+    to_create = []
+    to_update = {}
+
+    with transaction.atomic():
+        # sku -> (id, quantity, price); las filas quedan bloqueadas (en orden de
+        # SKU) para que el resumen de inventario parta de sus valores reales
+        existing = {}
+        for chunk in _chunks(sorted(valid), batch_size):
+            existing.update(
+                (sku, (pk, quantity, price)) for sku, pk, quantity, price in
+                Product.objects.select_for_update().filter(sku__in=chunk).order_by('sku')
+                .values_list('sku', 'id', 'quantity', 'price')
+            )
+
+        for sku, (index, data) in valid.items():
+            product = Product(**data)
+            if sku not in existing:
+                to_create.append((index, product))
+                continue
+            product.id = existing[sku][0]
+            # Se agrupan por campos enviados para no pisar con valores por
+            # defecto los campos que el elemento no incluye
+            to_update.setdefault(tuple(sorted(data)), []).append((index, product))
+
+        Product.objects.bulk_create([product for _, product in to_create], batch_size=batch_size)
+
+        # Actualización en lote como INSERT ... ON CONFLICT (sku) DO UPDATE:
+        # una sola sentencia por lote en vez del CASE por fila de bulk_update
+        for fields, group in to_update.items():
+            Product.objects.bulk_create(
+                [product for _, product in group],
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['sku'],
+                update_fields=[field for field in fields if field != 'sku'] + ['updated_at'],
+            )
+
+        # Los campos que el elemento no envía conservan su valor
+        updated = [(existing[sku][1:], valid[sku][1]) for sku in valid if sku in existing]
+        inventory.record(
+            before=[values for values, _ in updated],
+            after=[(product.quantity, product.price) for _, product in to_create] + [
+                (data.get('quantity', quantity), data.get('price', price)) for (quantity, price), data in updated
+            ],
+        )
+
+    for index, product in to_create:
+        results[index] = {'index': index, 'status': 'created', 'id': product.id, 'sku': product.sku}
+    for index, product in (item for group in to_update.values() for item in group):
+        results[index] = {'index': index, 'status': 'updated', 'id': product.id, 'sku': product.sku}
+
+    return results
+
+
+def delete_products(ids, skus):
+    condition = Q()
+    if ids:
+        condition |= Q(id__in=ids)
+    if skus:
+        condition |= Q(sku__in=skus)
+
+    with transaction.atomic():
+        # Se borra por los ids leídos para que cada eliminación deje su marca
+        locked = list(
+            Product.objects.select_for_update().filter(condition).values_list('id', 'sku', 'quantity', 'price')
+        )
+        rows = [(pk, sku) for pk, sku, _, _ in locked]
+        Product.objects.filter(id__in=[pk for pk, _ in rows]).delete()
+        record_deletions(rows)
+        inventory.record(before=[(quantity, price) for _, _, quantity, price in locked])
+    return rows
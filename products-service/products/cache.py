@@ -0,0 +1,211 @@
+"""
+Caché de lectura para productos (detalle y páginas del listado).
+
+Las respuestas se guardan ya renderizadas junto con un ETag fuerte calculado
+sobre los bytes exactos del cuerpo. Todas las claves llevan un número de
+versión; cualquier escritura incrementa la versión y deja huérfanas las
+entradas anteriores, que expiran solas. El backend es el alias de
+`settings.CACHES` indicado en `PRODUCTS_CACHE_ALIAS` (memoria local por
+defecto, Redis/Memcached para compartirlo entre workers).
+
+Las peticiones de un usuario que acaba de escribir (`read_your_writes`, ver
+products/db_router.py) no leen la caché: la entrada pudo llenarse desde una
+réplica que aún no tenía su escritura. Sí la actualizan con lo leído del
+primario.
+"""
+import hashlib
+import threading
+import time
+from time import perf_counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+from products import metrics
+from products.db_router import served_by_replica
+
+VERSION_KEY = 'products:version'
+
+
+class CacheStats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        self.bypassed = 0
+
+    def incr(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def as_dict(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': getattr(settings, 'PRODUCTS_CACHE_ALIAS', 'products'),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'not_modified': self.not_modified,
+                'invalidations': self.invalidations,
+                'bypassed': self.bypassed,
+            }
+
+
+stats = CacheStats()
+
+
+def get_cache():
+    return caches[getattr(settings, 'PRODUCTS_CACHE_ALIAS', 'products')]
+
+
+def get_version(cache):
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Si la versión se perdió (expulsión o reinicio) se parte de un valor
+        # nuevo para no revivir entradas de versiones anteriores
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+async def aget_version(cache):
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, time.time_ns(), None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def url_hash(request):
+    return hashlib.sha1(request.build_absolute_uri().encode('utf-8')).hexdigest()
+
+
+def detail_key(version, pk, request):
+    # Toda la URL: además de ?fields=, el detalle aplica los filtros del listado
+    return f'products:{version}:detail:{pk}:{url_hash(request)}'
+
+
+def list_key(version, request):
+    return f'products:{version}:list:{url_hash(request)}'
+
+
+def compute_etag(body):
+    return '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+
+
+def _bump_version():
+    cache = get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+    stats.incr('invalidations')
+
+
+def invalidate():
+    # Tras el commit: una lectura concurrente no debe repoblar la caché con
+    # datos anteriores a la escritura
+    transaction.on_commit(_bump_version)
+
+
+def cached_response(request, key, build):
+    """
+    Devuelve la respuesta cacheada en `key` o la construye con `build()`.
+
+    `build` debe devolver una `Response` de DRF; sólo se cachean los 200.
+    Si el ETag coincide con `If-None-Match` se responde 304 sin cuerpo.
+    """
+    cache = get_cache()
+    entry = None
+    if getattr(request, 'read_your_writes', False):
+        stats.incr('bypassed')
+    else:
+        start = perf_counter()
+        entry = cache.get(key)
+        metrics.record('cache', start)
+        if entry is None:
+            stats.incr('misses')
+
+    if entry is None:
+        response = build()
+        if response.status_code != 200:
+            return response
+        entry = _render_entry(response)
+        start = perf_counter()
+        cache.set(key, entry, _entry_timeout())
+        metrics.record('cache', start)
+    else:
+        stats.incr('hits')
+
+    return _conditional_response(request, entry)
+
+
+async def acached_response(request, key, abuild):
+    """Variante de `cached_response` para vistas async; `abuild` es una corrutina."""
+    cache = get_cache()
+    entry = None
+    if getattr(request, 'read_your_writes', False):
+        stats.incr('bypassed')
+    else:
+        start = perf_counter()
+        entry = await cache.aget(key)
+        metrics.record('cache', start)
+        if entry is None:
+            stats.incr('misses')
+
+    if entry is None:
+        response = await abuild()
+        if response.status_code != 200:
+            return response
+        entry = _render_entry(response)
+        start = perf_counter()
+        await cache.aset(key, entry, _entry_timeout())
+        metrics.record('cache', start)
+    else:
+        stats.incr('hits')
+
+    return _conditional_response(request, entry)
+
+
+def _entry_timeout():
+    timeout = getattr(settings, 'PRODUCTS_CACHE_TIMEOUT', 300)
+    if served_by_replica():
+        # Una réplica atrasada puede devolver datos anteriores a la última
+        # escritura; se limita cuánto sobreviven en la caché
+        return min(timeout, getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 5))
+    return timeout
+
+
+def _render_entry(response):
+    start = perf_counter()
+    body = JSONRenderer().render(response.data)
+    etag = compute_etag(body)
+    metrics.record('render', start)
+    return body, etag
+
+
+def _conditional_response(request, entry):
+    body, etag = entry
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+        stats.incr('not_modified')
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+
+    response['ETag'] = etag
+    # El contenido depende del token: sólo el cliente puede guardarlo y debe revalidarlo
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
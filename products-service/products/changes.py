@@ -0,0 +1,143 @@
+"""
+Feed incremental de cambios del catálogo (`GET /api/products/changes/`).
+
+Un cliente que ya tiene el catálogo pide sólo lo que cambió desde su cursor:
+productos creados o modificados (keyset sobre el índice `(updated_at, id)`)
+y productos eliminados (`ProductTombstone`, keyset sobre `(deleted_at, id)`).
+Sincronizar cuesta O(cambios), no O(catálogo).
+
+- El cursor es opaco (base64 de las dos posiciones) y siempre se devuelve;
+  el cliente lo guarda y lo envía en la siguiente consulta. También se
+  acepta `since` (fecha ISO 8601) para empezar desde un instante.
+- Sólo se entregan cambios con más de `PRODUCTS_CHANGES_SETTLE_SECONDS` de
+  antigüedad: `updated_at` se fija antes del commit, así que una transacción
+  lenta podría confirmar una fila con una marca anterior a la ya entregada.
+  Si la lectura va a una réplica se suma `REPLICA_MAX_LAG_SECONDS`.
+- Las marcas se conservan `PRODUCTS_TOMBSTONE_RETENTION_DAYS` días (comando
+  `purge_tombstones`); un cursor más antiguo recibe 410 y el cliente debe
+  volver a descargar el catálogo completo.
+"""
+import base64
+import binascii
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException, ValidationError
+
+from products.db_router import served_by_replica
+from products.models import Product, ProductTombstone
+
+
+class CursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'El cursor es anterior a la retención de eliminaciones; descargue el catálogo completo.'
+    default_code = 'cursor_expired'
+
+
+def record_deletions(rows):
+    """Guarda una marca por cada (id, sku) eliminado; llamar dentro de la transacción del borrado."""
+    now = timezone.now()
+    ProductTombstone.objects.bulk_create(
+        [ProductTombstone(product_id=pk, sku=sku, deleted_at=now) for pk, sku in rows],
+        batch_size=getattr(settings, 'PRODUCTS_BULK_BATCH_SIZE', 1000),
+    )
+
+
+# Misma representación de fechas que la API
+_encode_datetime = serializers.DateTimeField().to_representation
+
+
+def encode_tombstone(row):
+    return {'id': row['product_id'], 'sku': row['sku'], 'deleted_at': _encode_datetime(row['deleted_at'])}
+
+
+def settle_horizon():
+    settle = getattr(settings, 'PRODUCTS_CHANGES_SETTLE_SECONDS', 2.0)
+    if served_by_replica():
+        settle += getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 5.0)
+    return timezone.now() - timedelta(seconds=settle)
+
+
+def encode_cursor(products_position, tombstones_position):
+    payload = json.dumps(
+        [[moment.isoformat(), pk] for moment, pk in (products_position, tombstones_position)],
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(payload.encode('ascii')).decode('ascii')
+
+
+def decode_cursor(value):
+    try:
+        positions = json.loads(base64.urlsafe_b64decode(value.encode('ascii')))
+        decoded = tuple((parse_datetime(moment), int(pk)) for moment, pk in positions)
+    except (TypeError, ValueError, UnicodeEncodeError, binascii.Error):
+        raise ValidationError({'cursor': ['Cursor inválido']})
+    if len(decoded) != 2 or any(moment is None for moment, _ in decoded):
+        raise ValidationError({'cursor': ['Cursor inválido']})
+    return decoded
+
+
+def parse_since(value):
+    try:
+        moment = parse_datetime(value)
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValidationError({'since': ['Debe ser una fecha ISO 8601']})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def start_positions(cursor=None, since=None):
+    """Posiciones (productos, eliminaciones) desde las que leer."""
+    if cursor:
+        positions = decode_cursor(cursor)
+    else:
+        # Sin cursor ni fecha: desde ahora (el cliente acaba de descargar el catálogo)
+        moment = parse_since(since) if since else settle_horizon()
+        positions = ((moment, 0), (moment, 0))
+
+    retention = getattr(settings, 'PRODUCTS_TOMBSTONE_RETENTION_DAYS', 30)
+    if positions[1][0] < timezone.now() - timedelta(days=retention):
+        raise CursorExpired()
+    return positions
+
+
+def _after(queryset, field, position, horizon, limit):
+    moment, pk = position
+    return list(
+        queryset.filter(**{f'{field}__lt': horizon})
+        .filter(Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'id__gt': pk}))
+        .order_by(field, 'id')[:limit + 1]
+    )
+
+
+def read_changes(positions, page_size, fields):
+    """
+    Cambios posteriores a `positions`, hasta `page_size` por tipo.
+
+    Devuelve (filas de productos, marcas, cursor siguiente, has_more).
+    """
+    horizon = settle_horizon()
+    products_position, tombstones_position = positions
+
+    values = tuple(dict.fromkeys(fields + ('id', 'updated_at')))
+    products = _after(Product.objects.values(*values), 'updated_at', products_position, horizon, page_size)
+    tombstones = _after(
+        ProductTombstone.objects.values('id', 'product_id', 'sku', 'deleted_at'),
+        'deleted_at', tombstones_position, horizon, page_size,
+    )
+    has_more = len(products) > page_size or len(tombstones) > page_size
+    products, tombstones = products[:page_size], tombstones[:page_size]
+
+    if products:
+        products_position = (products[-1]['updated_at'], products[-1]['id'])
+    if tombstones:
+        tombstones_position = (tombstones[-1]['deleted_at'], tombstones[-1]['id'])
+    return products, tombstones, encode_cursor(products_position, tombstones_position), has_more
@@ -0,0 +1,216 @@
+"""
+Enrutamiento de lecturas a réplicas de la base de datos.
+
+Las lecturas de peticiones GET/HEAD bajo `REPLICA_READ_PATHS` van a una
+réplica (round robin); todo lo demás (escrituras, lecturas dentro de una
+escritura, comandos de gestión) va a `default`. El destino se decide por
+petición en `ReplicaRoutingMiddleware` y se publica en un ContextVar que
+consulta `ReplicaRouter`.
+
+- Leer lo propio: tras una escritura, las lecturas del mismo usuario van al
+  primario durante `READ_YOUR_WRITES_SECONDS` (marca en la caché `products`,
+  compartida entre workers si es Redis/Memcached). Esas peticiones quedan
+  marcadas con `request.read_your_writes` y no leen la caché de respuestas,
+  que otros usuarios pueden haber llenado desde una réplica atrasada.
+- Retraso de replicación: cada réplica se mide cada
+  `REPLICA_LAG_CHECK_INTERVAL` segundos y sale de la rotación mientras su
+  retraso supere `REPLICA_MAX_LAG_SECONDS` (o no responda). Sin réplicas
+  sanas se lee del primario.
+"""
+import itertools
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework import permissions
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+
+# 'replica' si la petición en curso puede leer de una réplica
+read_target = ContextVar('read_target', default=PRIMARY)
+
+# En PostgreSQL: 0 si la réplica ya aplicó todo lo recibido; si no, antigüedad
+# de la última transacción aplicada. NULL fuera de recuperación (no es réplica)
+POSTGRES_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def get_replicas():
+    return [alias for alias in settings.DATABASES if alias != PRIMARY]
+
+
+def served_by_replica():
+    """True si las lecturas de la petición en curso pueden venir de una réplica."""
+    return read_target.get() != PRIMARY
+
+
+class ReplicaRouter:
+
+    def __init__(self):
+        self.replicas = get_replicas()
+        self._cycle = itertools.cycle(self.replicas) if self.replicas else None
+        self._lock = threading.Lock()
+        # alias -> (momento de la medición, retraso en segundos)
+        self._lag = {}
+
+    # --- API de routers de Django ---
+
+    def db_for_read(self, model, **hints):
+        if read_target.get() == PRIMARY or not self.replicas:
+            return PRIMARY
+        return self.pick_replica()
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Todas las bases tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas reciben el esquema por replicación
+        return db == PRIMARY
+
+    # --- Réplicas ---
+
+    def pick_replica(self):
+        for _ in range(len(self.replicas)):
+            alias = next(self._cycle)
+            if self.is_healthy(alias):
+                return alias
+        return PRIMARY
+
+    def is_healthy(self, alias):
+        checked_at, lag = self._lag.get(alias, (0.0, None))
+        now = time.monotonic()
+        if now - checked_at >= getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 5.0):
+            # Una sola medición por intervalo aunque lleguen varias peticiones
+            if self._lock.acquire(blocking=False):
+                try:
+                    lag = self.measure_lag(alias)
+                    self._lag[alias] = (now, lag)
+                finally:
+                    self._lock.release()
+        if lag is None:
+            # Aún sin medición (otro hilo la está haciendo): se usa el primario
+            return False
+        return lag <= getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 5.0)
+
+    def measure_lag(self, alias):
+        connection = connections[alias]
+        try:
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(POSTGRES_LAG_SQL)
+                    lag = float(cursor.fetchone()[0])
+            else:
+                # SQLite local: sin replicación real; el retraso se simula
+                lag = float(getattr(settings, 'REPLICA_SIMULATED_LAG', {}).get(alias, 0.0))
+        except DatabaseError as exc:
+            logger.warning(
+                "Réplica %s no disponible: %s", alias, exc,
+                extra={'event': 'replica_unavailable', 'alias': alias},
+            )
+            return float('inf')
+
+        if lag > getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 5.0):
+            logger.warning(
+                "Réplica %s fuera de rotación: retraso %.1fs", alias, lag,
+                extra={'event': 'replica_lagging', 'alias': alias, 'lag_seconds': lag},
+            )
+        return lag
+
+    def reset(self):
+        self._lag.clear()
+
+
+def sticky_key(username):
+    return f'products:sticky:{username}'
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """Decide el destino de las lecturas; va después del middleware JWT."""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.read_paths = tuple(getattr(settings, 'REPLICA_READ_PATHS', ('/api/products/',)))
+        self.sticky_seconds = getattr(settings, 'READ_YOUR_WRITES_SECONDS', 5)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = read_target.set(self.target_for(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_target.reset(token)
+        self.mark_write(request, response)
+        return response
+
+    async def __acall__(self, request):
+        # La marca de leer lo propio va a la caché (Redis) con su API async:
+        # una caché lenta no detiene el bucle de eventos
+        token = read_target.set(await self.atarget_for(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_target.reset(token)
+        key = self.write_mark_key(request, response)
+        if key:
+            await self.get_cache().aset(key, 1, self.sticky_seconds)
+        return response
+
+    def username(self, request):
+        user_info = getattr(request, 'user_info', None)
+        return user_info.get('username') if user_info else None
+
+    def sticky_key_for(self, request):
+        username = self.username(request)
+        return sticky_key(username) if username and self.sticky_seconds else None
+
+    def reads_replica(self, request):
+        return request.method in permissions.SAFE_METHODS and request.path_info.startswith(self.read_paths)
+
+    def target_for(self, request):
+        if not self.reads_replica(request):
+            return PRIMARY
+        key = self.sticky_key_for(request)
+        return self.resolve(request, bool(key and self.get_cache().get(key)))
+
+    async def atarget_for(self, request):
+        if not self.reads_replica(request):
+            return PRIMARY
+        key = self.sticky_key_for(request)
+        return self.resolve(request, bool(key and await self.get_cache().aget(key)))
+
+    def resolve(self, request, wrote_recently):
+        if wrote_recently:
+            request.read_your_writes = True
+            return PRIMARY
+        return 'replica'
+
+    def write_mark_key(self, request, response):
+        if request.method in permissions.SAFE_METHODS or response.status_code >= 400:
+            return None
+        return self.sticky_key_for(request)
+
+    def mark_write(self, request, response):
+        key = self.write_mark_key(request, response)
+        if key:
+            self.get_cache().set(key, 1, self.sticky_seconds)
+
+    def get_cache(self):
+        from products.cache import get_cache
+        return get_cache()
@@ -0,0 +1,410 @@
+"""
+Eventos de cambios de productos por server-sent events
+(`GET /api/products/events/`).
+
+Las escrituras de `ProductViewSet` publican, al confirmarse la transacción,
+`product.created`, `product.updated`, `product.deleted` y `product.stock`;
+las masivas publican un único `resync` (el cliente se pone al día con
+/api/products/changes/). Cada evento se serializa una sola vez como trama
+SSE y se reparte a los suscriptores cuyos roles pueden leer su recurso
+según la política RBAC.
+
+Backends (`PRODUCTS_EVENTS_BACKEND`):
+- `local`: buffer circular en memoria del proceso; sólo llegan los eventos
+  publicados por el mismo worker.
+- `cache`: registro compartido en la caché `products` (Redis/Memcached):
+  secuencia global con `incr` y un evento por clave. Un hilo por worker lo
+  lee cada `PRODUCTS_EVENTS_POLL_INTERVAL` segundos y lo copia al buffer
+  local, así que el costo no depende del número de suscriptores.
+
+Cada stream envía `: ping` cada `PRODUCTS_EVENTS_HEARTBEAT_SECONDS`, se
+cierra a los `PRODUCTS_EVENTS_STREAM_SECONDS` (o al expirar el token) y el
+cliente se reconecta con `Last-Event-ID`. Si ese id ya salió del buffer
+recibe `resync`. En ASGI el stream es un iterador async; en WSGI ocupa un
+hilo mientras dura, de ahí el límite `PRODUCTS_EVENTS_MAX_SUBSCRIBERS` (la
+plaza se reserva antes de responder y se libera al cerrarse la respuesta).
+
+Sólo se sirven streams en workers gthread o ASGI: un worker síncrono
+quedaría ocupado todo el stream y gunicorn lo mataría al pasar su `timeout`.
+Con varios workers hace falta el backend `cache` sobre una caché compartida.
+En los demás casos la respuesta es 503 y el cliente usa el feed de cambios.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+
+from products.permissions import authorize
+from products.policy import get_policy
+
+logger = logging.getLogger(__name__)
+
+RETRY_MILLISECONDS = 3000
+HEARTBEAT_FRAME = b': ping\n\n'
+
+
+class Event:
+    __slots__ = ('id', 'type', 'resource', 'frame')
+
+    def __init__(self, event_id, event_type, resource, payload):
+        self.id = event_id
+        self.type = event_type
+        self.resource = resource
+        self.frame = f'id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n'.encode('utf-8')
+
+
+def resync_frame(event_id, reason):
+    return f'id: {event_id}\nevent: resync\ndata: {json.dumps({"reason": reason})}\n\n'.encode('utf-8')
+
+
+class LocalBroker:
+    """Buffer circular de eventos del proceso con espera síncrona y async."""
+
+    def __init__(self):
+        self._events = deque(maxlen=getattr(settings, 'PRODUCTS_EVENTS_BUFFER', 1000))
+        self._condition = threading.Condition()
+        self._async_waiters = set()
+        self.last_id = 0
+        self.subscribers = 0
+
+    def publish(self, event_type, payload, resource='products'):
+        with self._condition:
+            self._deliver(Event(self.last_id + 1, event_type, resource, payload))
+
+    def _deliver(self, event):
+        # Con self._condition tomado
+        self._events.append(event)
+        self.last_id = event.id
+        self._condition.notify_all()
+        for loop, waiter in self._async_waiters:
+            loop.call_soon_threadsafe(waiter.set)
+
+    def start(self):
+        pass
+
+    def collect(self, last_id, resources):
+        """Tramas de los eventos posteriores a `last_id` visibles para `resources`."""
+        with self._condition:
+            head = self.last_id
+            if last_id == head:
+                return b'', head
+            oldest = self._events[0].id if self._events else head + 1
+            gap = last_id > head or last_id < oldest - 1
+            pending = []
+            for event in reversed(self._events):
+                if event.id <= last_id:
+                    break
+                pending.append(event)
+
+        frames = [resync_frame(head, 'gap')] if gap else []
+        if not gap:
+            frames += [event.frame for event in reversed(pending) if event.resource in resources]
+        return b''.join(frames), head
+
+    def wait(self, last_id, timeout):
+        with self._condition:
+            return self._condition.wait_for(lambda: self.last_id != last_id, timeout)
+
+    async def wait_async(self, last_id, timeout):
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._condition:
+            if self.last_id != last_id:
+                return True
+            self._async_waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._condition:
+                self._async_waiters.discard(waiter)
+
+    def subscribe(self):
+        with self._condition:
+            if self.subscribers >= getattr(settings, 'PRODUCTS_EVENTS_MAX_SUBSCRIBERS', 100):
+                return False
+            self.subscribers += 1
+            return True
+
+    def unsubscribe(self):
+        with self._condition:
+            self.subscribers -= 1
+
+
+class CacheBroker(LocalBroker):
+    """Registro de eventos compartido entre workers en la caché `products`."""
+
+    SEQUENCE_KEY = 'products:events:seq'
+
+    def __init__(self):
+        super().__init__()
+        self.poll_interval = getattr(settings, 'PRODUCTS_EVENTS_POLL_INTERVAL', 0.5)
+        self.ttl = getattr(settings, 'PRODUCTS_EVENTS_TTL', 300)
+        self._cursor = None
+        self._missing_since = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def get_cache(self):
+        return caches[getattr(settings, 'PRODUCTS_CACHE_ALIAS', 'products')]
+
+    def event_key(self, event_id):
+        return f'products:events:{event_id}'
+
+    def publish(self, event_type, payload, resource='products'):
+        cache = self.get_cache()
+        cache.add(self.SEQUENCE_KEY, 0, timeout=None)
+        event_id = cache.incr(self.SEQUENCE_KEY)
+        cache.set(self.event_key(event_id), (event_type, resource, payload), self.ttl)
+
+    def start(self):
+        # Un hilo lector por proceso; tras un fork (workers de gunicorn) se relanza
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._cursor = None
+            # La cabeza se lee antes de atender al primer suscriptor: parte del
+            # id compartido y no de 0
+            self._poll_logged()
+            threading.Thread(target=self._run, name='products-events', daemon=True).start()
+
+    def _run(self):
+        pid = self._pid
+        while self._pid == pid:
+            time.sleep(self.poll_interval)
+            self._poll_logged()
+
+    def _poll_logged(self):
+        try:
+            self.poll()
+        except Exception as exc:
+            logger.warning(
+                "Error leyendo eventos de la caché: %s", exc,
+                extra={'event': 'events_poll_failed'},
+            )
+
+    def poll(self):
+        cache = self.get_cache()
+        sequence = cache.get(self.SEQUENCE_KEY) or 0
+        if self._cursor is None or sequence < self._cursor:
+            # Arranque (o secuencia reiniciada): se empieza desde la cabeza, que
+            # pasa a ser la del broker para que los ids coincidan entre workers
+            with self._condition:
+                self._events.clear()
+                self.last_id = sequence
+                self._condition.notify_all()
+            self._cursor = sequence
+            return
+        if sequence == self._cursor:
+            return
+
+        first = max(self._cursor + 1, sequence - self._events.maxlen + 1)
+        stored = cache.get_many([self.event_key(event_id) for event_id in range(first, sequence + 1)])
+        for event_id in range(first, sequence + 1):
+            value = stored.get(self.event_key(event_id))
+            if value is None:
+                # Publicado el número pero aún no el evento: se reintenta un
+                # momento y luego se salta (el publicador falló)
+                now = time.monotonic()
+                if self._missing_since is None:
+                    self._missing_since = now
+                if now - self._missing_since < max(2.0, 4 * self.poll_interval):
+                    break
+                self._missing_since = None
+                self._cursor = event_id
+                continue
+            self._missing_since = None
+            event_type, resource, payload = value
+            with self._condition:
+                self._deliver(Event(event_id, event_type, resource, payload))
+            self._cursor = event_id
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backends = getattr(settings, 'PRODUCTS_EVENTS_BACKENDS', {'local': 'products.events.LocalBroker'})
+                _broker = import_string(backends[getattr(settings, 'PRODUCTS_EVENTS_BACKEND', 'local')])()
+    return _broker
+
+
+def reset_broker():
+    global _broker
+    _broker = None
+
+
+def publish(event_type, data, resource='products'):
+    """Publica un evento; un fallo del backend no debe romper la escritura."""
+    try:
+        get_broker().publish(event_type, json.dumps(data, cls=JSONEncoder, separators=(',', ':')), resource)
+    except Exception as exc:
+        logger.warning(
+            "No se pudo publicar el evento %s: %s", event_type, exc,
+            extra={'event': 'events_publish_failed'},
+        )
+
+
+def publish_on_commit(event_type, data, resource='products'):
+    transaction.on_commit(lambda: publish(event_type, data, resource))
+
+
+def publish_products_on_commit(event_type, items):
+    # Escrituras grandes: un `resync` en lugar de un evento por producto
+    if len(items) > getattr(settings, 'PRODUCTS_EVENTS_MAX_PER_WRITE', 100):
+        publish_on_commit('resync', {'reason': event_type, 'count': len(items)})
+        return
+    for item in items:
+        publish_on_commit(event_type, item)
+
+
+def readable_resources(roles):
+    policy = get_policy()
+    resources = {resource for _, resource, _ in policy.allowed}
+    return frozenset(resource for resource in resources if policy.allows(roles, resource, 'read'))
+
+
+def parse_last_event_id(request):
+    value = request.META.get('HTTP_LAST_EVENT_ID') or request.GET.get('last_event_id')
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class Subscription:
+    """Plaza reservada en el broker; se libera una sola vez (fin del stream o cierre de la respuesta)."""
+
+    def __init__(self, broker):
+        self.broker = broker
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self.broker.unsubscribe()
+
+
+class EventStreamResponse(StreamingHttpResponse):
+    """Stream SSE que libera su plaza al cerrarse, aunque nunca se haya leído."""
+
+    def __init__(self, streaming_content, subscription):
+        super().__init__(streaming_content, content_type='text/event-stream')
+        self.subscription = subscription
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self.subscription.release()
+
+
+def _stream(broker, subscription, last_id, resources, deadline, heartbeat):
+    try:
+        yield f'retry: {RETRY_MILLISECONDS}\n\n'.encode('ascii')
+        while True:
+            chunk, last_id = broker.collect(last_id, resources)
+            if chunk:
+                yield chunk
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if not broker.wait(last_id, min(heartbeat, remaining)):
+                yield HEARTBEAT_FRAME
+    finally:
+        subscription.release()
+
+
+async def _astream(broker, subscription, last_id, resources, deadline, heartbeat):
+    try:
+        yield f'retry: {RETRY_MILLISECONDS}\n\n'.encode('ascii')
+        while True:
+            chunk, last_id = broker.collect(last_id, resources)
+            if chunk:
+                yield chunk
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if not await broker.wait_async(last_id, min(heartbeat, remaining)):
+                yield HEARTBEAT_FRAME
+    finally:
+        subscription.release()
+
+
+def unavailable_reason(request):
+    """Por qué este proceso no puede servir el stream, o None."""
+    if not getattr(settings, 'PRODUCTS_EVENTS_ENABLED', True):
+        return 'Eventos desactivados; use /api/products/changes/.'
+    if not isinstance(request, ASGIRequest) and not request.META.get('wsgi.multithread'):
+        return 'Eventos no disponibles en workers síncronos; use /api/products/changes/.'
+    shared = (getattr(settings, 'PRODUCTS_EVENTS_BACKEND', 'local') == 'cache'
+              and getattr(settings, 'PRODUCTS_CACHE_SHARED', False))
+    if getattr(settings, 'SERVER_WORKERS', 1) > 1 and not shared:
+        return 'Eventos no disponibles sin una caché compartida entre workers; use /api/products/changes/.'
+    return None
+
+
+def product_events(request):
+    """Stream SSE; vista Django porque DRF respondería 406 a `Accept: text/event-stream`."""
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Método "{request.method}" no permitido.'}, status=405)
+    user_info = getattr(request, 'user_info', None)
+    resource, action, allowed = getattr(request, 'rbac_decision', None) or authorize(request)
+    if not user_info or not allowed:
+        return JsonResponse({'detail': get_policy().denied_message(resource, action)}, status=403)
+
+    reason = unavailable_reason(request)
+    if reason:
+        return JsonResponse({'detail': reason}, status=503)
+
+    broker = get_broker()
+    broker.start()
+    duration = getattr(settings, 'PRODUCTS_EVENTS_STREAM_SECONDS', 300)
+    expires_at = user_info.get('expires_at')
+    if isinstance(expires_at, (int, float)):
+        # El stream no sobrevive al token con el que se abrió
+        duration = min(duration, max(0.0, expires_at - time.time()))
+    deadline = time.monotonic() + duration
+
+    last_id = parse_last_event_id(request)
+    if last_id is None:
+        last_id = broker.last_id
+    resources = readable_resources(getattr(request, 'user_roles', ()))
+    heartbeat = getattr(settings, 'PRODUCTS_EVENTS_HEARTBEAT_SECONDS', 15)
+    stream = _astream if isinstance(request, ASGIRequest) else _stream
+
+    # La plaza se reserva aquí (no al empezar a leer el stream) para que
+    # aperturas simultáneas no pasen del límite
+    if not broker.subscribe():
+        response = JsonResponse({'detail': 'Demasiados streams abiertos; reintente.'}, status=503)
+        response['Retry-After'] = str(RETRY_MILLISECONDS // 1000)
+        return response
+    subscription = Subscription(broker)
+    response = EventStreamResponse(stream(broker, subscription, last_id, resources, deadline, heartbeat), subscription)
+    response['Cache-Control'] = 'no-cache'
+    # Sin buffer en proxies (nginx/Kong) para que cada evento salga al momento
+    response['X-Accel-Buffering'] = 'no'
+    return response
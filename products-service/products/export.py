@@ -0,0 +1,82 @@
+"""
+Exportación del catálogo completo en streaming (NDJSON o CSV).
+
+Las filas se leen con `QuerySet.iterator(chunk_size=...)` (cursor del lado del
+servidor en PostgreSQL) y se escriben por bloques, así que la memoria se
+mantiene constante sin importar el tamaño del catálogo.
+"""
+import csv
+import json
+
+from products.models import Product
+from products.serializers import ProductSerializer
+
+EXPORT_FIELDS = ['id', 'name', 'description', 'sku', 'quantity', 'price', 'created_at', 'updated_at']
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+class Echo:
+    """Pseudo-buffer para csv.writer: devuelve la línea en lugar de guardarla."""
+
+    def write(self, value):
+        return value
+
+
+def _encoders():
+    # Misma representación que la API (precio como string, fechas ISO 8601)
+    fields = ProductSerializer().fields
+    return [fields[name].to_representation for name in EXPORT_FIELDS]
+
+
+def _rows(queryset, chunk_size):
+    encoders = _encoders()
+    rows = queryset.order_by('id').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield [
+            None if value is None else encode(value)
+            for encode, value in zip(encoders, row)
+        ]
+
+
+def stream_ndjson(queryset, chunk_size):
+    # La primera fila sale sola, sin esperar a serializar un bloque entero;
+    # después, bloques de `chunk_size`
+    block, size = [], 1
+    for row in _rows(queryset, chunk_size):
+        block.append(json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False))
+        if len(block) >= size:
+            yield '\n'.join(block) + '\n'
+            block, size = [], chunk_size
+    if block:
+        yield '\n'.join(block) + '\n'
+
+
+def stream_csv(queryset, chunk_size):
+    writer = csv.writer(Echo())
+    # La cabecera sale antes de consultar la DB: el primer byte no espera al query
+    yield writer.writerow(EXPORT_FIELDS)
+    block = []
+    for row in _rows(queryset, chunk_size):
+        block.append(writer.writerow(row))
+        if len(block) >= chunk_size:
+            yield ''.join(block)
+            block = []
+    if block:
+        yield ''.join(block)
+
+
+STREAMERS = {
+    'ndjson': stream_ndjson,
+    'csv': stream_csv,
+}
+
+
+def export_queryset(updated_since=None):
+    queryset = Product.objects.all()
+    if updated_since is not None:
+        queryset = queryset.filter(updated_at__gte=updated_since)
+    return queryset
@@ -0,0 +1,58 @@
+"""
+Filtros del listado de productos.
+
+- `sku_prefix`: SKUs que empiezan por el prefijo (índice `varchar_pattern_ops`
+  que Django crea para el SKU único en PostgreSQL).
+- `search`: texto en nombre o descripción. En PostgreSQL lo resuelven índices
+  GIN de trigramas (pg_trgm) sobre UPPER(...), que es la forma en que Django
+  compila `icontains`; en SQLite se usa el mismo filtro sin índice.
+- `quantity_min`/`quantity_max` y `price_min`/`price_max`: rangos inclusivos.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+def _decimal(value):
+    value = Decimal(value)
+    if not value.is_finite():
+        raise ValueError(value)
+    return value
+
+
+RANGE_FILTERS = [
+    ('quantity_min', 'quantity__gte', int),
+    ('quantity_max', 'quantity__lte', int),
+    ('price_min', 'price__gte', _decimal),
+    ('price_max', 'price__lte', _decimal),
+]
+
+
+class ProductFilterBackend(BaseFilterBackend):
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        sku_prefix = params.get('sku_prefix')
+        if sku_prefix:
+            queryset = queryset.filter(sku__startswith=sku_prefix)
+
+        search = params.get('search', '').strip()
+        if search:
+            queryset = queryset.filter(Q(name__icontains=search) | Q(description__icontains=search))
+
+        errors = {}
+        for param, lookup, cast in RANGE_FILTERS:
+            value = params.get(param)
+            if value in (None, ''):
+                continue
+            try:
+                queryset = queryset.filter(**{lookup: cast(value)})
+            except (ValueError, InvalidOperation):
+                errors[param] = ['Valor numérico inválido']
+
+        if errors:
+            raise ValidationError(errors)
+        return queryset
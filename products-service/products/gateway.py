@@ -0,0 +1,128 @@
+"""
+Modo de gateway de confianza: identidad verificada por Kong.
+
+Kong ya verifica la firma y el `exp` del JWT (plugin `jwt`). Con
+`GATEWAY_TRUSTED_IDENTITY=True` el gateway reenvía la identidad en cabeceras
+compactas y el middleware JWT las acepta sin decodificar el token:
+
+    X-Identity-Subject: operario
+    X-Identity-Roles: OPERARIO,AUDITOR
+    X-Identity-Expires: 1767225600
+    X-Identity-Signature: hex(HMAC-SHA256(secreto, "método\\nruta\\nsub\\nroles\\nexp"))
+
+La firma incluye el método y la ruta (sin query string) de la petición que
+Kong reenvía: unas cabeceras capturadas no sirven para otra operación ni
+para otro recurso, sólo para repetir la misma hasta `exp`.
+
+Las cabeceras se aceptan sólo si las autentica lo configurado (ambas
+cosas si hay las dos):
+- `GATEWAY_HMAC_SECRETS`: firma HMAC con alguno de los secretos (varios
+  separados por comas para rotarlos sin cortes).
+- `GATEWAY_TRUSTED_PEERS`: la conexión viene de una de estas IPs/redes
+  (el servicio sólo es alcanzable desde Kong, p. ej. con mTLS o un security
+  group).
+
+Sin cabeceras de identidad se verifica el JWT como siempre; con cabeceras
+inválidas (firma, par o `exp`) la petición queda sin autenticar. El gateway
+debe eliminar las cabeceras X-Identity-* que envíe el cliente.
+"""
+import hashlib
+import hmac
+import ipaddress
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+SUBJECT_HEADER = 'HTTP_X_IDENTITY_SUBJECT'
+ROLES_HEADER = 'HTTP_X_IDENTITY_ROLES'
+EXPIRES_HEADER = 'HTTP_X_IDENTITY_EXPIRES'
+SIGNATURE_HEADER = 'HTTP_X_IDENTITY_SIGNATURE'
+
+
+class UntrustedIdentity(Exception):
+    pass
+
+
+def sign_identity(secret, method, path, subject, roles, expires):
+    """Firma de las cabeceras de identidad (la usa también el gateway)."""
+    message = f'{method}\n{path}\n{subject}\n{roles}\n{expires}'.encode('utf-8')
+    return hmac.new(secret.encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+
+class TrustedGateway:
+    """Autentica las cabeceras de identidad del gateway según la configuración."""
+
+    def __init__(self, secrets=(), peers=()):
+        if not secrets and not peers:
+            raise ImproperlyConfigured(
+                'GATEWAY_TRUSTED_IDENTITY requiere GATEWAY_HMAC_SECRETS o GATEWAY_TRUSTED_PEERS'
+            )
+        self.secrets = tuple(secrets)
+        self.networks = tuple(ipaddress.ip_network(peer, strict=False) for peer in peers)
+        # Caso habitual: una lista corta de IPs exactas
+        self.addresses = frozenset(
+            str(network.network_address) for network in self.networks
+            if network.num_addresses == 1
+        )
+
+    @classmethod
+    def from_settings(cls):
+        if not getattr(settings, 'GATEWAY_TRUSTED_IDENTITY', False):
+            return None
+        return cls(
+            getattr(settings, 'GATEWAY_HMAC_SECRETS', ()),
+            getattr(settings, 'GATEWAY_TRUSTED_PEERS', ()),
+        )
+
+    def trusted_peer(self, address):
+        if address in self.addresses:
+            return True
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.networks)
+
+    def identity(self, meta, method, path):
+        """
+        user_info de las cabeceras, None si no vienen, UntrustedIdentity si
+        vienen pero no se pueden aceptar.
+        """
+        subject = meta.get(SUBJECT_HEADER)
+        if subject is None:
+            return None
+
+        if self.networks and not self.trusted_peer(meta.get('REMOTE_ADDR', '')):
+            raise UntrustedIdentity(f"par no confiable: {meta.get('REMOTE_ADDR')}")
+
+        roles_value = meta.get(ROLES_HEADER, '')
+        expires_value = meta.get(EXPIRES_HEADER, '')
+        if self.secrets:
+            # En bytes: compare_digest rechaza (TypeError) cadenas no ASCII
+            signature = meta.get(SIGNATURE_HEADER, '').encode('utf-8', 'replace')
+            if not any(
+                hmac.compare_digest(
+                    sign_identity(secret, method, path, subject, roles_value, expires_value).encode('ascii'),
+                    signature,
+                )
+                for secret in self.secrets
+            ):
+                raise UntrustedIdentity('firma inválida')
+
+        try:
+            expires = int(expires_value)
+        except ValueError:
+            raise UntrustedIdentity('X-Identity-Expires inválido')
+        if expires <= time.time():
+            raise UntrustedIdentity('identidad expirada')
+
+        roles = tuple(dict.fromkeys(role for role in roles_value.split(',') if role))
+        return {
+            'username': subject,
+            'role': roles[0] if roles else None,
+            'roles': roles,
+            'email': None,
+            'user_id': subject,
+            'expires_at': expires,
+        }
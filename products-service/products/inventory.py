@@ -0,0 +1,148 @@
+"""
+Resumen de inventario mantenido incrementalmente (`InventorySummary`).
+
+Total de productos, unidades, valor del stock (cantidad x precio), productos
+con poco stock (`quantity < PRODUCTS_LOW_STOCK_THRESHOLD`) y sin stock
+(`quantity <= 0`), sin recorrer `products` al leerlo:
+
+- Cada escritura sobre `Product` (alta, modificación, eliminación, operaciones
+  masivas y movimientos de stock) suma su diferencia al resumen dentro de su
+  propia transacción: si se revierte, el resumen también.
+- La diferencia se calcula con los valores de las filas bloqueadas en esa
+  transacción (antes y después), no con lo que el cliente leyó.
+- El resumen se reparte en `PRODUCTS_INVENTORY_SLOTS` filas y cada escritura
+  suma en una al azar: escrituras concurrentes no esperan todas por la misma
+  fila. Leer el resumen es sumar esas pocas filas, sin importar el tamaño del
+  catálogo.
+- Los cambios que no pasan por la API ni por el admin (SQL directo, carga
+  con COPY) se corrigen con `manage.py rebuild_inventory`, que también hace
+  falta si cambió el umbral de poco stock. Leer nunca reconstruye (bloquearía
+  las escrituras): mientras falte el resumen o su umbral no coincida, se
+  calcula recorriendo `products` en cada lectura y se avisa en el log.
+"""
+import logging
+import random
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from products.models import InventorySummary, Product
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ('products', 'units', 'stock_value', 'low_stock', 'out_of_stock')
+
+# Umbrales para los que ya se avisó que el resumen no sirve (un aviso por proceso)
+_stale_warned = set()
+
+
+def get_threshold():
+    return getattr(settings, 'PRODUCTS_LOW_STOCK_THRESHOLD', 10)
+
+
+def get_slots():
+    return max(1, getattr(settings, 'PRODUCTS_INVENTORY_SLOTS', 8))
+
+
+def current_values(queryset):
+    """(quantity, price) de las filas de `queryset`, bloqueadas hasta el fin de la transacción."""
+    queryset = queryset.select_for_update()
+    if connections[queryset.db].vendor == 'sqlite':
+        # SQLite ignora FOR UPDATE y, si otra conexión escribe, una transacción
+        # que ya leyó no puede pasar a escribir ("database is locked" sin
+        # esperar): se toma el bloqueo de escritura antes de leer
+        InventorySummary.objects.using(queryset.db).filter(slot=-1).update(products=F('products'))
+    return list(queryset.order_by('pk').values_list('quantity', 'price'))
+
+
+def difference(before=(), after=(), threshold=None):
+    """Diferencia del resumen entre dos estados: listas de (quantity, price)."""
+    if threshold is None:
+        threshold = get_threshold()
+    delta = dict.fromkeys(COUNTERS, 0)
+    for sign, rows in ((-1, before), (1, after)):
+        for quantity, price in rows:
+            delta['products'] += sign
+            delta['units'] += sign * quantity
+            delta['stock_value'] += sign * quantity * Decimal(price)
+            delta['low_stock'] += sign * (quantity < threshold)
+            delta['out_of_stock'] += sign * (quantity <= 0)
+    return delta
+
+
+def record(before=(), after=()):
+    """Suma al resumen el cambio de `before` a `after`; va dentro de la transacción de la escritura."""
+    delta = difference(before, after)
+    values = {counter: F(counter) + value for counter, value in delta.items() if value}
+    if not values:
+        return
+    slot = random.randrange(get_slots())
+    summaries = InventorySummary.objects.filter(slot=slot)
+    if not summaries.update(updated_at=timezone.now(), **values):
+        # Fila nueva si se aumentó PRODUCTS_INVENTORY_SLOTS: empieza en cero
+        InventorySummary.objects.get_or_create(slot=slot, defaults={'low_stock_threshold': get_threshold()})
+        summaries.update(updated_at=timezone.now(), **values)
+
+
+def compute(using=None, threshold=None):
+    """Resumen calculado recorriendo `products` (lo que `record` mantiene al día)."""
+    if threshold is None:
+        threshold = get_threshold()
+    decimal = DecimalField(max_digits=20, decimal_places=2)
+    totals = Product.objects.using(using).aggregate(
+        products=Count('id'),
+        units=Coalesce(Sum('quantity'), 0),
+        stock_value=Coalesce(Sum(F('quantity') * F('price'), output_field=decimal), Value(Decimal('0')),
+                             output_field=decimal),
+        low_stock=Count('id', filter=Q(quantity__lt=threshold)),
+        out_of_stock=Count('id', filter=Q(quantity__lte=0)),
+    )
+    totals['stock_value'] = Decimal(totals['stock_value']).quantize(Decimal('0.01'))
+    return totals
+
+
+def rebuild():
+    """Recalcula el resumen desde cero; bloquea las escrituras de productos mientras tanto."""
+    using = router.db_for_write(InventorySummary)
+    threshold = get_threshold()
+    with transaction.atomic(using=using):
+        if connections[using].vendor == 'postgresql':
+            # SHARE: las lecturas siguen; las escrituras esperan a que termine
+            with connections[using].cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {Product._meta.db_table} IN SHARE MODE')
+        totals = compute(using, threshold)
+        now = timezone.now()
+        InventorySummary.objects.using(using).all().delete()
+        InventorySummary.objects.using(using).bulk_create(
+            [InventorySummary(slot=0, low_stock_threshold=threshold, updated_at=now, **totals)]
+            + [InventorySummary(slot=slot, low_stock_threshold=threshold, updated_at=now)
+               for slot in range(1, get_slots())]
+        )
+    logger.info(
+        "Resumen de inventario reconstruido: %s productos", totals['products'],
+        extra={'event': 'inventory_rebuilt', **totals, 'stock_value': str(totals['stock_value'])},
+    )
+    return totals
+
+
+def summary():
+    rows = list(InventorySummary.objects.all())
+    threshold = get_threshold()
+    if not rows or any(row.low_stock_threshold != threshold for row in rows):
+        if threshold not in _stale_warned:
+            _stale_warned.add(threshold)
+            logger.warning(
+                "Resumen de inventario ausente o con otro umbral (se espera %s); "
+                "se calcula al leer hasta ejecutar manage.py rebuild_inventory", threshold,
+                extra={'event': 'inventory_summary_stale', 'threshold': threshold},
+            )
+        return {**compute(threshold=threshold), 'low_stock_threshold': threshold, 'updated_at': timezone.now()}
+    return {
+        **{counter: sum(getattr(row, counter) for row in rows) for counter in COUNTERS},
+        'low_stock_threshold': threshold,
+        'updated_at': max(row.updated_at for row in rows),
+    }
@@ -0,0 +1,193 @@
+"""
+Claves públicas del proveedor de identidad para tokens RS256/ES256.
+
+`JWT_JWKS_PATH` apunta a un archivo JWKS (`{"keys": [...]}`) o a un
+directorio con archivos `*.json` (JWKS) y `*.pem` (clave pública; el `kid`
+es el nombre del archivo sin extensión). Las claves se parsean una sola vez
+a objetos de `cryptography` indexados por `kid`, de modo que verificar un
+token no vuelve a leer ni a parsear PEM/JWK.
+
+- Recarga: como mucho cada `JWT_JWKS_CHECK_INTERVAL` segundos se comparan
+  los mtime/tamaños de los archivos; si cambiaron, se recarga el conjunto
+  completo. Un error de carga conserva las claves anteriores.
+- `kid` desconocido: fuerza una comprobación de cambios (rotación recién
+  publicada) y, si sigue sin existir, se recuerda como negativo durante
+  `JWT_JWKS_NEGATIVE_TTL` segundos para no repetir el trabajo con cada
+  token de un emisor desconocido.
+"""
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+
+import jwt
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = frozenset({'RS256', 'RS384', 'RS512', 'ES256', 'ES384', 'ES512'})
+
+# Máximo de kids desconocidos recordados (tokens basura no crecen la memoria)
+NEGATIVE_CACHE_MAX_ENTRIES = 1024
+
+
+class SigningKey:
+    __slots__ = ('kid', 'key', 'algorithm')
+
+    def __init__(self, kid, key, algorithm):
+        self.kid = kid
+        self.key = key
+        self.algorithm = algorithm
+
+
+def _algorithm_for(key):
+    # Algoritmo por defecto de una clave PEM (los JWK suelen traer "alg")
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+    if isinstance(key, rsa.RSAPublicKey):
+        return 'RS256'
+    if isinstance(key, ec.EllipticCurvePublicKey):
+        return {256: 'ES256', 384: 'ES384', 521: 'ES512'}.get(key.curve.key_size)
+    return None
+
+
+def _load_jwks(path):
+    data = json.loads(path.read_text())
+    keys = {}
+    for item in data.get('keys', []):
+        if item.get('use', 'sig') != 'sig' or 'kid' not in item:
+            continue
+        jwk = jwt.PyJWK(item)
+        algorithm = item.get('alg') or _algorithm_for(jwk.key)
+        if algorithm in ASYMMETRIC_ALGORITHMS:
+            keys[item['kid']] = SigningKey(item['kid'], jwk.key, algorithm)
+    return keys
+
+
+def _load_pem(path):
+    from cryptography.hazmat.primitives.serialization import load_pem_public_key
+
+    key = load_pem_public_key(path.read_bytes())
+    algorithm = _algorithm_for(key)
+    if algorithm is None:
+        return {}
+    return {path.stem: SigningKey(path.stem, key, algorithm)}
+
+
+class KeySet:
+    """Claves de firma por `kid`; segura entre hilos (workers gthread)."""
+
+    def __init__(self, path, check_interval=30.0, negative_ttl=60.0):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self.negative_ttl = negative_ttl
+        self._keys = {}
+        self._signature = None
+        self._checked_at = 0.0
+        self._unknown = {}
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.unknown_kids = 0
+        self.refresh(interval=0)
+
+    def files(self):
+        if self.path.is_dir():
+            return sorted(p for p in self.path.iterdir() if p.suffix in ('.json', '.pem'))
+        return [self.path]
+
+    def signature(self):
+        try:
+            return tuple((p.name, p.stat().st_mtime_ns, p.stat().st_size) for p in self.files())
+        except OSError:
+            return None
+
+    def refresh(self, interval=None):
+        """Recarga si los archivos cambiaron; devuelve True si recargó."""
+        now = time.monotonic()
+        if interval is None:
+            interval = self.check_interval
+        if now - self._checked_at < interval:
+            return False
+        # Un solo hilo comprueba; los demás siguen con las claves actuales
+        if not self._lock.acquire(blocking=interval == 0):
+            return False
+        try:
+            self._checked_at = now
+            signature = self.signature()
+            if signature == self._signature:
+                return False
+            keys = {}
+            for path in self.files():
+                keys.update(_load_jwks(path) if path.suffix == '.json' else _load_pem(path))
+        except (OSError, ValueError, jwt.PyJWKError) as exc:
+            logger.error(
+                "No se pudo cargar el JWKS %s: %s", self.path, exc,
+                extra={'event': 'jwks_load_failed'},
+            )
+            return False
+        else:
+            self._keys = keys
+            self._signature = signature
+            self._unknown = {}
+            self.reloads += 1
+            logger.info(
+                "JWKS cargado: %d claves", len(keys),
+                extra={'event': 'jwks_loaded', 'kids': sorted(keys)},
+            )
+            return True
+        finally:
+            self._lock.release()
+
+    def get(self, kid):
+        self.refresh()
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        now = time.monotonic()
+        expires_at = self._unknown.get(kid)
+        if expires_at is not None and expires_at > now:
+            return None
+
+        # Quizá el proveedor acaba de rotar: se comprueba el disco (como mucho
+        # una vez por segundo aunque lleguen muchos kids distintos)
+        if self.refresh(interval=min(1.0, self.check_interval)):
+            key = self._keys.get(kid)
+            if key is not None:
+                return key
+
+        self.unknown_kids += 1
+        if len(self._unknown) >= NEGATIVE_CACHE_MAX_ENTRIES:
+            self._unknown.clear()
+        self._unknown[kid] = now + self.negative_ttl
+        return None
+
+    def stats(self):
+        return {
+            'keys': len(self._keys),
+            'reloads': self.reloads,
+            'unknown_kids': self.unknown_kids,
+            'negative_cached': len(self._unknown),
+        }
+
+
+_keyset = None
+_keyset_lock = threading.Lock()
+
+
+def get_keyset():
+    """KeySet de `JWT_JWKS_PATH`, o None si no hay claves públicas configuradas."""
+    global _keyset
+    path = getattr(settings, 'JWT_JWKS_PATH', '')
+    if not path:
+        return None
+    if _keyset is None or str(_keyset.path) != str(path):
+        with _keyset_lock:
+            if _keyset is None or str(_keyset.path) != str(path):
+                _keyset = KeySet(
+                    path,
+                    check_interval=getattr(settings, 'JWT_JWKS_CHECK_INTERVAL', 30.0),
+                    negative_ttl=getattr(settings, 'JWT_JWKS_NEGATIVE_TTL', 60.0),
+                )
+    return _keyset
@@ -0,0 +1,157 @@
+"""
+Logging del camino caliente de peticiones.
+
+- `QueueLogHandler`: encola el registro y un hilo (QueueListener) lo formatea
+  y escribe; la petición no espera la E/S de consola. El mensaje se formatea
+  en el hilo escritor (los logs usan estilo %, no f-strings).
+- `JSONFormatter`: una línea JSON por registro con `event`, `request_id` y
+  los campos pasados en `extra`.
+- `EventSamplingFilter`: muestrea eventos de alto volumen (p. ej.
+  `access_granted`); los eventos de seguridad y todo lo >= WARNING se
+  conservan siempre.
+- `LoggedResponseFilter`: omite la línea de `django.request` de respuestas
+  de error que la app ya registró con su propio evento.
+- `request_id`: ContextVar con el id de la petición (RequestIdMiddleware).
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+request_id = ContextVar('request_id', default='-')
+
+# Denegaciones y eliminaciones: nunca se muestrean ni se descartan
+SECURITY_EVENTS = frozenset({
+    'access_denied',
+    'product_delete_attempt',
+    'product_deleted',
+    'product_delete_failed',
+    'bulk_delete',
+    'login_failed',
+})
+
+# Atributos propios de LogRecord; el resto viene de `extra`
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def is_security_record(record):
+    return record.levelno >= logging.WARNING or getattr(record, 'event', None) in SECURITY_EVENTS
+
+
+class EventSamplingFilter(logging.Filter):
+    """
+    Deja pasar sólo una fracción de los registros de cada evento en `rates`
+    (p. ej. {'access_granted': 0.01}). Eventos sin tasa pasan siempre.
+    """
+
+    def __init__(self, rates=None, name=''):
+        super().__init__(name)
+        self.rates = {
+            event: float(rate) for event, rate in (rates or {}).items()
+            if event not in SECURITY_EVENTS
+        }
+
+    def filter(self, record):
+        rate = self.rates.get(getattr(record, 'event', None))
+        if rate is None or is_security_record(record):
+            return True
+        if rate >= 1.0:
+            return True
+        if random.random() >= rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class LoggedResponseFilter(logging.Filter):
+    """
+    Descarta el aviso de `django.request` (4xx/5xx) de peticiones marcadas
+    con `request.response_logged`, p. ej. los 429/503 del control de admisión.
+    """
+
+    def filter(self, record):
+        return not getattr(getattr(record, 'request', None), 'response_logged', False)
+
+
+class JSONFormatter(logging.Formatter):
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': getattr(record, 'event', None),
+            'request_id': getattr(record, 'request_id', request_id.get()),
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key not in data:
+                data[key] = value
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    Handler no bloqueante: la escritura real la hace un QueueListener sobre
+    un StreamHandler. La cola es acotada; si se llena se descartan registros
+    de rutina (contados en `dropped`) pero los de seguridad esperan su turno.
+    """
+
+    def __init__(self, stream=None, queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def setFormatter(self, fmt):
+        # El formateo ocurre en el hilo escritor
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # QueueHandler formatea el mensaje al encolar; aquí se difiere al hilo
+        # escritor. request_id se fija ahora porque el ContextVar es del hilo
+        # de la petición
+        if not hasattr(record, 'request_id'):
+            record.request_id = request_id.get()
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if is_security_record(record):
+                self.queue.put(record)
+            else:
+                self.dropped += 1
+
+    def emit(self, record):
+        if self._pid != os.getpid():
+            self.start()
+        super().emit(record)
+
+    def start(self):
+        # Tras un fork (workers de gunicorn) el hilo del padre no existe en el hijo
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def stop(self):
+        listener, self._listener = self._listener, None
+        if listener is not None and self._pid == os.getpid():
+            listener.stop()
+        self._pid = None
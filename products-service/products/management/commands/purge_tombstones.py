@@ -0,0 +1,36 @@
+"""
+Comando de Django para borrar las marcas de productos eliminados más
+antiguas que la retención del feed de cambios:
+
+    python manage.py purge_tombstones [--days 30]
+
+Los clientes con un cursor anterior a la retención reciben 410 en
+/api/products/changes/ y vuelven a descargar el catálogo completo.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from products.models import ProductTombstone
+
+
+class Command(BaseCommand):
+    help = 'Borra las marcas de eliminación anteriores a la retención del feed de cambios'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Días de retención (por defecto PRODUCTS_TOMBSTONE_RETENTION_DAYS)',
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        if days is None:
+            days = getattr(settings, 'PRODUCTS_TOMBSTONE_RETENTION_DAYS', 30)
+        if days <= 0:
+            raise CommandError('--days debe ser positivo')
+
+        cutoff = timezone.now() - timedelta(days=days)
+        deleted, _ = ProductTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'✓ {deleted} marcas anteriores a {cutoff:%Y-%m-%d %H:%M} eliminadas'))
@@ -0,0 +1,24 @@
+"""
+Comando de Django para recalcular el resumen de inventario desde la tabla de
+productos:
+
+    python manage.py rebuild_inventory
+
+Corrige el resumen tras cambios que no pasan por la API ni por el admin
+(SQL directo, restauraciones). Bloquea las escrituras de productos mientras
+recorre la tabla.
+"""
+from django.core.management.base import BaseCommand
+from products import inventory
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el resumen de inventario (/api/products/inventory/) desde cero'
+
+    def handle(self, *args, **options):
+        totals = inventory.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Resumen reconstruido: {totals['products']} productos, {totals['units']} unidades, "
+            f"valor {totals['stock_value']}, {totals['low_stock']} con poco stock "
+            f"(< {inventory.get_threshold()}), {totals['out_of_stock']} sin stock"
+        ))
@@ -1,14 +1,181 @@
 """
 Comando de Django para poblar la base de datos con productos de prueba.
+
+Sin opciones crea el catálogo fijo de 19 productos del experimento. Con
+`--count N` genera un catálogo sintético determinista (misma `--seed`, mismo
+catálogo) para reproducir cargas de tamaño productivo:
+
+    python manage.py seed_products --count 1000000 --seed 42 --truncate
 """
-from django.core.management.base import BaseCommand
-from products.models import Product
+import csv
+import io
+import random
+import string
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from products import inventory
+from products.models import Product, ProductTombstone
+
+SYNTHETIC_SKU_PREFIX = 'SYN-'
+
+CATEGORIES = [
+    ('LAP', 'Laptop'), ('MOU', 'Mouse'), ('TEC', 'Teclado'), ('MON', 'Monitor'),
+    ('AUD', 'Auriculares'), ('CAM', 'Webcam'), ('SSD', 'SSD'), ('RAM', 'Memoria RAM'),
+    ('MB', 'Placa Base'), ('PSU', 'Fuente de Poder'), ('GPU', 'Tarjeta Gráfica'),
+    ('HDD', 'Disco Duro'), ('ROU', 'Router'), ('HUB', 'Hub USB-C'), ('CAB', 'Cable'),
+    ('MIC', 'Micrófono'), ('FAN', 'Ventilador'), ('STA', 'Soporte'),
+]
+
+BRANDS = [
+    'Dell', 'Logitech', 'Keychron', 'LG', 'Sony', 'Samsung', 'Corsair', 'ASUS',
+    'NVIDIA', 'Seagate', 'TP-Link', 'Anker', 'Razer', 'Noctua', 'Kingston', 'HP',
+]
+
+DESCRIPTION_WORDS = (
+    'alta gama inalámbrico ergonómico compacto modular silencioso rápido '
+    'resistente portátil profesional gaming oficina garantía USB HDMI WiFi '
+    'Bluetooth RGB aluminio negro blanco edición nueva versión mejorada'
+).split()
 
 
 class Command(BaseCommand):
     help = 'Pobla la base de datos con productos de prueba'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count', type=int, default=None,
+            help='Genera N productos sintéticos en lugar del catálogo fijo',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=42,
+            help='Semilla del generador (misma semilla, mismo catálogo)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Filas por lote de inserción',
+        )
+        parser.add_argument(
+            '--truncate', action='store_true',
+            help='Vacía la tabla de productos antes de insertar',
+        )
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='En PostgreSQL usa bulk_create en lugar de COPY',
+        )
+
     def handle(self, *args, **options):
+        if options['truncate']:
+            self.truncate()
+
+        if options['count'] is None:
+            self.seed_fixed_catalog()
+        else:
+            self.seed_synthetic_catalog(options)
+
+        # La carga no pasa por la API (bulk_create/COPY): se recalcula el resumen
+        inventory.rebuild()
+
+    def truncate(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'TRUNCATE TABLE {Product._meta.db_table}, {ProductTombstone._meta.db_table} RESTART IDENTITY'
+                )
+        else:
+            Product.objects.all().delete()
+            ProductTombstone.objects.all().delete()
+        self.stdout.write(self.style.WARNING('→ Tabla de productos vaciada'))
+
+    def seed_synthetic_catalog(self, options):
+        count = options['count']
+        batch_size = options['batch_size']
+        if count <= 0 or batch_size <= 0:
+            raise CommandError('--count y --batch-size deben ser positivos')
+
+        if Product.objects.filter(sku__startswith=SYNTHETIC_SKU_PREFIX).exists():
+            raise CommandError(
+                'Ya existen productos sintéticos; use --truncate para regenerar el catálogo'
+            )
+
+        use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+        insert_batch = self.copy_batch if use_copy else self.bulk_create_batch
+        self.stdout.write(
+            f"Generando {count} productos (seed={options['seed']}, "
+            f"lotes de {batch_size}, {'COPY' if use_copy else 'bulk_create'})"
+        )
+
+        rng = random.Random(options['seed'])
+        started = time.monotonic()
+        inserted = 0
+        batch = []
+
+        for index in range(count):
+            batch.append(self.synthetic_product(rng, index))
+            if len(batch) == batch_size or index == count - 1:
+                with transaction.atomic():
+                    insert_batch(batch)
+                inserted += len(batch)
+                batch = []
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'  {inserted}/{count} ({inserted * 100 // count}%) '
+                    f'{inserted / elapsed if elapsed else 0:.0f} filas/s'
+                )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\n✓ Proceso completado. {inserted} productos sintéticos creados '
+                f'en {time.monotonic() - started:.1f}s.'
+            )
+        )
+
+    def synthetic_product(self, rng, index):
+        code, category = rng.choice(CATEGORIES)
+        brand = rng.choice(BRANDS)
+        model = ''.join(rng.choices(string.ascii_uppercase + string.digits, k=rng.randint(3, 6)))
+
+        # Stock con cola larga (la mayoría pocas unidades, algunos miles) y ~5% agotado
+        quantity = 0 if rng.random() < 0.05 else min(int(rng.lognormvariate(3.5, 1.2)), 100000)
+        # Precios log-normales alrededor de ~40, acotados al DecimalField(10, 2)
+        price = min(max(rng.lognormvariate(3.7, 1.1), 0.5), 99999999.99)
+        # ~20% sin descripción; el resto entre unas pocas y ~60 palabras
+        words = 0 if rng.random() < 0.2 else min(int(rng.gammavariate(2.0, 8.0)) + 1, 60)
+
+        return {
+            'name': f'{category} {brand} {model}',
+            'description': ' '.join(rng.choices(DESCRIPTION_WORDS, k=words)),
+            'sku': f'{SYNTHETIC_SKU_PREFIX}{code}-{index:09d}',
+            'quantity': quantity,
+            'price': Decimal(f'{price:.2f}'),
+        }
+
+    def bulk_create_batch(self, batch):
+        Product.objects.bulk_create([Product(**data) for data in batch], batch_size=len(batch))
+
+    def copy_batch(self, batch):
+        now = timezone.now()
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for data in batch:
+            writer.writerow([
+                data['name'], data['description'], data['sku'],
+                data['quantity'], data['price'], now, now,
+            ])
+        buffer.seek(0)
+
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {Product._meta.db_table} '
+                '(name, description, sku, quantity, price, created_at, updated_at) '
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+
+    def seed_fixed_catalog(self):
         products_data = [
             {
                 'name': 'Laptop Dell XPS 15',
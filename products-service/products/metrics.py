@@ -0,0 +1,243 @@
+"""
+Tiempos por etapa de cada petición y endpoint `/metrics` (formato Prometheus).
+
+`MetricsMiddleware` crea un `RequestTimings` por petición y lo publica en un
+ContextVar; cada etapa (jwt, permission, cache, db, serialize, render) suma
+su duración con `record(stage, start)`. Al terminar la petición los tiempos
+salen en la cabecera `Server-Timing` y se acumulan en histogramas en memoria
+del proceso (cada worker de gunicorn expone los suyos).
+
+Medir cuesta dos `perf_counter()` y una suma por etapa; sin petición en curso
+(`current` vacío) `record` no hace nada.
+"""
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.urls import Resolver404, resolve
+from django.utils.deprecation import MiddlewareMixin
+
+STAGES = ('jwt', 'permission', 'cache', 'db', 'serialize', 'render')
+
+# Segundos; cubre desde el rechazo temprano (<1 ms) hasta el presupuesto de 1 s
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    __slots__ = ('start', 'stages')
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.stages = {}
+
+    def add(self, stage, elapsed):
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed
+
+    def server_timing(self, total):
+        parts = ['%s;dur=%.3f' % (stage, elapsed * 1000) for stage, elapsed in self.stages.items()]
+        parts.append('total;dur=%.3f' % (total * 1000))
+        return ', '.join(parts)
+
+
+def record(stage, start):
+    """Suma `perf_counter() - start` a la etapa de la petición en curso."""
+    timings = current.get()
+    if timings is not None:
+        timings.add(stage, perf_counter() - start)
+
+
+def db_timer(execute, sql, params, many, context):
+    # execute_wrapper instalado en cada conexión (ver ProductsConfig.ready)
+    timings = current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add('db', perf_counter() - start)
+
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+
+class Registry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        # (route, method, role, status) -> Histogram ; route -> {stage: Histogram}
+        self.requests = {}
+        self.stages = {}
+
+    def observe(self, route, method, role, status, total, stages):
+        # Camino caliente: sin llamadas por histograma (ver tests/benchmarks/metrics_overhead.py)
+        with self._lock:
+            key = (route, method, role, status)
+            histogram = self.requests.get(key) or self.requests.setdefault(key, Histogram())
+            histogram.counts[bisect_left(BUCKETS, total)] += 1
+            histogram.total += total
+            histogram.count += 1
+            route_stages = self.stages.get(route) or self.stages.setdefault(route, {})
+            for stage, elapsed in stages.items():
+                histogram = route_stages.get(stage) or route_stages.setdefault(stage, Histogram())
+                histogram.counts[bisect_left(BUCKETS, elapsed)] += 1
+                histogram.total += elapsed
+                histogram.count += 1
+
+    def render(self):
+        with self._lock:
+            requests = [(key, list(h.counts), h.total, h.count) for key, h in self.requests.items()]
+            stages = [
+                ((route, stage), list(h.counts), h.total, h.count)
+                for route, route_stages in self.stages.items()
+                for stage, h in route_stages.items()
+            ]
+
+        lines = [
+            '# HELP products_http_requests_total Peticiones atendidas.',
+            '# TYPE products_http_requests_total counter',
+        ]
+        for (route, method, role, status), _, _, count in requests:
+            labels = _labels(route=route, method=method, role=role, status=status)
+            lines.append(f'products_http_requests_total{{{labels}}} {count}')
+
+        lines += [
+            '# HELP products_http_request_duration_seconds Latencia total de la petición.',
+            '# TYPE products_http_request_duration_seconds histogram',
+        ]
+        for (route, method, role, status), counts, total, count in requests:
+            labels = _labels(route=route, method=method, role=role, status=status)
+            lines += _histogram_lines('products_http_request_duration_seconds', labels, counts, total, count)
+
+        lines += [
+            '# HELP products_stage_duration_seconds Tiempo por etapa de la petición.',
+            '# TYPE products_stage_duration_seconds histogram',
+        ]
+        for (route, stage), counts, total, count in stages:
+            labels = _labels(route=route, stage=stage)
+            lines += _histogram_lines('products_stage_duration_seconds', labels, counts, total, count)
+
+        lines += _counter_lines()
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _histogram_lines(name, labels, counts, total, count):
+    lines = []
+    cumulative = 0
+    for bound, bucket in zip(BUCKETS, counts):
+        cumulative += bucket
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+    lines.append(f'{name}_sum{{{labels}}} {total:.6f}')
+    lines.append(f'{name}_count{{{labels}}} {count}')
+    return lines
+
+
+def _counter_lines():
+    # Contadores ya existentes: caché de respuestas, caché de tokens verificados,
+    # registro de auditoría y control de admisión
+    from products import admission, audit
+    from products import cache as product_cache
+    from products.utils import token_cache
+
+    lines = []
+    cache_stats = product_cache.stats.as_dict()
+    for name in ('hits', 'misses', 'not_modified', 'invalidations', 'bypassed'):
+        metric = f'products_cache_{name}_total'
+        lines += [f'# TYPE {metric} counter', f'{metric} {cache_stats[name]}']
+    token_stats = token_cache.stats()
+    for name in ('hits', 'misses', 'evictions'):
+        metric = f'products_jwt_cache_{name}_total'
+        lines += [f'# TYPE {metric} counter', f'{metric} {token_stats[name]}']
+    audit_stats = audit.trail.stats()
+    for name in ('written', 'batches', 'backpressure', 'sync_writes', 'failed'):
+        metric = f'products_audit_{name}_total'
+        lines += [f'# TYPE {metric} counter', f'{metric} {audit_stats[name]}']
+    lines += ['# TYPE products_audit_queue_depth gauge', f"products_audit_queue_depth {audit_stats['queued']}"]
+    admission_stats = admission.stats.as_dict()
+    for name in ('throttled', 'shed', 'backend_errors'):
+        metric = f'products_admission_{name}_total'
+        lines += [f'# TYPE {metric} counter', f'{metric} {admission_stats[name]}']
+    lines += ['# TYPE products_admission_in_flight gauge',
+              f"products_admission_in_flight {admission_stats['in_flight']}"]
+    return lines
+
+
+def get_route(request):
+    # Nombre de la vista (no la URL) para acotar la cardinalidad de etiquetas
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        # Respuestas del middleware (rechazo temprano) antes de resolver la URL
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return 'unmatched'
+    return match.view_name or match.route
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """Mide la petición completa; va primero en MIDDLEWARE."""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.server_timing = getattr(settings, 'PRODUCTS_SERVER_TIMING', True)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        current.set(timings)
+        response = await self.get_response(request)
+        return self.finish(request, response, timings)
+
+    def finish(self, request, response, timings):
+        total = perf_counter() - timings.start
+        registry.observe(
+            get_route(request), request.method, getattr(request, 'user_role', None) or 'anonymous',
+            response.status_code, total, timings.stages,
+        )
+        if self.server_timing:
+            response['Server-Timing'] = timings.server_timing(total)
+        return response
+
+
+def metrics_view(request):
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', ())
+    if allowed and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,34 +1,128 @@
 import logging
+import re
+import uuid
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
+from products import audit, metrics
+from products.gateway import TrustedGateway, UntrustedIdentity
+from products.logging_utils import request_id
+from products.permissions import authorize
+from products.policy import get_policy
 from products.utils import extract_user_info_from_token
 
 logger = logging.getLogger(__name__)
 
+REQUEST_ID_HEADER = 'X-Request-ID'
+# Se acepta el id de Kong/cliente sólo si es corto y sin caracteres raros
+VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+class RequestIdMiddleware(MiddlewareMixin):
+    """Fija el id de la petición (X-Request-ID o uno nuevo) para los logs."""
+    
+    def process_request(self, request):
+        value = request.META.get('HTTP_X_REQUEST_ID', '')
+        if not VALID_REQUEST_ID.match(value):
+            value = uuid.uuid4().hex
+        request.request_id = value
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.process_request(request)
+        token = request_id.set(request.request_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_id.reset(token)
+        response[REQUEST_ID_HEADER] = request.request_id
+        return response
+    
+    async def __acall__(self, request):
+        self.process_request(request)
+        token = request_id.set(request.request_id)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_id.reset(token)
+        response[REQUEST_ID_HEADER] = request.request_id
+        return response
+
 
 class JWTAuthenticationMiddleware(MiddlewareMixin):
     
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.fast_reject_paths = tuple(getattr(settings, 'RBAC_FAST_REJECT_PATHS', ()))
+        # Modo gateway de confianza (products/gateway.py); None si está desactivado
+        self.gateway = TrustedGateway.from_settings()
+    
     def process_request(self, request):
+        start = perf_counter()
+        self.authenticate(request)
+        metrics.record('jwt', start)
+        start = perf_counter()
+        response = self.reject_unauthorized(request)
+        metrics.record('permission', start)
+        return response
+    
+    async def __acall__(self, request):
+        # En ASGI, MiddlewareMixin ejecutaría process_request en un hilo vía
+        # sync_to_async; la verificación del JWT es CPU pura (y casi siempre un
+        # hit de la caché de tokens), así que se ejecuta directamente
+        response = self.process_request(request)
+        return response or await self.get_response(request)
+    
+    def reject_unauthorized(self, request):
+        # Rechazo temprano: el 403 sale sin construir la petición DRF ni tocar la DB.
+        # La decisión queda en la petición y PolicyPermission no la repite
+        request.rbac_decision = resource, action, allowed = authorize(request)
+        if allowed or resource is None:
+            return None
+        if not request.path_info.startswith(self.fast_reject_paths):
+            return None
+        
+        logger.warning(
+            "Acceso denegado: Usuario con roles %s intentó realizar %s %s (%s sobre %s)",
+            list(request.user_roles), request.method, request.path_info, action, resource,
+            extra={'event': 'access_denied', 'role': request.user_role, 'method': request.method,
+                   'path': request.path_info, 'resource': resource, 'action': action},
+        )
+        audit.record_denied(request, resource, action)
+        return JsonResponse({'detail': get_policy().denied_message(resource, action)}, status=403)
+    
+    def authenticate(self, request):
+        if self.gateway is not None:
+            try:
+                user_info = self.gateway.identity(request.META, request.method, request.path)
+            except UntrustedIdentity as exc:
+                logger.warning(
+                    "Identidad del gateway rechazada: %s", exc,
+                    extra={'event': 'gateway_identity_rejected', 'remote_addr': request.META.get('REMOTE_ADDR')},
+                )
+                return self.set_identity(request, None)
+            if user_info is not None:
+                return self.set_identity(request, user_info)
+        
         auth_header = request.META.get('HTTP_AUTHORIZATION', '')
         
         if not auth_header.startswith('Bearer '):
-            request.user_info = None
-            request.user_role = None
-            return None
+            return self.set_identity(request, None)
         
         token = auth_header.split(' ')[1] if len(auth_header.split(' ')) > 1 else None
-        
-        if token:
-            user_info = extract_user_info_from_token(token)
-            if user_info:
-                request.user_info = user_info
-                request.user_role = user_info.get('role')
-                logger.info(f"Usuario autenticado: {user_info.get('username')} con rol: {request.user_role}")
-            else:
-                request.user_info = None
-                request.user_role = None
-        else:
-            request.user_info = None
-            request.user_role = None
-        
+        return self.set_identity(request, extract_user_info_from_token(token) if token else None)
+    
+    def set_identity(self, request, user_info):
+        request.user_info = user_info
+        request.user_role = user_info.get('role') if user_info else None
+        request.user_roles = user_info.get('roles', ()) if user_info else ()
+        if user_info:
+            logger.info(
+                "Usuario autenticado: %s con rol: %s", user_info.get('username'), request.user_role,
+                extra={'event': 'authenticated', 'user': user_info.get('username'), 'role': request.user_role},
+            )
         return None
-
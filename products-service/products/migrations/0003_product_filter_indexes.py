@@ -0,0 +1,47 @@
+# Generated migration for Product filtering indexes
+
+from django.db import migrations, models
+
+TRIGRAM_INDEXES = [
+    ('products_name_trgm_idx', 'name'),
+    ('products_description_trgm_idx', 'description'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Sólo PostgreSQL: en otros motores `search` usa el filtro sin índice.
+    # CREATE EXTENSION requiere un rol con privilegios (rds_superuser en RDS).
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON products '
+            f'USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_product_created_id_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['quantity'], name='products_quantity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price'], name='products_price_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
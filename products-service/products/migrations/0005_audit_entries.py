@@ -0,0 +1,38 @@
+# Generated migration for the audit trail (append-only audit entries)
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_changes_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('action', models.CharField(max_length=50)),
+                ('outcome', models.CharField(default='ok', max_length=10)),
+                ('username', models.CharField(blank=True, max_length=150)),
+                ('roles', models.CharField(blank=True, max_length=200)),
+                ('product_id', models.BigIntegerField(blank=True, null=True)),
+                ('sku', models.CharField(blank=True, max_length=100)),
+                ('method', models.CharField(blank=True, max_length=10)),
+                ('path', models.CharField(blank=True, max_length=255)),
+                ('request_id', models.CharField(blank=True, max_length=64)),
+                ('remote_addr', models.GenericIPAddressField(blank=True, null=True)),
+                ('detail', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+            ],
+            options={
+                'db_table': 'audit_entries',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['-created_at', '-id'], name='audit_created_id_idx'), models.Index(fields=['username', '-created_at', '-id'], name='audit_user_created_idx'), models.Index(fields=['product_id', '-created_at', '-id'], name='audit_product_created_idx')],
+            },
+        ),
+    ]
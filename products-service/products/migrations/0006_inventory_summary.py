@@ -0,0 +1,60 @@
+# Generated migration for the inventory summary (incremental totals and low-stock index)
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+import django.utils.timezone
+
+
+def build_summary(apps, schema_editor):
+    # Resumen inicial del catálogo existente (como `manage.py rebuild_inventory`)
+    Product = apps.get_model('products', 'Product')
+    InventorySummary = apps.get_model('products', 'InventorySummary')
+    threshold = getattr(settings, 'PRODUCTS_LOW_STOCK_THRESHOLD', 10)
+    using = schema_editor.connection.alias
+    decimal = models.DecimalField(max_digits=20, decimal_places=2)
+    totals = Product.objects.using(using).aggregate(
+        products=models.Count('id'),
+        units=Coalesce(models.Sum('quantity'), 0),
+        stock_value=Coalesce(
+            models.Sum(models.F('quantity') * models.F('price'), output_field=decimal),
+            models.Value(Decimal('0')), output_field=decimal,
+        ),
+        low_stock=models.Count('id', filter=models.Q(quantity__lt=threshold)),
+        out_of_stock=models.Count('id', filter=models.Q(quantity__lte=0)),
+    )
+    totals['stock_value'] = Decimal(totals['stock_value']).quantize(Decimal('0.01'))
+    InventorySummary.objects.using(using).create(slot=0, low_stock_threshold=threshold, **totals)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_audit_entries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySummary',
+            fields=[
+                ('slot', models.PositiveSmallIntegerField(primary_key=True, serialize=False)),
+                ('products', models.BigIntegerField(default=0)),
+                ('units', models.BigIntegerField(default=0)),
+                ('stock_value', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('low_stock', models.BigIntegerField(default=0)),
+                ('out_of_stock', models.BigIntegerField(default=0)),
+                ('low_stock_threshold', models.IntegerField()),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'inventory_summary',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('quantity__lt', 10)), fields=['-created_at', '-id'], name='products_low_stock_idx'),
+        ),
+        migrations.RunPython(build_summary, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,11 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+# Umbral del índice parcial de poco stock; PRODUCTS_LOW_STOCK_THRESHOLD por
+# encima de este valor necesita una migración que rehaga el índice
+LOW_STOCK_INDEX_THRESHOLD = 10
 
 
 class Product(models.Model):
@@ -12,8 +19,107 @@ class Product(models.Model):
 
     class Meta:
         db_table = 'products'
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='products_created_id_idx'),
+            models.Index(fields=['quantity'], name='products_quantity_idx'),
+            models.Index(fields=['price'], name='products_price_idx'),
+            # Feed de cambios (/api/products/changes/): keyset sobre (updated_at, id)
+            models.Index(fields=['updated_at', 'id'], name='products_updated_id_idx'),
+            # Productos con poco stock (/api/products/low-stock/): índice parcial,
+            # sólo contiene las filas bajo el umbral
+            models.Index(
+                fields=['-created_at', '-id'], name='products_low_stock_idx',
+                condition=Q(quantity__lt=LOW_STOCK_INDEX_THRESHOLD),
+            ),
+            # Los índices de trigramas de name/description (PostgreSQL) se crean
+            # en la migración 0003
+        ]
 
     def __str__(self):
         return f"{self.name} (SKU: {self.sku})"
 
+
+class ProductTombstone(models.Model):
+    """Rastro de un producto eliminado, para que los clientes lo sincronicen."""
+    product_id = models.BigIntegerField()
+    sku = models.CharField(max_length=100)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'product_tombstones'
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='tombstones_deleted_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sku} eliminado ({self.deleted_at:%Y-%m-%d %H:%M:%S})"
+
+
+class InventorySummary(models.Model):
+    """
+    Resumen de inventario, repartido en varias filas (`slot`) que se suman al
+    leerlo; products/inventory.py lo mantiene al día con cada escritura.
+    """
+    slot = models.PositiveSmallIntegerField(primary_key=True)
+    products = models.BigIntegerField(default=0)
+    units = models.BigIntegerField(default=0)
+    stock_value = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    low_stock = models.BigIntegerField(default=0)
+    out_of_stock = models.BigIntegerField(default=0)
+    low_stock_threshold = models.IntegerField()
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'inventory_summary'
+
+    def __str__(self):
+        return f"Resumen de inventario #{self.slot}: {self.products} productos"
+
+
+class AuditEntry(models.Model):
+    """
+    Registro de auditoría de acciones destructivas, privilegiadas y denegadas.
+
+    Sólo se agregan filas (products/audit.py las escribe por lotes); el modelo
+    no permite modificarlas ni borrarlas.
+    """
+    OUTCOME_OK = 'ok'
+    OUTCOME_DENIED = 'denied'
+    OUTCOME_ERROR = 'error'
+
+    created_at = models.DateTimeField(default=timezone.now)
+    action = models.CharField(max_length=50)
+    outcome = models.CharField(max_length=10, default=OUTCOME_OK)
+    username = models.CharField(max_length=150, blank=True)
+    roles = models.CharField(max_length=200, blank=True)
+    product_id = models.BigIntegerField(null=True, blank=True)
+    sku = models.CharField(max_length=100, blank=True)
+    method = models.CharField(max_length=10, blank=True)
+    path = models.CharField(max_length=255, blank=True)
+    request_id = models.CharField(max_length=64, blank=True)
+    remote_addr = models.GenericIPAddressField(null=True, blank=True)
+    detail = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        db_table = 'audit_entries'
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Consultas de /api/products/audit/: por tiempo, por usuario y por
+            # producto, todas con la paginación por cursor (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='audit_created_id_idx'),
+            models.Index(fields=['username', '-created_at', '-id'], name='audit_user_created_idx'),
+            models.Index(fields=['product_id', '-created_at', '-id'], name='audit_product_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Las entradas de auditoría no se modifican')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Las entradas de auditoría no se eliminan')
+
+    def __str__(self):
+        return f"{self.created_at:%Y-%m-%d %H:%M:%S} {self.username or '-'} {self.action} ({self.outcome})"
@@ -0,0 +1,145 @@
+"""
+Paginación por cursor (keyset) sobre (created_at, id).
+
+A diferencia de la paginación por offset, cada página filtra a partir de la
+posición del último elemento visto, así que el costo de una página no
+depende de qué tan profundo esté el cliente en el catálogo.
+"""
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from urllib import parse
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class ProductCursorPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Cursor inválido'
+
+    @property
+    def page_size(self):
+        return getattr(settings, 'PRODUCTS_PAGE_SIZE', 20)
+
+    @property
+    def max_page_size(self):
+        return getattr(settings, 'PRODUCTS_MAX_PAGE_SIZE', 100)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset, page_size = self.get_page_queryset(queryset, request)
+        return self.set_page(list(queryset), page_size)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset, page_size = self.get_page_queryset(queryset, request)
+        return self.set_page([item async for item in queryset], page_size)
+
+    def get_page_queryset(self, queryset, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        self.cursor = cursor = self.decode_cursor(request)
+
+        if cursor is None:
+            queryset = queryset.order_by('-created_at', '-id')
+        else:
+            created_at, pk, reverse = cursor
+            if reverse:
+                # Página anterior: se recorre en orden ascendente y luego se invierte
+                queryset = queryset.order_by('created_at', 'id').filter(
+                    created_at__gte=created_at
+                ).exclude(created_at=created_at, id__lte=pk)
+            else:
+                queryset = queryset.order_by('-created_at', '-id').filter(
+                    created_at__lte=created_at
+                ).exclude(created_at=created_at, id__gte=pk)
+
+        return queryset[:page_size + 1], page_size
+
+    def set_page(self, results, page_size):
+        has_following = len(results) > page_size
+        results = results[:page_size]
+
+        if self.cursor is not None and self.cursor[2]:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.cursor is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_position(self, item):
+        if isinstance(item, dict):
+            return item['created_at'], item['id']
+        return item.created_at, item.id
+
+    def encode_cursor(self, item, reverse):
+        created_at, pk = self.get_position(item)
+        payload = json.dumps([created_at.isoformat(), pk, int(reverse)], separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            payload = base64.urlsafe_b64decode(parse.unquote(encoded).encode('ascii'))
+            created_at, pk, reverse = json.loads(payload)
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+
+        return created_at, pk, bool(reverse)
@@ -1,58 +1,59 @@
 from rest_framework import permissions
 import logging
 
+from products import audit
+from products.policy import get_policy
+
 logger = logging.getLogger(__name__)
 
 
-class IsAuthenticatedJWT(permissions.BasePermission):
-    
-    def has_permission(self, request, view):
-        user_info = getattr(request, 'user_info', None)
-        
-        if not user_info:
-            logger.warning(f"Acceso denegado: Usuario no autenticado intentó realizar {request.method}")
-            return False
-        
-        return True
+def authorize(request):
+    """
+    Decisión RBAC de la petición: (recurso, acción, permitido).
 
+    El recurso y la acción salen de la ruta y el método según la política
+    (products/policy.json); basta con que uno de los roles del token tenga
+    permiso. Fuera de las rutas de la política se deniega.
+    """
+    policy = get_policy()
+    resource, action = policy.resolve(request.method, request.path_info)
+    allowed = resource is not None and policy.allows(getattr(request, 'user_roles', ()), resource, action)
+    return resource, action, allowed
 
-class IsAdminOrReadOnly(permissions.BasePermission):
-    
-    def has_permission(self, request, view):
-        user_role = getattr(request, 'user_role', None)
-        user_info = getattr(request, 'user_info', None)
-        
-        if not user_info:
-            logger.warning(f"Acceso denegado: Usuario no autenticado intentó realizar {request.method}")
-            return False
-        
-        if request.method in permissions.SAFE_METHODS:
-            logger.info(f"Acceso autorizado: Usuario autenticado con rol '{user_role}' puede realizar {request.method}")
-            return True
-        
-        if user_role == 'ADMIN':
-            logger.info(f"Acceso autorizado: Usuario ADMIN puede realizar {request.method}")
-            return True
-        
-        logger.warning(
-            f"Acceso denegado: Usuario con rol '{user_role}' intentó realizar {request.method}. "
-            f"Se requiere rol 'ADMIN'."
-        )
-        return False
 
+class PolicyPermission(permissions.BasePermission):
+    """Aplica la política RBAC; reutiliza la decisión del middleware JWT si ya la tomó."""
 
-class IsAdmin(permissions.BasePermission):
-    
     def has_permission(self, request, view):
+        decision = getattr(request, 'rbac_decision', None)
+        if decision is None:
+            decision = authorize(request)
+        resource, action, allowed = decision
         user_role = getattr(request, 'user_role', None)
-        
-        if user_role == 'ADMIN':
-            logger.info(f"Acceso autorizado: Usuario ADMIN")
+
+        if not getattr(request, 'user_info', None):
+            self.message = get_policy().denied_message(resource, action)
+            logger.warning(
+                "Acceso denegado: Usuario no autenticado intentó realizar %s", request.method,
+                extra={'event': 'access_denied', 'role': None, 'method': request.method},
+            )
+            audit.record_denied(request, resource, action)
+            return False
+
+        if allowed:
+            logger.info(
+                "Acceso autorizado: Usuario con rol '%s' puede realizar %s sobre %s", user_role, action, resource,
+                extra={'event': 'access_granted', 'role': user_role, 'method': request.method,
+                       'resource': resource, 'action': action},
+            )
             return True
-        
+
+        self.message = get_policy().denied_message(resource, action)
         logger.warning(
-            f"Acceso denegado: Usuario con rol '{user_role}' intentó acceder. "
-            f"Se requiere rol 'ADMIN'."
+            "Acceso denegado: Usuario con roles %s intentó realizar %s sobre %s",
+            list(getattr(request, 'user_roles', ())), action, resource,
+            extra={'event': 'access_denied', 'role': user_role, 'method': request.method,
+                   'resource': resource, 'action': action},
         )
+        audit.record_denied(request, resource, action)
         return False
-
@@ -0,0 +1,120 @@
+"""
+Política RBAC declarativa (`RBAC_POLICY_FILE`, por defecto products/policy.json).
+
+El archivo declara:
+- `resources`: recurso -> acciones posibles,
+- `routes`: prefijo de ruta -> recurso (el más largo gana) y, si hace falta,
+  la acción de cada método (por defecto GET/HEAD/OPTIONS = read,
+  POST/PUT/PATCH = write, DELETE = delete),
+- `rules`: qué roles pueden hacer qué acciones sobre qué recurso (`*` vale
+  por todos); con `"effect": "deny"` una regla quita permisos y gana sobre
+  cualquier `allow`.
+
+Al arrancar se compila a un frozenset de tuplas (rol, recurso, acción): la
+decisión por petición es una búsqueda en un set por cada rol del token, así
+que añadir roles, recursos o reglas no cambia su costo. La usan
+`JWTAuthenticationMiddleware` (rechazo temprano) y `PolicyPermission`.
+"""
+import json
+import threading
+
+from django.conf import settings
+
+DEFAULT_METHOD_ACTIONS = {
+    'GET': 'read', 'HEAD': 'read', 'OPTIONS': 'read',
+    'POST': 'write', 'PUT': 'write', 'PATCH': 'write',
+    'DELETE': 'delete',
+}
+
+WILDCARD = '*'
+
+
+class PolicyError(ValueError):
+    pass
+
+
+class Policy:
+
+    def __init__(self, allowed, routes, messages):
+        self.allowed = allowed
+        # [(prefijo, recurso, {método: acción})], del prefijo más largo al más corto
+        self.routes = routes
+        self.messages = messages
+
+    @classmethod
+    def compile(cls, data):
+        resources = {name: frozenset(actions) for name, actions in data['resources'].items()}
+
+        allowed, denied = set(), set()
+        for rule in data['rules']:
+            effect = rule.get('effect', 'allow')
+            if effect not in ('allow', 'deny'):
+                raise PolicyError(f'Efecto desconocido: {effect!r}')
+            names = resources if rule['resource'] == WILDCARD else [rule['resource']]
+            for resource in names:
+                if resource not in resources:
+                    raise PolicyError(f'Recurso desconocido en la política: {resource!r}')
+                actions = resources[resource] if WILDCARD in rule['actions'] else rule['actions']
+                for action in actions:
+                    if action not in resources[resource]:
+                        raise PolicyError(f'Acción {action!r} no definida para {resource!r}')
+                    for role in rule['roles']:
+                        (allowed if effect == 'allow' else denied).add((role, resource, action))
+        allowed = frozenset(allowed - denied)
+
+        routes = []
+        for route in data['routes']:
+            if route['resource'] not in resources:
+                raise PolicyError(f"Ruta {route['path']} con recurso desconocido {route['resource']!r}")
+            methods = dict(DEFAULT_METHOD_ACTIONS, **route.get('methods', {}))
+            routes.append((route['path'], route['resource'], methods))
+        routes.sort(key=lambda item: len(item[0]), reverse=True)
+
+        messages = {}
+        for resource, actions in resources.items():
+            for action in actions:
+                roles = sorted(role for role, r, a in allowed if r == resource and a == action)
+                required = ' o '.join(f"'{role}'" for role in roles) or 'ninguno'
+                messages[(resource, action)] = f'Acción no autorizada. Requiere rol {required}.'
+
+        return cls(allowed, tuple(routes), messages)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as policy_file:
+            return cls.compile(json.load(policy_file))
+
+    def resolve(self, method, path):
+        """(recurso, acción) de la petición; (None, None) fuera de la política."""
+        for prefix, resource, methods in self.routes:
+            if path.startswith(prefix):
+                return resource, methods.get(method)
+        return None, None
+
+    def allows(self, roles, resource, action):
+        allowed = self.allowed
+        for role in roles:
+            if (role, resource, action) in allowed:
+                return True
+        return False
+
+    def denied_message(self, resource, action):
+        return self.messages.get((resource, action), 'Acción no autorizada.')
+
+
+_policy = None
+_policy_lock = threading.Lock()
+
+
+def get_policy():
+    global _policy
+    if _policy is None:
+        with _policy_lock:
+            if _policy is None:
+                _policy = Policy.load(settings.RBAC_POLICY_FILE)
+    return _policy
+
+
+def reset_policy():
+    global _policy
+    _policy = None
@@ -1,5 +1,10 @@
+import decimal
+from functools import lru_cache
+
+from django.utils import timezone
 from rest_framework import serializers
-from products.models import Product
+from rest_framework.settings import ISO_8601, api_settings
+from products.models import AuditEntry, Product
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -8,3 +13,145 @@ class ProductSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'sku', 'quantity', 'price', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+
+class ProductReadEncoder:
+    """
+    Serialización de lectura precompilada para filas de `values()`.
+
+    Produce exactamente la misma representación que `ProductSerializer`
+    (mismo orden de campos, precio como string, fechas ISO 8601 con 'Z'),
+    pero sin instanciar modelos ni recorrer la maquinaria de campos de DRF:
+    los enteros y textos se copian tal cual y sólo precio y fechas pasan por
+    un conversor específico preparado una vez.
+    """
+
+    def __init__(self, field_names):
+        serializer_fields = ProductSerializer().fields
+        self.field_names = tuple(name for name in ProductSerializer.Meta.fields if name in field_names)
+        # La paginación por cursor necesita la posición (created_at, id)
+        self.query_fields = tuple(dict.fromkeys(self.field_names + ('id', 'created_at')))
+        self.converters = tuple(
+            (name, self._converter(serializer_fields[name])) for name in self.field_names
+        )
+
+    @staticmethod
+    def _converter(field):
+        if isinstance(field, serializers.DateTimeField):
+            output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+            field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+            if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+                return field.to_representation
+
+            def encode_datetime(value):
+                if timezone.is_naive(value):
+                    value = timezone.make_aware(value, field_timezone)
+                value = value.astimezone(field_timezone).isoformat()
+                return value[:-6] + 'Z' if value.endswith('+00:00') else value
+            return encode_datetime
+
+        if isinstance(field, serializers.DecimalField):
+            coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+            if not coerce_to_string or field.localize or field.decimal_places is None:
+                return field.to_representation
+
+            exponent = decimal.Decimal('.1') ** field.decimal_places
+            context = decimal.getcontext().copy()
+            if field.max_digits is not None:
+                context.prec = field.max_digits
+
+            def encode_decimal(value):
+                return '{:f}'.format(value.quantize(exponent, rounding=field.rounding, context=context))
+            return encode_decimal
+
+        return None
+
+    def encode(self, row):
+        data = {}
+        for name, convert in self.converters:
+            value = row[name]
+            data[name] = convert(value) if convert is not None and value is not None else value
+        return data
+
+
+@lru_cache(maxsize=64)
+def get_read_encoder(field_names):
+    return ProductReadEncoder(field_names)
+
+
+def parse_sparse_fields(value):
+    """
+    Convierte `?fields=id,sku,quantity` en la tupla de campos a devolver.
+
+    Sin parámetro devuelve todos los campos de `ProductSerializer`.
+    """
+    if not value:
+        return tuple(ProductSerializer.Meta.fields)
+
+    requested = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in requested if name not in ProductSerializer.Meta.fields]
+    if unknown or not requested:
+        raise serializers.ValidationError({
+            'fields': [f"Campos no válidos: {', '.join(unknown) or value}. "
+                       f"Disponibles: {', '.join(ProductSerializer.Meta.fields)}"]
+        })
+    return tuple(name for name in ProductSerializer.Meta.fields if name in requested)
+
+
+class ProductBulkItemSerializer(serializers.ModelSerializer):
+    # La unicidad del SKU no se valida por elemento: en la carga masiva un SKU
+    # existente significa actualizarlo (upsert)
+    class Meta:
+        model = Product
+        fields = ['name', 'description', 'sku', 'quantity', 'price']
+        extra_kwargs = {'sku': {'validators': []}}
+
+
+class ProductBulkDeleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    skus = serializers.ListField(child=serializers.CharField(max_length=100), required=False, default=list)
+
+    def validate(self, attrs):
+        if not attrs['ids'] and not attrs['skus']:
+            raise serializers.ValidationError("Se requiere al menos un id o SKU")
+        return attrs
+
+
+class StockMovementSerializer(serializers.Serializer):
+    sku = serializers.CharField(max_length=100)
+    delta = serializers.IntegerField()
+
+    def validate_delta(self, value):
+        if value == 0:
+            raise serializers.ValidationError("El movimiento no puede ser 0")
+        return value
+
+
+class InventorySummarySerializer(serializers.Serializer):
+    products = serializers.IntegerField()
+    units = serializers.IntegerField()
+    stock_value = serializers.DecimalField(max_digits=20, decimal_places=2)
+    low_stock = serializers.IntegerField()
+    out_of_stock = serializers.IntegerField()
+    low_stock_threshold = serializers.IntegerField()
+    updated_at = serializers.DateTimeField()
+
+
+class AuditEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AuditEntry
+        fields = [
+            'id', 'created_at', 'action', 'outcome', 'username', 'roles', 'product_id', 'sku',
+            'method', 'path', 'request_id', 'remote_addr', 'detail',
+        ]
+
+
+class AuditQuerySerializer(serializers.Serializer):
+    """Filtros de /api/products/audit/; user y product usan sus índices."""
+    user = serializers.CharField(max_length=150, required=False)
+    product = serializers.IntegerField(required=False)
+    action = serializers.CharField(max_length=50, required=False)
+    outcome = serializers.ChoiceField(
+        choices=[AuditEntry.OUTCOME_OK, AuditEntry.OUTCOME_DENIED, AuditEntry.OUTCOME_ERROR], required=False,
+    )
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
@@ -0,0 +1,116 @@
+"""
+Movimientos de stock (entradas y salidas de bodega).
+
+Cada movimiento es un delta con signo sobre `quantity` aplicado en la DB con
+`F('quantity') + delta`, sin leer el producto antes: dos escáneres que
+mueven el mismo SKU a la vez no se pisan. Un lote se aplica completo o no se
+aplica: los deltas del mismo SKU se suman, los SKUs se procesan en orden
+(mismo orden de bloqueo de filas en todas las transacciones) y cada bloque
+es un único UPDATE con CASE por SKU.
+"""
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+
+from products import inventory
+from products.models import Product
+from products.serializers import StockMovementSerializer
+
+
+class StockMovementRejected(Exception):
+    """El lote no se aplicó; `data` y `status_code` forman la respuesta."""
+
+    def __init__(self, data, status_code):
+        super().__init__(data['detail'])
+        self.data = data
+        self.status_code = status_code
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def validate_movements(items):
+    """Valida el lote y devuelve el delta neto por SKU; cualquier error invalida el lote."""
+    serializer = StockMovementSerializer()
+    deltas = {}
+    errors = {}
+
+    for index, item in enumerate(items):
+        try:
+            data = serializer.run_validation(item)
+        except ValidationError as exc:
+            errors[index] = exc.detail
+            continue
+        deltas[data['sku']] = deltas.get(data['sku'], 0) + data['delta']
+
+    if errors:
+        raise ValidationError({'movements': errors})
+    return deltas
+
+
+def apply_movements(deltas, allow_negative=False, batch_size=1000):
+    """
+    Aplica `deltas` ({sku: delta}) en una transacción y devuelve {sku: quantity}.
+
+    Lanza StockMovementRejected (404) si algún SKU no existe o (409) si algún
+    producto quedaría con cantidad negativa (salvo `allow_negative`); en ambos
+    casos no se aplica ningún movimiento.
+    """
+    skus = sorted(sku for sku, delta in deltas.items() if delta)
+    now = timezone.now()
+
+    with transaction.atomic():
+        for chunk in _chunks(skus, batch_size):
+            delta = Case(
+                *[When(sku=sku, then=Value(deltas[sku])) for sku in chunk],
+                output_field=models.IntegerField(),
+            )
+            queryset = Product.objects.filter(sku__in=chunk)
+            if not allow_negative and any(deltas[sku] < 0 for sku in chunk):
+                queryset = queryset.alias(new_quantity=F('quantity') + delta).filter(new_quantity__gte=0)
+
+            with transaction.atomic():
+                updated = queryset.update(quantity=F('quantity') + delta, updated_at=now)
+                if updated != len(chunk):
+                    # Volver al savepoint para diagnosticar con las cantidades originales
+                    transaction.set_rollback(True)
+            if updated != len(chunk):
+                _raise_for_rejected(chunk, deltas)
+
+        # Cantidades resultantes (dentro de la transacción: incluyen este lote)
+        quantities, prices = {}, {}
+        for chunk in _chunks(list(deltas), batch_size):
+            for sku, quantity, price in Product.objects.filter(sku__in=chunk).values_list('sku', 'quantity', 'price'):
+                quantities[sku], prices[sku] = quantity, price
+        missing = [sku for sku in deltas if sku not in quantities]
+        if missing:
+            raise _missing(missing)
+        inventory.record(
+            before=[(quantities[sku] - deltas[sku], prices[sku]) for sku in skus],
+            after=[(quantities[sku], prices[sku]) for sku in skus],
+        )
+
+    return quantities
+
+
+def _raise_for_rejected(chunk, deltas):
+    # El UPDATE no tocó todas las filas: o falta el SKU o el guard lo excluyó
+    current = dict(Product.objects.filter(sku__in=chunk).values_list('sku', 'quantity'))
+    missing = [sku for sku in chunk if sku not in current]
+    if missing:
+        raise _missing(missing)
+    raise StockMovementRejected({
+        'detail': 'Stock insuficiente',
+        'skus': [
+            {'sku': sku, 'quantity': current[sku], 'delta': deltas[sku]}
+            for sku in chunk if current[sku] + deltas[sku] < 0
+        ],
+    }, status.HTTP_409_CONFLICT)
+
+
+def _missing(skus):
+    return StockMovementRejected({'detail': 'SKU no encontrado', 'skus': skus}, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,93 @@
+"""
+Caché en proceso de claims JWT ya verificados.
+
+Los clientes reutilizan el mismo token durante horas, así que verificar la
+firma HMAC en cada petición es trabajo repetido. Cada worker guarda lo que
+ya extrajo de los tokens verificados (identidad y roles), indexado por un
+digest del token, hasta el `exp` del propio token.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class VerifiedTokenCache:
+    """
+    Caché LRU acotada de claims verificados.
+
+    Las entradas expiran en el `exp` del token; los tokens sin `exp` no se
+    guardan. Es segura entre hilos (workers gthread).
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, token):
+        if self.max_entries <= 0:
+            return None
+
+        key = self.key_for(token)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, token, claims, value=None):
+        """Guarda `value` (por defecto los claims) hasta el `exp` de los claims."""
+        if self.max_entries <= 0:
+            return
+
+        exp = claims.get('exp')
+        if not isinstance(exp, (int, float)):
+            return
+
+        key = self.key_for(token)
+
+        with self._lock:
+            self._entries[key] = (exp, claims if value is None else value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
@@ -1,11 +1,25 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from products.events import product_events
 from products.views import ProductViewSet
 
 router = DefaultRouter()
 router.register(r'', ProductViewSet, basename='product')
 
 urlpatterns = [
+    # Antes del router: `events/` coincidiría con el detalle de producto
+    path('events/', product_events, name='product-events'),
     path('', include(router.urls)),
 ]
 
+if getattr(settings, 'PRODUCTS_ASYNC_READS', False):
+    from products import async_views
+
+    # Listado y detalle por vistas async; el router sigue atendiendo las
+    # acciones adicionales (bulk, export, ...)
+    urlpatterns = [
+        path('', async_views.product_collection, name='product-list-async'),
+        path('<int:pk>/', async_views.product_item, name='product-detail-async'),
+    ] + urlpatterns
+
@@ -2,46 +2,101 @@ import jwt
 import logging
 from django.conf import settings
 
+from products.jwks import ASYMMETRIC_ALGORITHMS, get_keyset
+from products.token_cache import VerifiedTokenCache
+
 logger = logging.getLogger(__name__)
 
+token_cache = VerifiedTokenCache(max_entries=getattr(settings, 'JWT_CACHE_MAX_ENTRIES', 10000))
+
+
+def signing_key_for(token):
+    """
+    Clave y opciones de verificación según la cabecera del token.
+
+    Tokens RS256/ES256 del proveedor de identidad: clave pública del JWKS
+    por `kid`, restringida al algoritmo de esa clave. El resto: secreto
+    compartido con `JWT_ALGORITHM`.
+    """
+    header = jwt.get_unverified_header(token)
+    algorithm = header.get('alg')
+    if algorithm not in ASYMMETRIC_ALGORITHMS:
+        return settings.JWT_SECRET_KEY, [settings.JWT_ALGORITHM], {}
+
+    keyset = get_keyset()
+    if keyset is None:
+        raise jwt.InvalidAlgorithmError(f'Algoritmo {algorithm} sin JWKS configurado')
+    signing_key = keyset.get(header.get('kid'))
+    if signing_key is None:
+        raise jwt.InvalidTokenError(f"kid desconocido: {header.get('kid')!r}")
+    if signing_key.algorithm != algorithm:
+        raise jwt.InvalidAlgorithmError(f'Algoritmo {algorithm} no corresponde a la clave {signing_key.kid}')
+
+    options = {}
+    if getattr(settings, 'JWT_AUDIENCE', None):
+        options['audience'] = settings.JWT_AUDIENCE
+    if getattr(settings, 'JWT_ISSUER', None):
+        options['issuer'] = settings.JWT_ISSUER
+    return signing_key.key, [signing_key.algorithm], options
+
 
 def decode_jwt_token(token):
     try:
-        payload = jwt.decode(
-            token,
-            settings.JWT_SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM]
-        )
+        key, algorithms, options = signing_key_for(token)
+        payload = jwt.decode(token, key, algorithms=algorithms, **options)
         return payload
     except jwt.ExpiredSignatureError:
-        logger.warning("Token JWT expirado")
+        logger.warning("Token JWT expirado", extra={'event': 'expired_token'})
         return None
     except jwt.InvalidTokenError as e:
-        logger.warning(f"Token JWT inválido: {e}")
+        logger.warning("Token JWT inválido: %s", e, extra={'event': 'invalid_token'})
         return None
     except Exception as e:
-        logger.error(f"Error al decodificar token JWT: {e}")
+        logger.error("Error al decodificar token JWT: %s", e, extra={'event': 'invalid_token'})
         return None
 
 
-def extract_role_from_token(token):
-    payload = decode_jwt_token(token)
-    if payload:
-        role = payload.get('role') or payload.get('roles') or payload.get('http://schemas.microsoft.com/ws/2008/06/identity/claims/role')
-        if isinstance(role, list) and len(role) > 0:
-            role = role[0]
-        return role
-    return None
+# Claims donde distintos emisores ponen el rol o la lista de roles
+ROLE_CLAIMS = ('role', 'roles', 'http://schemas.microsoft.com/ws/2008/06/identity/claims/role')
+
+
+def extract_roles_from_payload(payload):
+    """Roles del token, sin duplicados y en orden (el primero es el principal)."""
+    roles = []
+    for claim in ROLE_CLAIMS:
+        value = payload.get(claim)
+        if not value:
+            continue
+        for role in value if isinstance(value, list) else [value]:
+            if isinstance(role, str) and role not in roles:
+                roles.append(role)
+    return tuple(roles)
+
+
+def build_user_info(payload):
+    roles = extract_roles_from_payload(payload)
+    return {
+        'username': payload.get('sub') or payload.get('username') or payload.get('email'),
+        'role': roles[0] if roles else None,
+        'roles': roles,
+        'email': payload.get('email'),
+        'user_id': payload.get('sub') or payload.get('user_id'),
+        'expires_at': payload.get('exp'),
+    }
 
 
 def extract_user_info_from_token(token):
-    payload = decode_jwt_token(token)
-    if payload:
-        return {
-            'username': payload.get('sub') or payload.get('username') or payload.get('email'),
-            'role': extract_role_from_token(token),
-            'email': payload.get('email'),
-            'user_id': payload.get('sub') or payload.get('user_id'),
-        }
-    return None
+    # Los claims se interpretan una vez por token: la caché guarda el resultado
+    user_info = token_cache.get(token)
+    if user_info is None:
+        payload = decode_jwt_token(token)
+        if not payload:
+            return None
+        user_info = build_user_info(payload)
+        token_cache.set(token, payload, user_info)
+    return user_info
+
 
+def extract_role_from_token(token):
+    user_info = extract_user_info_from_token(token)
+    return user_info['role'] if user_info else None
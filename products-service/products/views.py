@@ -1,12 +1,37 @@
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 import logging
+from time import perf_counter
 
-from products.models import Product
-from products.serializers import ProductSerializer
-from products.permissions import IsAdminOrReadOnly
+from products import audit
+from products import cache as product_cache
+from products import events
+from products import inventory
+from products import metrics
+from products.bulk import delete_products, upsert_products
+from products.changes import encode_tombstone, read_changes, record_deletions, start_positions
+from products.export import CONTENT_TYPES, STREAMERS, export_queryset
+from products.filters import ProductFilterBackend
+from products.models import AuditEntry, Product
+from products.pagination import ProductCursorPagination
+from products.stock import StockMovementRejected, apply_movements, validate_movements
+from products.serializers import (
+    AuditEntrySerializer,
+    AuditQuerySerializer,
+    InventorySummarySerializer,
+    ProductBulkDeleteSerializer,
+    ProductSerializer,
+    get_read_encoder,
+    parse_sparse_fields,
+)
+from products.permissions import PolicyPermission
 
 logger = logging.getLogger(__name__)
 
@@ -14,11 +39,54 @@ logger = logging.getLogger(__name__)
 class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
-    permission_classes = [IsAdminOrReadOnly]
+    permission_classes = [PolicyPermission]
+    pagination_class = ProductCursorPagination
+    filter_backends = [ProductFilterBackend]
     
     def get_queryset(self):
         return Product.objects.all()
     
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            super().perform_create(serializer)
+            inventory.record(after=[(serializer.instance.quantity, serializer.instance.price)])
+        product_cache.invalidate()
+        events.publish_on_commit('product.created', serializer.data)
+        audit.record_on_commit(
+            self.request, 'product.create', product_id=serializer.instance.id, sku=serializer.instance.sku,
+            detail={'data': serializer.validated_data},
+        )
+    
+    def perform_update(self, serializer):
+        instance = serializer.instance
+        before = {field: getattr(instance, field) for field in serializer.validated_data}
+        with transaction.atomic():
+            current = inventory.current_values(Product.objects.filter(pk=instance.pk))
+            super().perform_update(serializer)
+            inventory.record(before=current, after=[(instance.quantity, instance.price)])
+        product_cache.invalidate()
+        events.publish_on_commit('product.updated', serializer.data)
+        audit.record_on_commit(
+            self.request, 'product.update', product_id=instance.id, sku=instance.sku,
+            detail={'changes': {
+                field: [before[field], value] for field, value in serializer.validated_data.items()
+                if before[field] != value
+            }},
+        )
+    
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            product_id, sku = instance.id, instance.sku
+            current = inventory.current_values(Product.objects.filter(pk=product_id))
+            super().perform_destroy(instance)
+            record_deletions([(product_id, sku)])
+            inventory.record(before=current)
+        product_cache.invalidate()
+        events.publish_on_commit('product.deleted', {'id': product_id, 'sku': sku})
+        audit.record_on_commit(
+            self.request, 'product.delete', product_id=product_id, sku=sku, detail={'name': instance.name},
+        )
+    
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         user_role = getattr(request, 'user_role', None)
@@ -26,8 +94,9 @@ class ProductViewSet(viewsets.ModelViewSet):
         username = user_info.get('username', 'unknown') if user_info else 'unknown'
         
         logger.info(
-            f"Intento de eliminación de producto ID={instance.id} "
-            f"por usuario '{username}' con rol '{user_role}'"
+            "Intento de eliminación de producto ID=%s por usuario '%s' con rol '%s'",
+            instance.id, username, user_role,
+            extra={'event': 'product_delete_attempt', 'product_id': instance.id, 'user': username, 'role': user_role},
         )
         
         try:
@@ -36,28 +105,286 @@ class ProductViewSet(viewsets.ModelViewSet):
             self.perform_destroy(instance)
             
             logger.info(
-                f"Producto eliminado exitosamente: ID={product_id}, Name={product_name} "
-                f"por usuario ADMIN '{username}'"
+                "Producto eliminado exitosamente: ID=%s, Name=%s por usuario '%s' con rol '%s'",
+                product_id, product_name, username, user_role,
+                extra={'event': 'product_deleted', 'product_id': product_id, 'user': username, 'role': user_role},
             )
             
             return Response(
                 status=status.HTTP_204_NO_CONTENT
             )
         except Exception as e:
-            logger.error(f"Error al eliminar producto: {e}")
+            logger.error(
+                "Error al eliminar producto: %s", e,
+                extra={'event': 'product_delete_failed', 'product_id': product_id, 'user': username},
+            )
+            audit.record(
+                request, 'product.delete', outcome=AuditEntry.OUTCOME_ERROR, product_id=instance.id,
+                sku=instance.sku, detail={'error': str(e)},
+            )
             return Response(
                 {"detail": f"Error al eliminar producto: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    def check_permissions(self, request):
+        start = perf_counter()
+        try:
+            super().check_permissions(request)
+        finally:
+            metrics.record('permission', start)
+    
+    def get_read_encoder(self):
+        return get_read_encoder(parse_sparse_fields(self.request.query_params.get('fields')))
+    
     def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        if isinstance(response.data, list):
-            response.data = response.data[:20]
-        return response
+        cache = product_cache.get_cache()
+        return product_cache.cached_response(
+            request,
+            product_cache.list_key(product_cache.get_version(cache), request),
+            lambda: self.read_list(request),
+        )
     
     def retrieve(self, request, *args, **kwargs):
-        return super().retrieve(request, *args, **kwargs)
+        cache = product_cache.get_cache()
+        return product_cache.cached_response(
+            request,
+            product_cache.detail_key(product_cache.get_version(cache), kwargs[self.lookup_field], request),
+            lambda: self.read_detail(request, kwargs[self.lookup_field]),
+        )
+    
+    # Camino rápido de lectura: values() + encoder precompilado en lugar de
+    # instanciar modelos y pasar por ProductSerializer; admite ?fields=
+    
+    def read_list(self, request):
+        encoder = self.get_read_encoder()
+        queryset = self.filter_queryset(self.get_queryset()).values(*encoder.query_fields)
+        page = self.paginate_queryset(queryset)
+        start = perf_counter()
+        data = [encoder.encode(row) for row in page]
+        metrics.record('serialize', start)
+        return self.get_paginated_response(data)
+    
+    def read_detail(self, request, pk):
+        encoder = self.get_read_encoder()
+        queryset = self.filter_queryset(self.get_queryset()).values(*encoder.query_fields)
+        row = get_object_or_404(queryset, pk=pk)
+        start = perf_counter()
+        data = encoder.encode(row)
+        metrics.record('serialize', start)
+        return Response(data)
+    
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_upsert(self, request):
+        items = request.data.get('products') if isinstance(request.data, dict) else request.data
+        max_items = getattr(settings, 'PRODUCTS_BULK_MAX_ITEMS', 10000)
+        
+        if not isinstance(items, list) or not items:
+            return Response(
+                {"detail": "Se espera una lista de productos no vacía"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > max_items:
+            return Response(
+                {"detail": f"El lote supera el máximo de {max_items} productos"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        results = upsert_products(items, getattr(settings, 'PRODUCTS_BULK_BATCH_SIZE', 1000))
+        summary = {'created': 0, 'updated': 0, 'invalid': 0}
+        for result in results:
+            summary[result['status']] += 1
+        
+        if summary['created'] or summary['updated']:
+            product_cache.invalidate()
+            events.publish_on_commit('resync', {'reason': 'bulk_upsert', **summary})
+        audit.record_on_commit(request, 'product.bulk_upsert', detail={
+            'summary': summary, 'skus': [result['sku'] for result in results if result['status'] != 'invalid'],
+        })
+        
+        user_info = getattr(request, 'user_info', None) or {}
+        logger.info(
+            "Carga masiva por usuario '%s': %d creados, %d actualizados, %d inválidos",
+            user_info.get('username', 'unknown'), summary['created'], summary['updated'], summary['invalid'],
+            extra={'event': 'bulk_upsert', 'user': user_info.get('username', 'unknown'), 'counts': summary},
+        )
+        
+        if not summary['invalid']:
+            response_status = status.HTTP_200_OK
+        elif summary['created'] or summary['updated']:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'summary': summary, 'results': results}, status=response_status)
+    
+    @action(detail=False, methods=['post'], url_path='bulk-delete')
+    def bulk_delete(self, request):
+        serializer = ProductBulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        skus = serializer.validated_data['skus']
+        
+        max_items = getattr(settings, 'PRODUCTS_BULK_MAX_ITEMS', 10000)
+        if len(ids) + len(skus) > max_items:
+            return Response(
+                {"detail": f"El lote supera el máximo de {max_items} productos"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        rows = delete_products(ids, skus)
+        deleted = len(rows)
+        if deleted:
+            product_cache.invalidate()
+            events.publish_on_commit('resync', {'reason': 'bulk_delete', 'deleted': deleted})
+        audit.record_on_commit(request, 'product.bulk_delete', detail={
+            'ids': [pk for pk, _ in rows], 'skus': [sku for _, sku in rows],
+        })
+        
+        user_info = getattr(request, 'user_info', None) or {}
+        logger.info(
+            "Eliminación masiva por usuario '%s': %d productos eliminados",
+            user_info.get('username', 'unknown'), deleted,
+            extra={'event': 'bulk_delete', 'user': user_info.get('username', 'unknown'), 'deleted': deleted},
+        )
+        return Response({'deleted': deleted}, status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['post'], url_path='stock-movements')
+    def stock_movements(self, request):
+        if isinstance(request.data, dict):
+            items = request.data.get('movements')
+            allow_negative = bool(request.data.get('allow_negative', False))
+        else:
+            items, allow_negative = request.data, False
+        max_items = getattr(settings, 'PRODUCTS_BULK_MAX_ITEMS', 10000)
+        
+        if not isinstance(items, list) or not items:
+            return Response(
+                {"detail": "Se espera una lista de movimientos no vacía"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > max_items:
+            return Response(
+                {"detail": f"El lote supera el máximo de {max_items} movimientos"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        deltas = validate_movements(items)
+        try:
+            quantities = apply_movements(
+                deltas, allow_negative=allow_negative,
+                batch_size=getattr(settings, 'PRODUCTS_BULK_BATCH_SIZE', 1000),
+            )
+        except StockMovementRejected as exc:
+            return Response(exc.data, status=exc.status_code)
+        product_cache.invalidate()
+        events.publish_products_on_commit(
+            'product.stock', [{'sku': sku, 'quantity': quantities[sku]} for sku in deltas],
+        )
+        audit.record_on_commit(request, 'stock.movement', detail={
+            'deltas': deltas, 'quantities': quantities, 'allow_negative': allow_negative,
+        })
+        
+        user_info = getattr(request, 'user_info', None) or {}
+        logger.info(
+            "Movimiento de stock por usuario '%s': %d movimientos sobre %d SKUs",
+            user_info.get('username', 'unknown'), len(items), len(deltas),
+            extra={'event': 'stock_movement', 'user': user_info.get('username', 'unknown'),
+                   'movements': len(items), 'skus': len(deltas)},
+        )
+        return Response({
+            'movements': len(items),
+            'products': [{'sku': sku, 'quantity': quantities[sku]} for sku in deltas],
+        }, status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        # `format` lo reserva DRF para la negociación de contenido
+        output = request.query_params.get('output', 'ndjson')
+        if output not in STREAMERS:
+            return Response(
+                {"detail": f"Formato no soportado: {output}. Use 'ndjson' o 'csv'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        updated_since = request.query_params.get('updated_since')
+        if updated_since is not None:
+            try:
+                updated_since = parse_datetime(updated_since)
+            except ValueError:
+                updated_since = None
+            if updated_since is None:
+                return Response(
+                    {"detail": "updated_since debe ser una fecha ISO 8601"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if timezone.is_naive(updated_since):
+                updated_since = timezone.make_aware(updated_since)
+        
+        chunk_size = getattr(settings, 'PRODUCTS_EXPORT_CHUNK_SIZE', 2000)
+        response = StreamingHttpResponse(
+            STREAMERS[output](self.filter_queryset(export_queryset(updated_since)), chunk_size),
+            content_type=CONTENT_TYPES[output],
+        )
+        response['Content-Disposition'] = f'attachment; filename="products.{output}"'
+        return response
+    
+    @action(detail=False, methods=['get'], url_path='changes')
+    def changes(self, request):
+        positions = start_positions(request.query_params.get('cursor'), request.query_params.get('since'))
+        encoder = self.get_read_encoder()
+        products, tombstones, cursor, has_more = read_changes(
+            positions, self.paginator.get_page_size(request), encoder.query_fields,
+        )
+        start = perf_counter()
+        data = {
+            'results': [encoder.encode(row) for row in products],
+            'deleted': [encode_tombstone(row) for row in tombstones],
+            'cursor': cursor,
+            'has_more': has_more,
+        }
+        metrics.record('serialize', start)
+        return Response(data)
+    
+    @action(detail=False, methods=['get'], url_path='inventory')
+    def inventory_summary(self, request):
+        return Response(InventorySummarySerializer(inventory.summary()).data)
+    
+    @action(detail=False, methods=['get'], url_path='low-stock')
+    def low_stock(self, request):
+        # Bajo el umbral por defecto la consulta usa el índice parcial products_low_stock_idx
+        try:
+            below = int(request.query_params.get('below', inventory.get_threshold()))
+        except ValueError:
+            return Response(
+                {"detail": "below debe ser un número entero"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        cache = product_cache.get_cache()
+        return product_cache.cached_response(
+            request,
+            product_cache.list_key(product_cache.get_version(cache), request),
+            lambda: self.read_low_stock(request, below),
+        )
+    
+    def read_low_stock(self, request, below):
+        encoder = self.get_read_encoder()
+        queryset = self.filter_queryset(self.get_queryset().filter(quantity__lt=below)).values(*encoder.query_fields)
+        page = self.paginate_queryset(queryset)
+        start = perf_counter()
+        data = [encoder.encode(row) for row in page]
+        metrics.record('serialize', start)
+        return self.get_paginated_response(data)
+    
+    @action(detail=False, methods=['get'], url_path='audit')
+    def audit_trail(self, request):
+        filters = AuditQuerySerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        page = self.paginate_queryset(audit.filter_entries(filters.validated_data))
+        return self.get_paginated_response(AuditEntrySerializer(page, many=True).data)
+    
+    @action(detail=False, methods=['get'], url_path='cache-stats')
+    def cache_stats(self, request):
+        return Response(product_cache.stats.as_dict())
     
     def create(self, request, *args, **kwargs):
         return super().create(request, *args, **kwargs)
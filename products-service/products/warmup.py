@@ -0,0 +1,199 @@
+"""
+Calentamiento del servicio antes de atender tráfico (gunicorn.conf.py).
+
+La primera petición de un worker recién creado paga la compilación del
+resolver de URLs, la construcción de los campos de los serializers, la
+carga del JWKS y del backend criptográfico y la conexión a la DB. Aquí se
+hace antes de que llegue tráfico:
+
+- `prepare()`: todo lo que no abre conexiones ni hilos. Con `preload_app`
+  corre en el maestro antes del fork, así que los workers heredan el
+  resultado y lo comparten (copy-on-write).
+- `connect()`: conexión a la DB y a la caché, en cada worker (no se
+  comparten entre procesos).
+- `exercise()`: algunas peticiones por la pila completa (middleware, DRF,
+  paginación, renderer) en cada worker; después se ponen a cero las
+  métricas y contadores para que no cuenten como tráfico.
+"""
+import asyncio
+import inspect
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import Resolver404, get_resolver
+
+logger = logging.getLogger(__name__)
+
+# Rutas que se resuelven al preparar el proceso
+HOT_PATHS = [
+    '/api/products/', '/api/products/1/', '/api/products/stock-movements/', '/api/products/bulk/',
+    '/api/products/changes/', '/api/products/inventory/', '/api/products/events/', '/api/auth/test-users/',
+    '/metrics',
+]
+WARMUP_USER = 'warmup'
+
+
+def prepare():
+    """Calentamiento sin DB ni hilos: apto para el maestro antes del fork."""
+    from products import views  # noqa: F401  (importa serializers, filtros, paginación, exportación)
+    from products.jwks import get_keyset
+    from products.policy import get_policy
+    from products.serializers import (
+        AuditEntrySerializer,
+        InventorySummarySerializer,
+        ProductBulkDeleteSerializer,
+        ProductBulkItemSerializer,
+        ProductSerializer,
+        StockMovementSerializer,
+        get_read_encoder,
+        parse_sparse_fields,
+    )
+
+    resolver = get_resolver()
+    resolver.reverse_dict  # compila todos los patrones
+    for path in HOT_PATHS:
+        try:
+            resolver.resolve(path)
+        except Resolver404:
+            pass
+
+    # Los ModelSerializer inspeccionan el modelo al construir sus campos
+    for serializer_class in (
+        ProductSerializer, ProductBulkItemSerializer, ProductBulkDeleteSerializer, StockMovementSerializer,
+        InventorySummarySerializer, AuditEntrySerializer,
+    ):
+        serializer_class().fields
+    get_read_encoder(parse_sparse_fields(None))
+
+    get_policy()
+    if getattr(settings, 'ADMISSION_CONTROL', False):
+        from products.admission import get_rules
+        get_rules()
+    # Claves públicas parseadas una vez en el maestro en lugar de en cada worker
+    get_keyset()
+    # Verificar un token propio carga los algoritmos de PyJWT
+    jwt.decode(mint_token(), settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+
+
+def connect():
+    """Conexiones de este proceso: DB (se reutiliza con CONN_MAX_AGE) y caché de productos."""
+    for alias in connections:
+        connections[alias].ensure_connection()
+    caches['products'].get('products:warmup')
+
+
+def close():
+    """
+    Cierra lo que no debe heredar un worker: sockets de DB y caché y el hilo
+    escritor de logs (cada worker arranca el suyo; un lock de su cola tomado
+    en el momento del fork quedaría tomado para siempre en el hijo).
+    """
+    from products.logging_utils import QueueLogHandler
+
+    connections.close_all()
+    for cache in caches.all(initialized_only=True):
+        cache.close()
+    for handler in logging.getLogger('products').handlers:
+        if isinstance(handler, QueueLogHandler):
+            handler.stop()
+
+
+def mint_token():
+    now = datetime.now(timezone.utc)
+    return jwt.encode(
+        {'sub': WARMUP_USER, 'username': WARMUP_USER, 'role': 'ADMIN', 'iat': now, 'exp': now + timedelta(minutes=5)},
+        settings.JWT_SECRET_KEY,
+        algorithm=settings.JWT_ALGORITHM,
+    )
+
+
+def exercise(application):
+    """
+    Peticiones de lectura por la pila completa de `application`, WSGI o ASGI.
+    La aplicación ASGI se ejercita con su propio bucle de eventos: su código
+    síncrono (ORM) corre en el mismo hilo que usará después con uvicorn, así
+    que la conexión a la DB de ese hilo también queda abierta.
+    """
+    from products import cache as product_cache
+    from products import metrics
+    from products.utils import token_cache
+
+    authorization = {'Authorization': f'Bearer {mint_token()}'}
+    requests = [
+        # Sin token: pasa por el middleware sin generar una denegación auditada
+        ('/api/auth/test-users/', {}),
+        ('/api/products/?page_size=1', authorization),
+        ('/api/products/?fields=id,sku,quantity&page_size=1', authorization),
+        ('/api/products/inventory/', authorization),
+    ]
+    call = _call_asgi if inspect.iscoroutinefunction(getattr(application, '__call__', None)) else _call_wsgi
+    start = time.perf_counter()
+    statuses = [
+        call(application, path, {**headers, 'X-Request-ID': f'warmup-{index}'})
+        for index, (path, headers) in enumerate(requests)
+    ]
+
+    # El calentamiento no es tráfico
+    metrics.registry.reset()
+    product_cache.stats.reset()
+    token_cache.clear()
+    logger.info(
+        "Worker calentado en %.1f ms (%s)", (time.perf_counter() - start) * 1000, ', '.join(statuses),
+        extra={'event': 'worker_warmed_up', 'statuses': statuses},
+    )
+    return statuses
+
+
+def _call_wsgi(application, path, headers):
+    environ = RequestFactory().get(
+        path, **{f"HTTP_{name.upper().replace('-', '_')}": value for name, value in headers.items()}
+    ).environ
+    response = []
+    body = application(environ, lambda status, response_headers, exc_info=None: response.append(status))
+    try:
+        b''.join(body)
+    finally:
+        getattr(body, 'close', lambda: None)()
+    return response[0].split()[0]
+
+
+def _call_asgi(application, path, headers):
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'localhost')] + [(name.lower().encode(), value.encode())
+                                                for name, value in headers.items()],
+        'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+    }
+    status = []
+
+    async def run():
+        sent = False
+        finished = asyncio.Event()
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # El cliente no se desconecta: se espera a que termine la respuesta
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(str(message['status']))
+            elif message['type'] == 'http.response.body' and not message.get('more_body'):
+                finished.set()
+
+        await application(scope, receive, send)
+
+    asyncio.run(run())
+    return status[0]
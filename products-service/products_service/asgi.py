@@ -0,0 +1,20 @@
+"""
+ASGI config for products_service project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Under ASGI the product list and detail GETs are served by async views
+(``PRODUCTS_ASYNC_READS``), so one process can hold many concurrent slow
+clients while it waits on the database.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'products_service.settings')
+os.environ.setdefault('PRODUCTS_ASYNC_READS', 'True')
+
+application = get_asgi_application()
@@ -35,14 +35,20 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Tiempos por etapa (Server-Timing y /metrics): primero para medir todo
+    'products.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Id de petición (X-Request-ID) para los logs estructurados
+    'products.middleware.RequestIdMiddleware',
+    # Middleware personalizado para JWT: va antes de sesiones/CSRF para que el
+    # rechazo temprano (403) de escrituras no autorizadas no pague su costo
+    'products.middleware.JWTAuthenticationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'products.middleware.JWTAuthenticationMiddleware',  # Middleware personalizado para JWT
 ]
 
 ROOT_URLCONF = 'products_service.urls'
@@ -64,6 +70,11 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'products_service.wsgi.application'
+ASGI_APPLICATION = 'products_service.asgi.application'
+
+# Listado y detalle de productos con vistas async (products/async_views.py).
+# products_service/asgi.py lo activa por defecto; en WSGI no aporta nada
+PRODUCTS_ASYNC_READS = os.environ.get('PRODUCTS_ASYNC_READS', 'False') == 'True'
 
 
 # Database
@@ -80,6 +91,87 @@ DATABASES = {
     }
 }
 
+# DB_ENGINE=sqlite usa un archivo SQLite local (DB_NAME) en lugar de
+# PostgreSQL; lo usan los benchmarks y las pruebas locales
+if os.environ.get('DB_ENGINE') == 'sqlite':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('DB_NAME', str(BASE_DIR / 'db.sqlite3')),
+    }
+
+# Conexiones persistentes: se reutilizan entre peticiones durante
+# DB_CONN_MAX_AGE segundos y se verifican antes de reutilizarlas
+for _database in DATABASES.values():
+    _database['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+    _database['CONN_HEALTH_CHECKS'] = True
+
+# Réplicas de lectura (products/db_router.py): DB_REPLICAS lista los hosts de
+# PostgreSQL (o, con DB_ENGINE=sqlite, los archivos) separados por comas. Cada
+# una recibe el alias replica1, replica2, ... con el resto de parámetros de
+# `default`
+DB_REPLICAS = [item for item in os.environ.get('DB_REPLICAS', '').split(',') if item]
+for _index, _replica in enumerate(DB_REPLICAS, start=1):
+    DATABASES[f'replica{_index}'] = dict(
+        DATABASES['default'],
+        **({'NAME': _replica} if os.environ.get('DB_ENGINE') == 'sqlite' else {'HOST': _replica}),
+    )
+
+if DB_REPLICAS:
+    DATABASE_ROUTERS = ['products.db_router.ReplicaRouter']
+    # Tras el JWT (usa el usuario para "leer lo propio")
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('products.middleware.JWTAuthenticationMiddleware') + 1,
+        'products.db_router.ReplicaRoutingMiddleware',
+    )
+
+# GET/HEAD bajo estas rutas pueden leer de una réplica
+REPLICA_READ_PATHS = ['/api/products/']
+# Una réplica sale de la rotación si su retraso supera este umbral (segundos)
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', '5'))
+REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL', '5'))
+# Tras escribir, las lecturas del mismo usuario van al primario este tiempo
+READ_YOUR_WRITES_SECONDS = int(os.environ.get('READ_YOUR_WRITES_SECONDS', '5'))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+#
+# `products` guarda las respuestas de lectura de la API. Con varios workers
+# hace falta un backend compartido (redis/memcached) para que la invalidación
+# llegue a todos: con `locmem` cada worker tendría su propia versión y los que
+# no atendieron la escritura seguirían sirviendo datos viejos, así que en ese
+# caso la caché de respuestas se desactiva.
+
+PRODUCTS_CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'dummy': 'django.core.cache.backends.dummy.DummyCache',
+}
+PRODUCTS_CACHE_BACKEND = os.environ.get('PRODUCTS_CACHE_BACKEND', 'locmem')
+# Procesos que atienden peticiones (gunicorn.conf.py lo exporta)
+SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', '1'))
+if PRODUCTS_CACHE_BACKEND == 'locmem' and SERVER_WORKERS > 1:
+    PRODUCTS_CACHE_BACKEND = 'dummy'
+PRODUCTS_CACHE_SHARED = PRODUCTS_CACHE_BACKEND in ('redis', 'memcached')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'products': {
+        'BACKEND': PRODUCTS_CACHE_BACKENDS[PRODUCTS_CACHE_BACKEND],
+        # URL del servidor para redis/memcached, p. ej. redis://10.0.0.5:6379/1
+        'LOCATION': os.environ.get('PRODUCTS_CACHE_LOCATION', 'products'),
+    },
+}
+
+if PRODUCTS_CACHE_BACKEND == 'locmem':
+    CACHES['products']['OPTIONS'] = {'MAX_ENTRIES': 10000}
+
+PRODUCTS_CACHE_ALIAS = 'products'
+PRODUCTS_CACHE_TIMEOUT = int(os.environ.get('PRODUCTS_CACHE_TIMEOUT', '300'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -134,11 +226,143 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Paginación por cursor del listado de productos
+PRODUCTS_PAGE_SIZE = int(os.environ.get('PRODUCTS_PAGE_SIZE', '20'))
+PRODUCTS_MAX_PAGE_SIZE = int(os.environ.get('PRODUCTS_MAX_PAGE_SIZE', '100'))
+
+# Endpoints masivos (/api/products/bulk/ y /api/products/bulk-delete/)
+PRODUCTS_BULK_MAX_ITEMS = int(os.environ.get('PRODUCTS_BULK_MAX_ITEMS', '10000'))
+PRODUCTS_BULK_BATCH_SIZE = int(os.environ.get('PRODUCTS_BULK_BATCH_SIZE', '1000'))
+
+# Feed de cambios (/api/products/changes/): sólo entrega cambios con más de
+# PRODUCTS_CHANGES_SETTLE_SECONDS (transacciones aún sin confirmar); las marcas
+# de eliminación se conservan PRODUCTS_TOMBSTONE_RETENTION_DAYS días
+# (manage.py purge_tombstones)
+PRODUCTS_CHANGES_SETTLE_SECONDS = float(os.environ.get('PRODUCTS_CHANGES_SETTLE_SECONDS', '2'))
+PRODUCTS_TOMBSTONE_RETENTION_DAYS = int(os.environ.get('PRODUCTS_TOMBSTONE_RETENTION_DAYS', '30'))
+
+# Resumen de inventario (products/inventory.py, /api/products/inventory/):
+# poco stock es quantity < PRODUCTS_LOW_STOCK_THRESHOLD (el índice parcial
+# products_low_stock_idx cubre hasta 10); el resumen se reparte en
+# PRODUCTS_INVENTORY_SLOTS filas para no serializar las escrituras en una
+PRODUCTS_LOW_STOCK_THRESHOLD = int(os.environ.get('PRODUCTS_LOW_STOCK_THRESHOLD', '10'))
+PRODUCTS_INVENTORY_SLOTS = int(os.environ.get('PRODUCTS_INVENTORY_SLOTS', '8'))
+
+# Eventos SSE (/api/products/events/): sólo en workers gthread o ASGI. Con
+# varios workers se usa el backend 'cache', que necesita una caché compartida
+# (PRODUCTS_CACHE_BACKEND=redis/memcached); 'local' sólo reparte los eventos
+# del propio proceso. Si no se cumple, el stream responde 503
+PRODUCTS_EVENTS_ENABLED = os.environ.get('PRODUCTS_EVENTS_ENABLED', 'True') == 'True'
+PRODUCTS_EVENTS_BACKENDS = {
+    'local': 'products.events.LocalBroker',
+    'cache': 'products.events.CacheBroker',
+}
+PRODUCTS_EVENTS_BACKEND = os.environ.get('PRODUCTS_EVENTS_BACKEND', 'cache' if SERVER_WORKERS > 1 else 'local')
+PRODUCTS_EVENTS_BUFFER = int(os.environ.get('PRODUCTS_EVENTS_BUFFER', '1000'))
+PRODUCTS_EVENTS_HEARTBEAT_SECONDS = float(os.environ.get('PRODUCTS_EVENTS_HEARTBEAT_SECONDS', '15'))
+PRODUCTS_EVENTS_STREAM_SECONDS = float(os.environ.get('PRODUCTS_EVENTS_STREAM_SECONDS', '300'))
+PRODUCTS_EVENTS_MAX_SUBSCRIBERS = int(os.environ.get('PRODUCTS_EVENTS_MAX_SUBSCRIBERS', '100'))
+PRODUCTS_EVENTS_POLL_INTERVAL = float(os.environ.get('PRODUCTS_EVENTS_POLL_INTERVAL', '0.5'))
+PRODUCTS_EVENTS_TTL = int(os.environ.get('PRODUCTS_EVENTS_TTL', '300'))
+# Escrituras que afectan a más productos publican un único `resync`
+PRODUCTS_EVENTS_MAX_PER_WRITE = int(os.environ.get('PRODUCTS_EVENTS_MAX_PER_WRITE', '100'))
+
+# Filas por bloque del cursor de /api/products/export/
+PRODUCTS_EXPORT_CHUNK_SIZE = int(os.environ.get('PRODUCTS_EXPORT_CHUNK_SIZE', '2000'))
+
 # JWT Configuration
 JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', SECRET_KEY)
 JWT_ALGORITHM = os.environ.get('JWT_ALGORITHM', 'HS256')
 
+# Tokens RS256/ES256 del proveedor de identidad: claves públicas de un archivo
+# JWKS o de un directorio con *.json/*.pem (products/jwks.py), por `kid`.
+# Se recargan si cambian los archivos; los kids desconocidos se recuerdan
+# JWT_JWKS_NEGATIVE_TTL segundos. JWT_AUDIENCE/JWT_ISSUER, si se indican, se
+# exigen a esos tokens
+JWT_JWKS_PATH = os.environ.get('JWT_JWKS_PATH', '')
+JWT_JWKS_CHECK_INTERVAL = float(os.environ.get('JWT_JWKS_CHECK_INTERVAL', '30'))
+JWT_JWKS_NEGATIVE_TTL = float(os.environ.get('JWT_JWKS_NEGATIVE_TTL', '60'))
+JWT_AUDIENCE = os.environ.get('JWT_AUDIENCE') or None
+JWT_ISSUER = os.environ.get('JWT_ISSUER') or None
+
+# Gateway de confianza (products/gateway.py): Kong ya verificó el JWT y
+# reenvía la identidad en cabeceras X-Identity-*, autenticadas con HMAC
+# (GATEWAY_HMAC_SECRETS, separados por comas) y/o por la IP del par
+# (GATEWAY_TRUSTED_PEERS, IPs o redes). Sin esas cabeceras se verifica el JWT
+GATEWAY_TRUSTED_IDENTITY = os.environ.get('GATEWAY_TRUSTED_IDENTITY', 'False') == 'True'
+GATEWAY_HMAC_SECRETS = [secret for secret in os.environ.get('GATEWAY_HMAC_SECRETS', '').split(',') if secret]
+GATEWAY_TRUSTED_PEERS = [peer for peer in os.environ.get('GATEWAY_TRUSTED_PEERS', '').split(',') if peer]
+
+# Registro de auditoría (products/audit.py): las entradas se encolan en el
+# proceso y un hilo las escribe en lotes de AUDIT_BATCH_SIZE o cada
+# AUDIT_FLUSH_INTERVAL segundos. Con la cola llena la petición espera hasta
+# AUDIT_ENQUEUE_TIMEOUT y luego escribe ella misma; al salir se espera hasta
+# AUDIT_SHUTDOWN_TIMEOUT a que se escriba lo pendiente
+AUDIT_ASYNC = os.environ.get('AUDIT_ASYNC', 'True') == 'True'
+AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', '10000'))
+AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', '500'))
+AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', '1.0'))
+AUDIT_ENQUEUE_TIMEOUT = float(os.environ.get('AUDIT_ENQUEUE_TIMEOUT', '1.0'))
+AUDIT_SHUTDOWN_TIMEOUT = float(os.environ.get('AUDIT_SHUTDOWN_TIMEOUT', '10'))
+
+# Política RBAC declarativa (rol, recurso, acción), compilada al arrancar
+# (products/policy.py); la aplican el middleware JWT y PolicyPermission
+RBAC_POLICY_FILE = os.environ.get('RBAC_POLICY_FILE', str(BASE_DIR / 'products' / 'policy.json'))
+
+# Rutas donde el middleware JWT rechaza directamente (403) lo que la política
+# no permite, antes de llegar a la vista
+RBAC_FAST_REJECT_PATHS = ['/api/products/']
+
+# Control de admisión (products/admission.py): límites por usuario/rol de
+# ADMISSION_RULES_FILE (429) y como mucho ADMISSION_MAX_CONCURRENT peticiones
+# simultáneas por worker en ADMISSION_PATHS (503, 0 = sin límite). Los
+# contadores son por worker ('local') o compartidos en la caché 'products'
+# ('cache', con PRODUCTS_CACHE_BACKEND=redis/memcached)
+ADMISSION_CONTROL = os.environ.get('ADMISSION_CONTROL', 'False') == 'True'
+ADMISSION_RULES_FILE = os.environ.get('ADMISSION_RULES_FILE', str(BASE_DIR / 'products' / 'ratelimits.json'))
+ADMISSION_BACKENDS = {
+    'local': 'products.admission.LocalBuckets',
+    'cache': 'products.admission.CacheBuckets',
+}
+ADMISSION_BACKEND = os.environ.get('ADMISSION_BACKEND', 'local')
+ADMISSION_MAX_KEYS = int(os.environ.get('ADMISSION_MAX_KEYS', '10000'))
+ADMISSION_MAX_CONCURRENT = int(os.environ.get('ADMISSION_MAX_CONCURRENT', '0'))
+ADMISSION_PATHS = ['/api/products/']
+ADMISSION_EXEMPT_PATHS = ['/api/products/events/']
+ADMISSION_RETRY_AFTER = int(os.environ.get('ADMISSION_RETRY_AFTER', '1'))
+
+if ADMISSION_CONTROL:
+    # Tras el JWT (límites por usuario y rol) y antes de elegir réplica
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('products.middleware.JWTAuthenticationMiddleware') + 1,
+        'products.admission.AdmissionMiddleware',
+    )
+
+# Cabecera Server-Timing con el tiempo de cada etapa (jwt, permission, cache,
+# db, serialize, render); /metrics expone los histogramas en formato
+# Prometheus, restringido a METRICS_ALLOWED_IPS si se indica
+PRODUCTS_SERVER_TIMING = os.environ.get('PRODUCTS_SERVER_TIMING', 'True') == 'True'
+METRICS_ALLOWED_IPS = [ip for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip]
+
+# Caché de tokens verificados por worker (0 la desactiva)
+JWT_CACHE_MAX_ENTRIES = int(os.environ.get('JWT_CACHE_MAX_ENTRIES', '10000'))
+
 # Logging configuration
+# Logs del servicio (logger 'products'): JSON con request_id, escritos por un
+# hilo aparte (products/logging_utils.py). LOG_SAMPLE_RATES muestrea eventos
+# de alto volumen, p. ej. "access_granted=0.01,authenticated=0.01"; las
+# denegaciones y eliminaciones se registran siempre
+LOG_SAMPLE_RATES = {
+    event: float(rate)
+    for event, _, rate in (
+        item.partition('=')
+        for item in os.environ.get(
+            'LOG_SAMPLE_RATES', 'access_granted=0.01,authenticated=0.01,request_throttled=0.01,request_shed=0.01',
+        ).split(',')
+        if item
+    )
+}
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -147,12 +371,30 @@ LOGGING = {
             'format': '{levelname} {asctime} {module} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'products.logging_utils.JSONFormatter',
+        },
+    },
+    'filters': {
+        'sampling': {
+            '()': 'products.logging_utils.EventSamplingFilter',
+            'rates': LOG_SAMPLE_RATES,
+        },
+        'logged_response': {
+            '()': 'products.logging_utils.LoggedResponseFilter',
+        },
     },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
         },
+        'products_queue': {
+            '()': 'products.logging_utils.QueueLogHandler',
+            'queue_size': int(os.environ.get('LOG_QUEUE_SIZE', 10000)),
+            'formatter': 'json',
+            'filters': ['sampling'],
+        },
     },
     'root': {
         'handlers': ['console'],
@@ -160,10 +402,14 @@ LOGGING = {
     },
     'loggers': {
         'products': {
-            'handlers': ['console'],
-            'level': 'INFO',
+            'handlers': ['products_queue'],
+            'level': os.environ.get('LOG_LEVEL', 'INFO'),
             'propagate': False,
         },
+        'django.request': {
+            'filters': ['logged_response'],
+        },
     },
 }
 
+
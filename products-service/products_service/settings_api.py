@@ -0,0 +1,41 @@
+"""
+Perfil "api" del servicio: sólo lo que necesita la API JSON.
+
+Parte de `settings` y quita admin, sesiones, mensajes, CSRF, plantillas y
+estáticos (la autenticación es sólo JWT en JWTAuthenticationMiddleware y DRF
+no tiene clases de autenticación). Menos apps y middleware significa menos
+imports al arrancar un worker y menos trabajo por petición. Se selecciona con
+
+    DJANGO_SETTINGS_MODULE=products_service.settings_api
+
+El frontend (`/`) y el admin (`/admin/`) sólo existen en el perfil completo.
+"""
+from products_service.settings import *  # noqa: F401,F403
+from products_service.settings import MIDDLEWARE, REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    'products',
+]
+
+# Sin sesiones ni usuarios de Django, estos middleware no aportan nada a la API
+_NOT_NEEDED = {
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+}
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware not in _NOT_NEEDED]
+
+ROOT_URLCONF = 'products_service.urls_api'
+
+TEMPLATES = []
+STATICFILES_DIRS = []
+
+REST_FRAMEWORK = dict(
+    REST_FRAMEWORK,
+    # Sin django.contrib.auth: request.user queda en None en lugar de AnonymousUser
+    UNAUTHENTICATED_USER=None,
+    # Las vistas declaran sus propios permisos (RBAC por JWT)
+    DEFAULT_PERMISSION_CLASSES=[],
+)
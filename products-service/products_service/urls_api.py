@@ -0,0 +1,13 @@
+"""
+URL configuration del perfil "api" (settings_api): sin admin ni frontend.
+"""
+from django.urls import path, include
+from products.auth_views import login, test_users
+from products.metrics import metrics_view
+
+urlpatterns = [
+    path('api/products/', include('products.urls')),
+    path('api/auth/login/', login, name='login'),
+    path('api/auth/test-users/', test_users, name='test-users'),
+    path('metrics', metrics_view, name='metrics'),
+]
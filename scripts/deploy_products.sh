@@ -11,13 +11,77 @@ DB_HOST="${DB_HOST:-localhost}"
 DB_NAME="${DB_NAME:-warehouse_db}"
 DB_USER="${DB_USER:-postgres}"
 DB_PASSWORD="${DB_PASSWORD:-TuPasswordSeguro123!}"
+# Hosts de réplicas de lectura separados por comas (vacío = sin réplicas)
+DB_REPLICAS="${DB_REPLICAS:-}"
 JWT_SECRET="${JWT_SECRET:-TuClaveSecretaJWT123!}"
+# Archivo o directorio JWKS del proveedor de identidad (tokens RS256/ES256)
+JWT_JWKS_PATH="${JWT_JWKS_PATH:-}"
+# Gateway de confianza: aceptar la identidad que reenvía Kong (X-Identity-*)
+# firmada con GATEWAY_HMAC_SECRETS y/o desde GATEWAY_TRUSTED_PEERS (IP de Kong)
+GATEWAY_TRUSTED_IDENTITY="${GATEWAY_TRUSTED_IDENTITY:-False}"
+GATEWAY_HMAC_SECRETS="${GATEWAY_HMAC_SECRETS:-}"
+GATEWAY_TRUSTED_PEERS="${GATEWAY_TRUSTED_PEERS:-}"
+# Control de admisión: límites por usuario/rol (products/ratelimits.json, 429)
+# y peticiones simultáneas por worker hacia la DB (503; 0 = sin límite)
+ADMISSION_CONTROL="${ADMISSION_CONTROL:-True}"
+ADMISSION_MAX_CONCURRENT="${ADMISSION_MAX_CONCURRENT:-32}"
+# Caché de respuestas compartida entre workers (redis local por defecto);
+# locmem sólo sirve con un worker (con varios se desactiva)
+PRODUCTS_CACHE_BACKEND="${PRODUCTS_CACHE_BACKEND:-redis}"
+PRODUCTS_CACHE_LOCATION="${PRODUCTS_CACHE_LOCATION:-redis://127.0.0.1:6379/1}"
+# Eventos SSE (/api/products/events/): 'cache' los reparte entre workers por
+# la caché compartida; 'local' sólo sirve con un worker
+PRODUCTS_EVENTS_ENABLED="${PRODUCTS_EVENTS_ENABLED:-True}"
+PRODUCTS_EVENTS_BACKEND="${PRODUCTS_EVENTS_BACKEND:-cache}"
 INSTALL_DIR="/opt/products-service"
+# wsgi: workers síncronos de gunicorn; asgi: workers uvicorn con lecturas async
+SERVER_MODE="${SERVER_MODE:-wsgi}"
+# auto: según las CPU disponibles (ver gunicorn.conf.py)
+WORKERS="${WORKERS:-auto}"
+# Hilos por worker wsgi (gthread si > 1). Un stream SSE ocupa un hilo entero:
+# con los eventos activos por defecto 8, con workers síncronos responden 503
+if [ "$PRODUCTS_EVENTS_ENABLED" = "True" ]; then
+    THREADS="${THREADS:-8}"
+else
+    THREADS="${THREADS:-1}"
+fi
+# Reciclado ordenado de cada worker tras N peticiones (0 = nunca)
+MAX_REQUESTS="${MAX_REQUESTS:-10000}"
+# full: perfil completo (admin y frontend); api: sólo la API JSON (settings_api)
+SETTINGS_PROFILE="${SETTINGS_PROFILE:-full}"
+if [ "$SETTINGS_PROFILE" = "api" ]; then
+    DJANGO_SETTINGS_MODULE=products_service.settings_api
+else
+    DJANGO_SETTINGS_MODULE=products_service.settings
+fi
+
+# Estado compartido entre workers: con más de uno, lo que vive en la memoria
+# de cada proceso no se ve desde los demás
+if [ "$WORKERS" != "1" ]; then
+    if [ "$PRODUCTS_CACHE_BACKEND" != "redis" ] && [ "$PRODUCTS_CACHE_BACKEND" != "memcached" ]; then
+        if [ "$PRODUCTS_EVENTS_ENABLED" = "True" ] && [ "$PRODUCTS_EVENTS_BACKEND" = "cache" ]; then
+            echo "❌ PRODUCTS_EVENTS_BACKEND=cache necesita PRODUCTS_CACHE_BACKEND=redis o memcached con WORKERS=$WORKERS"
+            exit 1
+        fi
+        echo "⚠️  PRODUCTS_CACHE_BACKEND=$PRODUCTS_CACHE_BACKEND no se comparte entre workers (WORKERS=$WORKERS): la caché de respuestas queda desactivada"
+    fi
+    if [ "$PRODUCTS_EVENTS_ENABLED" = "True" ] && [ "$PRODUCTS_EVENTS_BACKEND" = "local" ]; then
+        echo "❌ PRODUCTS_EVENTS_BACKEND=local pierde los eventos de los demás workers (WORKERS=$WORKERS); usar 'cache' o WORKERS=1"
+        exit 1
+    fi
+fi
+if [ "$PRODUCTS_EVENTS_ENABLED" = "True" ] && [ "$SERVER_MODE" = "wsgi" ] && [ "$THREADS" -le 1 ]; then
+    echo "⚠️  Con workers síncronos (THREADS=$THREADS) los streams SSE responden 503; usar THREADS > 1 o SERVER_MODE=asgi"
+fi
 
 # Instalar dependencias del sistema
 echo "📦 Instalando dependencias del sistema..."
 sudo apt-get update
 sudo apt-get install -y python3-pip python3-venv postgresql-client git nginx
+if [ "$PRODUCTS_CACHE_BACKEND" = "redis" ] && [ "$PRODUCTS_CACHE_LOCATION" = "redis://127.0.0.1:6379/1" ]; then
+    sudo apt-get install -y redis-server
+    sudo systemctl enable --now redis-server
+fi
 
 # Clonar repositorio
 echo "📥 Clonando repositorio..."
@@ -41,8 +105,8 @@ source venv/bin/activate
 # Instalar dependencias Python
 echo "📦 Instalando dependencias Python..."
 pip install --upgrade pip
+# Incluye gunicorn y uvicorn (SERVER_MODE=asgi) con versión fija
 pip install -r requirements.txt
-pip install gunicorn
 
 # Generar SECRET_KEY
 SECRET_KEY=$(python3 -c 'from django.core.management.utils import get_random_secret_key; print(get_random_secret_key())')
@@ -56,9 +120,25 @@ DB_HOST=$DB_HOST
 DB_NAME=$DB_NAME
 DB_USER=$DB_USER
 DB_PASSWORD=$DB_PASSWORD
+DB_REPLICAS=$DB_REPLICAS
 JWT_SECRET_KEY=$JWT_SECRET
 JWT_ALGORITHM=HS256
+JWT_JWKS_PATH=$JWT_JWKS_PATH
+GATEWAY_TRUSTED_IDENTITY=$GATEWAY_TRUSTED_IDENTITY
+GATEWAY_HMAC_SECRETS=$GATEWAY_HMAC_SECRETS
+GATEWAY_TRUSTED_PEERS=$GATEWAY_TRUSTED_PEERS
+ADMISSION_CONTROL=$ADMISSION_CONTROL
+ADMISSION_MAX_CONCURRENT=$ADMISSION_MAX_CONCURRENT
+PRODUCTS_CACHE_BACKEND=$PRODUCTS_CACHE_BACKEND
+PRODUCTS_CACHE_LOCATION=$PRODUCTS_CACHE_LOCATION
+PRODUCTS_EVENTS_ENABLED=$PRODUCTS_EVENTS_ENABLED
+PRODUCTS_EVENTS_BACKEND=$PRODUCTS_EVENTS_BACKEND
 ALLOWED_HOSTS=*
+DJANGO_SETTINGS_MODULE=$DJANGO_SETTINGS_MODULE
+SERVER_MODE=$SERVER_MODE
+GUNICORN_WORKERS=$WORKERS
+GUNICORN_THREADS=$THREADS
+GUNICORN_MAX_REQUESTS=$MAX_REQUESTS
 EOF
 
 # Cargar variables de entorno
@@ -77,7 +157,7 @@ echo "🔧 Configurando servicio systemd..."
 sudo tee /etc/systemd/system/products-service.service > /dev/null << EOF
 [Unit]
 Description=Products Service Gunicorn
-After=network.target
+After=network.target redis-server.service
 
 [Service]
 User=ubuntu
@@ -85,11 +165,10 @@ Group=ubuntu
 WorkingDirectory=$INSTALL_DIR/products-service
 Environment="PATH=$INSTALL_DIR/products-service/venv/bin"
 EnvironmentFile=$INSTALL_DIR/products-service/.env
-ExecStart=$INSTALL_DIR/products-service/venv/bin/gunicorn \\
-    --workers 2 \\
-    --bind 0.0.0.0:8000 \\
-    --timeout 120 \\
-    products_service.wsgi:application
+# Preload, calentamiento, workers y reciclado: gunicorn.conf.py (variables en .env)
+ExecStart=$INSTALL_DIR/products-service/venv/bin/gunicorn -c gunicorn.conf.py
+# HUP: recambio ordenado de workers; con preload no recarga el código (usar restart)
+ExecReload=/bin/kill -s HUP \$MAINPID
 
 [Install]
 WantedBy=multi-user.target
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Control de admisión (products/admission.py): límites por usuario/rol y de
+peticiones simultáneas.
+
+En proceso (django.test.Client, SQLite, ADMISSION_CONTROL=True) y con unas
+reglas pequeñas verifica que:
+  - cada usuario tiene su bucket y pasado el `burst` recibe 429 con
+    Retry-After, sin consultas a la DB; se recarga a `rate` por segundo;
+  - el límite de un rol lo comparten sus usuarios y `null` deja a un rol
+    sin límite; con varios roles vale el más amplio;
+  - cada método tiene su límite y lo rechazado por RBAC sigue siendo 403;
+  - pasado ADMISSION_MAX_CONCURRENT la respuesta es 503 con Retry-After, los
+    streams SSE quedan fuera y la exportación ocupa su lugar hasta cerrarse
+    (aunque no se lea) y los rechazos no dejan la línea de django.request;
+  - el backend `cache` comparte los contadores entre workers (en ASGI, fuera
+    del hilo del bucle) y, si la caché falla, deja pasar;
+  - /metrics cuenta los rechazos.
+
+Después mide el costo del middleware por petición (`admit`) con el backend
+local: sin reglas para la ruta, con dos buckets que pasan, rechazando y con
+--users usuarios distintos. Falla si supera --budget-us.
+
+    python3 tests/benchmarks/admision.py --requests 100000 --budget-us 15
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from harness import SERVICE_DIR, close_audit_trail, generate_tokens
+
+import jwt
+
+RULES = {
+    'routes': [
+        {'path': '/api/products/export/', 'limits': [{'key': 'user', 'rate': 1, 'burst': 1}]},
+        {'path': '/api/products/', 'methods': ['GET', 'HEAD'], 'limits': [
+            {'key': 'user', 'rate': 5, 'burst': 5, 'roles': {'SUPERVISOR': {'rate': 10, 'burst': 10}}},
+            {'key': 'role', 'rate': 0.01, 'burst': 12, 'roles': {'ADMIN': None}},
+        ]},
+        {'path': '/api/products/', 'methods': ['POST', 'PUT', 'PATCH', 'DELETE'], 'limits': [
+            {'key': 'user', 'rate': 0.01, 'burst': 2},
+        ]},
+    ],
+}
+
+
+def token(roles, username):
+    claims = {'sub': username, 'exp': int(time.time()) + 3600, 'roles': roles}
+    return jwt.encode(claims, generate_tokens.JWT_SECRET_KEY, algorithm=generate_tokens.JWT_ALGORITHM)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Control de admisión')
+    parser.add_argument('--requests', type=int, default=100000, help='Decisiones por medición')
+    parser.add_argument('--users', type=int, default=5000, help='Usuarios distintos en la medición')
+    parser.add_argument('--budget-us', type=float, default=15.0)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix='products-admision-'))
+    rules_file = workdir / 'ratelimits.json'
+    rules_file.write_text(json.dumps(RULES))
+    os.environ.update({
+        'DB_ENGINE': 'sqlite',
+        'DB_NAME': str(workdir / 'admision.sqlite3'),
+        'JWT_SECRET_KEY': generate_tokens.JWT_SECRET_KEY,
+        'DJANGO_SETTINGS_MODULE': 'products_service.settings',
+        'ADMISSION_CONTROL': 'True',
+        'ADMISSION_RULES_FILE': str(rules_file),
+    })
+    sys.path.insert(0, str(SERVICE_DIR))
+    try:
+        import django
+        django.setup()
+        # Rechazos y denegaciones a propósito
+        logging.disable(logging.WARNING)
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+        call_command('seed_products', count=50, verbosity=0)
+        failures = run(args)
+    finally:
+        close_audit_trail()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if failures:
+        print(f'\n❌ FALLO: {len(failures)} verificaciones fallidas')
+        return 1
+    print('\n✅ ÉXITO: control de admisión correcto')
+    return 0
+
+
+def run(args):
+    from django.db import connection
+    from django.test import Client, override_settings
+    from django.test.utils import CaptureQueriesContext
+    from products import admission
+
+    failures = []
+
+    def check(description, condition):
+        print(f"{'✅' if condition else '❌'} {description}")
+        if not condition:
+            failures.append(description)
+
+    def client(roles, username):
+        return Client(HTTP_AUTHORIZATION=f"Bearer {token(roles if isinstance(roles, list) else [roles], username)}")
+
+    def statuses(user, count, path='/api/products/'):
+        return [user.get(path).status_code for _ in range(count)]
+
+    # Por usuario
+    operario = client('OPERARIO', 'op-1')
+    check('OPERARIO: 5 lecturas (burst) -> 200', statuses(operario, 5) == [200] * 5)
+    with CaptureQueriesContext(connection) as queries:
+        response = operario.get('/api/products/')
+    check(f"6ª lectura -> {response.status_code}, Retry-After {response.get('Retry-After')}, "
+          f'{len(queries)} consultas', response.status_code == 429 and response['Retry-After'] == '1'
+          and not queries)
+    check('Otro usuario del mismo rol no se ve afectado', client('OPERARIO', 'op-2').get('/api/products/')
+          .status_code == 200)
+    time.sleep(0.25)
+    check('Tras 1/rate s se recarga una ficha', statuses(operario, 2) == [200, 429])
+    check('HEAD comparte el límite de GET', operario.head('/api/products/').status_code == 429)
+    check('Rutas sin reglas no se limitan', statuses(operario, 3, '/api/auth/test-users/') == [200] * 3)
+    check('SUPERVISOR con su propio límite: 10 lecturas', statuses(client('SUPERVISOR', 'sup-1'), 11)
+          == [200] * 10 + [429])
+
+    # Por rol: OPERARIO lleva 7 de 12 (lo rechazado por usuario no gasta del rol)
+    fresh = [client('OPERARIO', f'op-{index}').get('/api/products/').status_code for index in range(3, 9)]
+    check(f'Límite del rol compartido por sus usuarios: {fresh}', fresh == [200] * 5 + [429])
+    admin = client('ADMIN', 'admin-1')
+    check('ADMIN sin límite de rol; su límite de usuario sí aplica', statuses(admin, 6) == [200] * 5 + [429])
+    multi = client(['OPERARIO', 'ADMIN'], 'multi-1')
+    check('Varios roles: vale el más amplio (ADMIN sin límite de rol)', statuses(multi, 5) == [200] * 5)
+
+    # Por método
+    created = [admin.post('/api/products/', {'name': 'a', 'sku': f'ADM-{index}', 'quantity': 1, 'price': '1.00'},
+                          content_type='application/json').status_code for index in range(3)]
+    check(f'Escrituras con su propio límite: {created}', created == [201, 201, 429])
+    check('Sin permiso sigue siendo 403 (RBAC antes del límite)',
+          client('OPERARIO', 'op-write').delete('/api/products/1/').status_code == 403)
+    check('Sin token sigue siendo 403', Client().get('/api/products/').status_code == 403)
+    check('Exportación con límite propio', statuses(client('ADMIN', 'admin-export'), 2, '/api/products/export/')
+          == [200, 429])
+
+    # Simultaneidad
+    with override_settings(ADMISSION_MAX_CONCURRENT=2):
+        reader = client('ADMIN', 'admin-concurrency')
+        admission.in_flight.acquire(2)
+        admission.in_flight.acquire(2)
+        response = reader.get('/api/products/')
+        check(f"Con 2 peticiones en curso (máx. 2) -> {response.status_code}, "
+              f"Retry-After {response.get('Retry-After')}", response.status_code == 503
+              and response['Retry-After'] == '1')
+        stream = reader.get('/api/products/events/', **{'wsgi.multithread': True})
+        check(f'Streams SSE fuera del límite -> {stream.status_code}', stream.status_code == 200)
+        stream.close()
+        check('Rutas fuera de ADMISSION_PATHS no se limitan', reader.get('/api/auth/test-users/').status_code == 200)
+        admission.in_flight.release()
+        admission.in_flight.release()
+        check('Al liberarse vuelve a atender', reader.get('/api/products/').status_code == 200
+              and admission.in_flight.value == 0)
+        export = client('ADMIN', 'admin-export-2').get('/api/products/export/')
+        holding = admission.in_flight.value
+        b''.join(export.streaming_content)
+        export.close()
+        check(f'La exportación ocupa su lugar hasta cerrarse ({holding} -> {admission.in_flight.value})',
+              holding == 1 and admission.in_flight.value == 0)
+        export = client('ADMIN', 'admin-export-3').get('/api/products/export/')
+        holding = admission.in_flight.value
+        export.close()
+        check(f'Cerrada sin leerla también lo libera ({holding} -> {admission.in_flight.value})',
+              holding == 1 and admission.in_flight.value == 0)
+
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        request_logger = logging.getLogger('django.request')
+        request_logger.addHandler(handler)
+        request_logger.propagate = False
+        logging.disable(logging.NOTSET)
+        try:
+            admission.in_flight.acquire(2)
+            admission.in_flight.acquire(2)
+            shed = reader.get('/api/products/')
+            admission.in_flight.release()
+            admission.in_flight.release()
+            missing = reader.get('/api/products/999999/')
+        finally:
+            logging.disable(logging.WARNING)
+            request_logger.propagate = True
+            request_logger.removeHandler(handler)
+        logged = [record.status_code for record in records]
+        check(f'Sin línea de django.request por rechazo ({shed.status_code}, {missing.status_code} -> {logged})',
+              shed.status_code == 503 and logged == [missing.status_code])
+
+    # Backend compartido
+    limit = admission.Limit(1, 3)
+    workers = [admission.CacheBuckets(), admission.CacheBuckets()]
+    shared = [workers[index % 2].take('bench:shared', limit) == 0 for index in range(4)]
+    check(f'Backend cache: dos workers comparten el bucket ({shared})', shared == [True, True, True, False])
+
+    async def async_takes():
+        # La caché se cuenta por hilo: en ASGI ningún incr/add en el hilo del bucle
+        loop_thread, calls = threading.get_ident(), []
+        cache_class = type(workers[0].get_cache())
+
+        def spy(method):
+            def wrapper(self, *args, **kwargs):
+                calls.append(threading.get_ident())
+                return method(self, *args, **kwargs)
+            return wrapper
+
+        with mock.patch.object(cache_class, 'incr', spy(cache_class.incr)), \
+                mock.patch.object(cache_class, 'add', spy(cache_class.add)):
+            taken = [await workers[index % 2].atake('bench:async', limit) == 0 for index in range(4)]
+        return taken, calls.count(loop_thread), len(calls)
+
+    taken, on_loop, total = asyncio.run(async_takes())
+    check(f'Backend cache en ASGI: incr atómico fuera del bucle ({taken}, {on_loop}/{total} accesos en el bucle)',
+          taken == [True, True, True, False] and total and not on_loop)
+
+    class BrokenCache:
+        def incr(self, *args, **kwargs):
+            raise ConnectionError('caché caída')
+        add = incr
+
+    errors = admission.stats.backend_errors
+    admission._buckets = admission.CacheBuckets()
+    admission._buckets.get_cache = BrokenCache
+    passed = statuses(client('OPERARIO', 'op-broken'), 3)
+    check(f'Caché caída: se deja pasar {passed} y se cuentan los errores (dos buckets por petición)',
+          passed == [200] * 3 and admission.stats.backend_errors == errors + 6)
+    admission.reset()
+
+    metrics = Client().get('/metrics').content.decode()
+    check('/metrics expone products_admission_*', 'products_admission_in_flight' in metrics
+          and 'products_admission_throttled_total' in metrics)
+
+    failures += overhead(args, admission)
+    return failures
+
+
+class FakeRequest:
+    method = 'GET'
+    META = {'REMOTE_ADDR': '10.0.0.1'}
+
+    def __init__(self, path, username, roles):
+        self.path_info = path
+        self.user_info = {'username': username, 'roles': roles}
+        self.user_role = roles[0]
+        self.user_roles = roles
+
+
+def decision_us(middleware, requests, count, rounds=3):
+    best = float('inf')
+    for _ in range(rounds):
+        begin = time.perf_counter()
+        for index in range(count):
+            _, release = middleware.admit(requests[index % len(requests)])
+            if release is not None:
+                release()
+        best = min(best, time.perf_counter() - begin)
+    return best / count * 1e6
+
+
+def overhead(args, admission):
+    from django.test import Client, override_settings
+    from harness import percentile
+
+    failures = []
+
+    def check(description, condition):
+        print(f"{'✅' if condition else '❌'} {description}")
+        if not condition:
+            failures.append(description)
+
+    rules = {'routes': [{'path': '/api/products/', 'limits': [
+        {'key': 'user', 'rate': 1e9, 'burst': 10 ** 9},
+        {'key': 'role', 'rate': 1e9, 'burst': 10 ** 9},
+    ]}, {'path': '/api/products/export/', 'limits': [{'key': 'user', 'rate': 0.001, 'burst': 1}]}]}
+    admission.reset()
+    admission._rules = admission.AdmissionRules.compile(rules)
+
+    with override_settings(ADMISSION_MAX_CONCURRENT=0):
+        middleware = admission.AdmissionMiddleware(lambda request: None)
+    with override_settings(ADMISSION_MAX_CONCURRENT=64):
+        concurrency = admission.AdmissionMiddleware(lambda request: None)
+    reader = [FakeRequest('/api/products/', 'u', ['OPERARIO'])]
+    passing = {
+        'ruta sin reglas': (middleware, [FakeRequest('/api/auth/test-users/', 'u', ['OPERARIO'])]),
+        'dos buckets que pasan': (middleware, reader),
+        f'{args.users} usuarios distintos': (middleware, [
+            FakeRequest('/api/products/', f'u{index}', ['OPERARIO']) for index in range(args.users)]),
+        'buckets + simultaneidad': (concurrency, reader),
+    }
+    print(f"\n{'caso':<28}{'µs/petición':>14}")
+    results = {}
+    for name, (instance, requests) in passing.items():
+        results[name] = decision_us(instance, requests, args.requests)
+        print(f'{name:<28}{results[name]:>14.2f}')
+    rejection = decision_us(middleware, [FakeRequest('/api/products/export/', 'u', ['OPERARIO'])], args.requests)
+    print(f"{'rechazo (429 construido)':<28}{rejection:>14.2f}")
+    admission.reset()
+
+    worst = max(results.values())
+    check(f'Costo en las peticiones que pasan: como mucho {worst:.2f} µs (presupuesto {args.budget_us} µs)',
+          worst <= args.budget_us)
+
+    # Un cliente que recorre el listado con consultas distintas (sin aciertos de
+    # caché): el 429 sale sin llegar a la vista ni a la DB
+    with override_settings(ADMISSION_MAX_CONCURRENT=0):
+        flooder = Client(HTTP_AUTHORIZATION=f"Bearer {token(['OPERARIO'], 'scanner')}")
+        timings = {200: [], 429: []}
+        for index in range(400):
+            begin = time.perf_counter()
+            status = flooder.get('/api/products/', {'page_size': 50, 'search': f'p{index}'}).status_code
+            timings.setdefault(status, []).append((time.perf_counter() - begin) * 1000)
+    admission.reset()
+    ok, throttled = percentile(timings[200], 50), percentile(timings[429], 50)
+    print(f'\nInundación con un token: {len(timings[200])} x 200 (p50 {ok:.3f} ms), '
+          f'{len(timings[429])} x 429 (p50 {throttled:.3f} ms)')
+    check(f'El 429 cuesta una fracción de la petición atendida ({throttled:.3f} ms frente a {ok:.3f} ms)',
+          timings[429] and throttled < ok / 2)
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(main())
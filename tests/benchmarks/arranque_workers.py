@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Arranque de workers con gunicorn.conf.py: primera petición frente a régimen.
+
+Levanta el servicio con gunicorn (que carga products-service/gunicorn.conf.py)
+sin preload ni calentamiento y con la configuración por defecto (preload en el
+maestro y calentamiento de cada worker) y verifica que:
+
+  - con calentamiento, la primera petición autenticada a un worker recién
+    creado tarda lo mismo que en régimen (sin él paga resolver de URLs,
+    campos de serializers, JWT y conexión a la DB);
+  - con preload los workers comparten la memoria del maestro (PSS total
+    menor con --memory-workers workers);
+  - con GUNICORN_MAX_REQUESTS los workers se reciclan sin perder peticiones;
+  - la cantidad de workers por defecto sale de las CPU disponibles.
+
+    python3 tests/benchmarks/arranque_workers.py --rounds 3 --memory-workers 4
+
+Requiere gunicorn (y uvicorn para la variante ASGI).
+"""
+
+import argparse
+import asyncio
+import gc
+import importlib.util
+import os
+import runpy
+import statistics
+import sys
+import time
+
+from harness import SERVICE_DIR, HTTPConnection, LocalService, mint_token, percentile, request_once
+
+CONFIGS = {
+    'sin preload ni calentamiento': {'server': 'gunicorn', 'env': {'GUNICORN_PRELOAD': 'False',
+                                                                   'GUNICORN_WARMUP': 'False'}},
+    'preload + calentamiento': {'server': 'gunicorn', 'env': {}},
+    'ASGI preload + calentamiento': {'server': 'uvicorn', 'env': {'PRODUCTS_ASYNC_READS': 'True'}},
+}
+PATH = '/api/products/?page_size=20'
+
+
+def timed(coroutine):
+    start = time.perf_counter()
+    status, _, _ = asyncio.run(coroutine)
+    return status, (time.perf_counter() - start) * 1000
+
+
+async def sequential(base_url, count, headers):
+    connection = HTTPConnection(base_url)
+    samples, statuses = [], []
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            status, _, _ = await connection.request('GET', PATH, headers)
+            samples.append((time.perf_counter() - start) * 1000)
+            statuses.append(status)
+    finally:
+        await connection.close()
+    return samples, statuses
+
+
+def first_request(config, args, headers):
+    """Primera petición y p50 en régimen de un worker recién creado, en --rounds arranques."""
+    # Sin caché de respuestas: en régimen serían aciertos y la primera, un fallo
+    env = dict(config['env'], PRODUCTS_CACHE_BACKEND='dummy')
+    firsts, steady = [], []
+    for _ in range(args.rounds):
+        with LocalService(products=args.products, server=config['server'], workers=1, env=env) as service:
+            status, elapsed = timed(request_once(service.base_url, 'GET', PATH, headers))
+            if status != 200:
+                raise RuntimeError(f'Primera petición -> {status}')
+            firsts.append(elapsed)
+            samples, _ = asyncio.run(sequential(service.base_url, args.requests, headers))
+            steady.append(percentile(samples, 50))
+    return statistics.median(firsts), statistics.median(steady)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Arranque de workers: preload y calentamiento')
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=3, help='Arranques por configuración')
+    parser.add_argument('--requests', type=int, default=200, help='Peticiones en régimen por arranque')
+    parser.add_argument('--memory-workers', type=int, default=4)
+    parser.add_argument('--max-requests', type=int, default=40)
+    args = parser.parse_args()
+
+    if importlib.util.find_spec('gunicorn') is None:
+        print('❌ Falta gunicorn (pip install -r products-service/requirements.txt)')
+        return 1
+
+    failures = []
+
+    def check(description, condition):
+        print(f"{'✅' if condition else '❌'} {description}")
+        if not condition:
+            failures.append(description)
+
+    # Cantidad de workers por defecto
+    config = runpy.run_path(str(SERVICE_DIR / 'gunicorn.conf.py'))
+    gc.enable()  # el módulo lo desactiva pensando en el maestro de gunicorn
+    default_workers, cpus = config['default_workers'], config['available_cpus']()
+    check(f'CPU disponibles: {cpus} (de {os.cpu_count()})', 1 <= cpus <= os.cpu_count())
+    check('Workers por defecto: 2 x CPU + 1 síncronos, CPU + 1 gthread, CPU ASGI, con tope',
+          [default_workers('wsgi', 1, 4, 16), default_workers('wsgi', 4, 4, 16), default_workers('asgi', 1, 4, 16),
+           default_workers('wsgi', 1, 32, 16), default_workers('asgi', 1, 1, 16)] == [9, 5, 4, 16, 1])
+
+    headers = {'Authorization': f"Bearer {mint_token('ADMIN')}"}
+    configs = {name: config for name, config in CONFIGS.items()
+               if config['server'] != 'uvicorn' or importlib.util.find_spec('uvicorn')}
+    results = {name: first_request(config, args, headers) for name, config in configs.items()}
+
+    print(f"\n{'configuración':<32}{'1ª petición ms':>16}{'régimen p50 ms':>16}{'razón':>8}")
+    for name, (first, steady) in results.items():
+        print(f'{name:<32}{first:>16.2f}{steady:>16.2f}{first / steady:>8.1f}')
+    print()
+    cold_first, _ = results['sin preload ni calentamiento']
+    for name, (first, steady) in results.items():
+        if name != 'sin preload ni calentamiento':
+            check(f'{name}: 1ª petición {first:.2f} ms, régimen {steady:.2f} ms',
+                  first <= max(2 * steady, steady + 2))
+    warm_first, _ = results['preload + calentamiento']
+    check(f'Sin calentamiento la 1ª petición tarda más ({cold_first:.2f} ms frente a {warm_first:.2f} ms)',
+          cold_first > warm_first)
+
+    # Memoria compartida con preload
+    memory = {}
+    for name in ('sin preload ni calentamiento', 'preload + calentamiento'):
+        with LocalService(products=args.products, workers=args.memory_workers, env=CONFIGS[name]['env']) as service:
+            asyncio.run(sequential(service.base_url, 4 * args.memory_workers, headers))
+            memory[name] = (service.pss_bytes(), service.rss_bytes())
+    print(f"\n{'configuración':<32}{'PSS MiB':>10}{'RSS MiB':>10}  ({args.memory_workers} workers)")
+    for name, (pss, rss) in memory.items():
+        print(f'{name:<32}{pss / 2 ** 20:>10.1f}{rss / 2 ** 20:>10.1f}')
+    print()
+    check('Con preload la memoria total (PSS) es menor',
+          memory['preload + calentamiento'][0] < memory['sin preload ni calentamiento'][0])
+
+    # Reciclado de workers
+    env = {'GUNICORN_MAX_REQUESTS': str(args.max_requests), 'GUNICORN_MAX_REQUESTS_JITTER': '0'}
+    with LocalService(products=args.products, workers=1, env=env) as service:
+        count = 2 * args.max_requests + 10
+        samples, statuses = asyncio.run(sequential(service.base_url, count, headers))
+        time.sleep(0.5)
+        log = (service.workdir / 'server.log').read_text(errors='replace')
+    boots = log.count('Booting worker')
+    check(f'Reciclado cada {args.max_requests} peticiones: {boots - 1} reinicios de worker', boots >= 3)
+    check(f'{count} peticiones durante el reciclado, todas 200 (p50 {percentile(samples, 50):.2f} ms, '
+          f'máx. {max(samples):.2f} ms)', statuses == [200] * count)
+
+    if failures:
+        print(f'\n❌ FALLO: {len(failures)} verificaciones fallidas')
+        return 1
+    print('\n✅ ÉXITO: workers calentados desde la primera petición')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
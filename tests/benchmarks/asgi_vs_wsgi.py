@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark WSGI (workers síncronos de gunicorn) frente a ASGI (workers
+uvicorn con las vistas async de lectura).
+
+Levanta cada configuración con `LocalService`, lanza muchos clientes
+concurrentes contra el listado y el detalle, y reporta throughput,
+latencias y la memoria residente (maestro + workers). La caché de
+respuestas se desactiva (`PRODUCTS_CACHE_BACKEND=dummy`) para que cada
+petición llegue a la base de datos.
+
+Para comparar a igual memoria, ajustar --wsgi-workers/--asgi-workers hasta
+que el RSS reportado sea similar; la columna req/s por MB ya normaliza:
+
+    python3 tests/benchmarks/asgi_vs_wsgi.py --wsgi-workers 4 --asgi-workers 1 --concurrency 200
+
+Requiere gunicorn y uvicorn instalados.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import random
+import sys
+import time
+
+from harness import HTTPConnection, LocalService, mint_token, summarize
+
+CONFIGS = {
+    'wsgi': {'server': 'gunicorn', 'env': {'PRODUCTS_ASYNC_READS': 'False'}},
+    'asgi': {'server': 'uvicorn', 'env': {'PRODUCTS_ASYNC_READS': 'True'}},
+}
+
+
+async def load(base_url, args):
+    headers = {'Authorization': f"Bearer {mint_token('OPERARIO')}"}
+    samples = []
+    statuses = {}
+    errors = 0
+    remaining = args.requests
+    rng = random.Random(args.seed)
+
+    async def client():
+        nonlocal remaining, errors
+        connection = HTTPConnection(base_url)
+        try:
+            while remaining > 0:
+                remaining -= 1
+                if rng.random() < 0.5:
+                    path = f'/api/products/?page_size={args.page_size}'
+                else:
+                    path = f'/api/products/{rng.randint(1, args.products)}/'
+                start = time.perf_counter()
+                try:
+                    status, _, _ = await connection.request('GET', path, headers)
+                except (OSError, asyncio.IncompleteReadError, ValueError):
+                    await connection.close()
+                    status = 0
+                samples.append((time.perf_counter() - start) * 1000)
+                statuses[status] = statuses.get(status, 0) + 1
+                if status != 200:
+                    errors += 1
+        finally:
+            await connection.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    return summarize(samples, time.perf_counter() - start, statuses, errors)
+
+
+def run_config(name, workers, args):
+    config = CONFIGS[name]
+    env = dict(config['env'], PRODUCTS_CACHE_BACKEND='dummy')
+    service = LocalService(products=args.products, server=config['server'], workers=workers, env=env, seed=args.seed)
+    with service:
+        asyncio.run(load(service.base_url, argparse.Namespace(**dict(vars(args), requests=args.warmup))))
+        summary = asyncio.run(load(service.base_url, args))
+        rss = service.rss_bytes()
+    summary['workers'] = workers
+    summary['rss_mb'] = round(rss / (1024 * 1024), 1)
+    summary['rps_per_mb'] = round(summary['throughput_rps'] / summary['rss_mb'], 3) if rss else 0.0
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark WSGI vs ASGI')
+    parser.add_argument('--wsgi-workers', type=int, default=4)
+    parser.add_argument('--asgi-workers', type=int, default=1)
+    parser.add_argument('--concurrency', type=int, default=200, help='Clientes concurrentes')
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--warmup', type=int, default=200)
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Archivo JSON donde guardar los resultados')
+    args = parser.parse_args()
+
+    missing = [module for module in ('gunicorn', 'uvicorn') if importlib.util.find_spec(module) is None]
+    if missing:
+        print(f"❌ Faltan dependencias: {', '.join(missing)} (pip install -r products-service/requirements.txt)")
+        return 1
+
+    results = {
+        'wsgi': run_config('wsgi', args.wsgi_workers, args),
+        'asgi': run_config('asgi', args.asgi_workers, args),
+    }
+
+    print(f"\n{'modo':<6} {'workers':>7} {'RSS MB':>8} {'req/s':>9} {'req/s/MB':>9} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'errores':>8}")
+    for name, result in results.items():
+        latency = result['latency_ms']
+        print(f"{name:<6} {result['workers']:>7} {result['rss_mb']:>8} {result['throughput_rps']:>9} "
+              f"{result['rps_per_mb']:>9} {latency['p50']:>8} {latency['p99']:>8} {result['errors']:>8}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'\nResultados guardados en {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
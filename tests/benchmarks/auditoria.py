@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Registro de auditoría asíncrono por lotes (products/audit.py).
+
+En proceso (django.test.Client, SQLite) verifica que:
+  - las escrituras de la API y los accesos denegados dejan su entrada con
+    usuario, roles, request_id y detalle, y las revertidas no,
+  - /api/products/audit/ sólo lo lee AUDITOR/ADMIN, con filtros por
+    usuario, producto, acción, resultado y rango de fechas, paginado por
+    cursor, y las consultas por usuario y producto usan sus índices,
+  - las denegaciones anónimas no se auditan,
+  - no se pierde ninguna entrada: N envíos desde varios hilos -> N filas, con
+    la cola llena (contrapresión y escritura en la petición; desde el bucle
+    de eventos, en otro hilo sin bloquearlo), al cerrar el proceso con
+    entradas pendientes y, si la DB falla, quedan en el log,
+  - build_entry ajusta cada campo al modelo y una fila inválida va al log
+    sin hacer fallar a las demás de su lote.
+
+Mide además el costo de auditar en la petición: encolar frente a escribir
+la entrada en la propia petición (AUDIT_ASYNC=False).
+
+    python3 tests/benchmarks/auditoria.py --entries 5000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from harness import SERVICE_DIR, close_audit_trail, generate_tokens, mint_token, percentile
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Registro de auditoría asíncrono')
+    parser.add_argument('--entries', type=int, default=5000, help='Entradas de la prueba de completitud')
+    parser.add_argument('--requests', type=int, default=300, help='Peticiones por modo en la medición de latencia')
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix='products-auditoria-'))
+    os.environ.update({
+        'DB_ENGINE': 'sqlite',
+        'DB_NAME': str(workdir / 'auditoria.sqlite3'),
+        'JWT_SECRET_KEY': generate_tokens.JWT_SECRET_KEY,
+        'AUDIT_FLUSH_INTERVAL': '0.05',
+        'DJANGO_SETTINGS_MODULE': 'products_service.settings',
+    })
+    sys.path.insert(0, str(SERVICE_DIR))
+    try:
+        import django
+        django.setup()
+        # Sólo errores: las peticiones rechazadas a propósito registran advertencias
+        logging.disable(logging.WARNING)
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+        call_command('seed_products', count=20, verbosity=0)
+        failures = run(args)
+    finally:
+        close_audit_trail()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if failures:
+        print(f'\n❌ FALLO: {len(failures)} verificaciones fallidas')
+        return 1
+    print('\n✅ ÉXITO: registro de auditoría completo')
+    return 0
+
+
+class SlowTrail:
+    """Mezcla para AuditTrail: cada escritura tarda `delay` (DB lenta)."""
+    delay = 0.02
+
+    def write(self, entries, retry_delays=()):
+        time.sleep(self.delay)
+        super().write(entries, retry_delays)
+
+
+def run(args):
+    from django.db import connection, transaction
+    from django.test import Client
+    from products import audit
+    from products.models import AuditEntry, Product
+
+    failures = []
+
+    def check(description, condition):
+        print(f"{'✅' if condition else '❌'} {description}")
+        if not condition:
+            failures.append(description)
+
+    def post(client, path, data):
+        return client.post(path, data, content_type='application/json')
+
+    admin = Client(HTTP_AUTHORIZATION=f"Bearer {mint_token('ADMIN', 'admin')}")
+    operario = Client(HTTP_AUTHORIZATION=f"Bearer {mint_token('OPERARIO', 'operario')}")
+    auditor = Client(HTTP_AUTHORIZATION=f"Bearer {mint_token('AUDITOR', 'auditor')}")
+    products = list(Product.objects.order_by('id')[:5])
+
+    # --- Entradas de las acciones de la API ---
+    created = post(admin, '/api/products/', {'name': 'auditado', 'sku': 'AUD-1', 'quantity': 1, 'price': '9.99'})
+    admin.patch(f'/api/products/{products[0].id}/', {'name': 'renombrado', 'quantity': products[0].quantity},
+                content_type='application/json', HTTP_X_REQUEST_ID='req-auditoria-1')
+    admin.delete(f'/api/products/{products[1].id}/')
+    post(admin, '/api/products/stock-movements/', {'movements': [{'sku': products[2].sku, 'delta': 3}]})
+    post(admin, '/api/products/bulk/', {'products': [
+        {'name': 'masivo', 'sku': 'AUD-2', 'quantity': 1, 'price': '1.00'},
+    ]})
+    post(admin, '/api/products/bulk-delete/', {'ids': [products[3].id]})
+    denied = operario.delete(f'/api/products/{products[4].id}/')
+    anonymous = [Client().delete(f'/api/products/{products[4].id}/').status_code,
+                 Client().post('/api/products/', {}).status_code]
+    with transaction.atomic():
+        admin.patch(f'/api/products/{products[4].id}/', {'name': 'revertido'}, content_type='application/json')
+        transaction.set_rollback(True)
+    check('Todo lo encolado se escribe (flush)', audit.trail.flush(timeout=10))
+
+    entries = list(AuditEntry.objects.order_by('id'))
+    check(f'Una entrada por acción, en orden: {[entry.action for entry in entries]}',
+          [entry.action for entry in entries] == ['product.create', 'product.update', 'product.delete',
+                                                  'stock.movement', 'product.bulk_upsert',
+                                                  'product.bulk_delete', 'access.denied'])
+    by_action = {entry.action: entry for entry in entries}
+    update = by_action.get('product.update')
+    check('Entrada con usuario, roles, método y request_id', update is not None and (
+        update.username, update.roles, update.method, update.request_id,
+    ) == ('admin', 'ADMIN', 'PATCH', 'req-auditoria-1'))
+    check('product.update guarda sólo los campos cambiados [antes, después]', update is not None and
+          update.detail == {'changes': {'name': [products[0].name, 'renombrado']}})
+    check('product.create guarda producto y sku', by_action['product.create'].product_id == created.json()['id']
+          and by_action['product.create'].sku == 'AUD-1')
+    check('product.delete guarda el producto eliminado', (by_action['product.delete'].product_id,
+          by_action['product.delete'].sku) == (products[1].id, products[1].sku))
+    check('product.bulk_delete guarda ids y skus',
+          by_action['product.bulk_delete'].detail == {'ids': [products[3].id], 'skus': [products[3].sku]})
+    check('stock.movement guarda deltas y cantidades',
+          by_action['stock.movement'].detail['deltas'] == {products[2].sku: 3})
+    check(f'Acceso denegado ({denied.status_code}) queda como `denied`',
+          denied.status_code == 403 and by_action['access.denied'].outcome == AuditEntry.OUTCOME_DENIED
+          and by_action['access.denied'].username == 'operario')
+    check(f'Escrituras anónimas denegadas ({anonymous}) no se auditan', anonymous == [403, 403]
+          and sum(entry.action == 'access.denied' for entry in entries) == 1)
+    check('La escritura revertida no deja entrada', not any(entry.detail.get('changes', {}).get('name') == [
+        products[4].name, 'revertido'] for entry in entries))
+
+    # --- Endpoint ---
+    url = '/api/products/audit/'
+    check('OPERARIO no lee la auditoría -> 403', operario.get(url).status_code == 403)
+    audit.trail.flush(timeout=10)
+    response = auditor.get(url)
+    check('AUDITOR lee la auditoría -> 200', response.status_code == 200)
+    results = response.json()['results']
+    check('Orden: más recientes primero', [item['action'] for item in results][:1] == ['access.denied'])
+
+    def actions(query):
+        return [item['action'] for item in auditor.get(url, query).json()['results']]
+
+    # El 403 de OPERARIO sobre la auditoría también quedó registrado
+    check('Filtro por usuario', actions({'user': 'operario'}) == ['access.denied', 'access.denied'])
+    check('Filtro por producto', actions({'product': products[1].id}) == ['product.delete'])
+    check('Filtro por acción', actions({'action': 'stock.movement'}) == ['stock.movement'])
+    check('Filtro por resultado', actions({'outcome': 'denied'}) == ['access.denied', 'access.denied'])
+    middle = entries[3].created_at
+    check('Filtro por rango de fechas (since incluido, until excluido)',
+          actions({'since': entries[1].created_at.isoformat(), 'until': middle.isoformat()})
+          == ['product.delete', 'product.update'])
+    check('Fecha inválida -> 400', auditor.get(url, {'since': 'ayer'}).status_code == 400)
+    first = auditor.get(url, {'page_size': 3}).json()
+    second = auditor.get(first['next']).json()
+    check('Paginación por cursor sin solapes',
+          {item['id'] for item in first['results']}.isdisjoint({item['id'] for item in second['results']})
+          and len(first['results']) == 3)
+
+    for filters, index in (({'user': 'admin'}, 'audit_user_created_idx'),
+                           ({'product': products[1].id}, 'audit_product_created_idx')):
+        plan = audit.filter_entries(filters).order_by('-created_at', '-id')[:20].explain()
+        check(f'EXPLAIN {filters}: usa {index}', index in plan)
+
+    # --- Completitud con varios hilos ---
+    before = AuditEntry.objects.count()
+    trail = audit.AuditTrail(queue_size=1000, batch_size=200, flush_interval=0.05)
+    request = mock.Mock(method='POST', path_info='/api/products/', META={}, request_id='', user_roles=('ADMIN',),
+                        user_info={'username': 'carga'})
+
+    def submit(count):
+        for _ in range(count):
+            trail.submit(audit.build_entry(request, 'carga'))
+        connection.close()
+
+    per_thread = args.entries // 8
+    threads = [threading.Thread(target=submit, args=(per_thread,)) for _ in range(8)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    trail.flush(timeout=30)
+    elapsed = time.perf_counter() - start
+    stats = trail.stats()
+    written = AuditEntry.objects.count() - before
+    check(f'{per_thread * 8} entradas desde 8 hilos -> {written} filas en {stats["batches"]} lotes '
+          f'({written / elapsed:.0f} entradas/s)', written == per_thread * 8)
+    trail.close(timeout=10)
+
+    # --- Contrapresión: cola mínima y escritor lento ---
+    before = AuditEntry.objects.count()
+    slow = type('SlowAuditTrail', (SlowTrail, audit.AuditTrail), {})(
+        queue_size=5, batch_size=2, flush_interval=0.01, enqueue_timeout=0.005,
+    )
+    for _ in range(200):
+        slow.submit(audit.build_entry(request, 'contrapresion'))
+    slow.flush(timeout=30)
+    stats = slow.stats()
+    written = AuditEntry.objects.count() - before
+    check(f"Cola llena: {stats['backpressure']} esperas, {stats['sync_writes']} escrituras en la petición, "
+          f'{written}/200 filas', written == 200 and stats['backpressure'] > 0 and stats['sync_writes'] > 0)
+    slow.close(timeout=10)
+
+    # --- Desde el bucle de eventos (ASGI): con la cola llena no se bloquea ---
+    full = audit.AuditTrail(queue_size=1, enqueue_timeout=0.5)
+    full.start = lambda: None  # sin escritor: la cola queda llena
+    full._pid = os.getpid()
+    full.queue.put_nowait(audit.build_entry(request, 'cola_llena'))
+
+    async def submit_from_loop():
+        start = time.perf_counter()
+        full.submit(audit.build_entry(request, 'desde_bucle'))
+        return (time.perf_counter() - start) * 1000
+
+    # asyncio.run espera al executor antes de volver
+    blocked_ms = asyncio.run(submit_from_loop())
+    written = AuditEntry.objects.filter(action='desde_bucle').count()
+    check(f'Cola llena desde el bucle de eventos: submit vuelve en {blocked_ms:.2f} ms y la entrada se escribe '
+          f'en otro hilo ({written}/1)', blocked_ms < 50 and written == 1 and full.stats()['sync_writes'] == 1)
+    full.queue.get_nowait()
+
+    # --- Cierre con entradas pendientes ---
+    before = AuditEntry.objects.count()
+    pending = audit.AuditTrail(batch_size=10 ** 6, flush_interval=60)
+    for _ in range(500):
+        pending.submit(audit.build_entry(request, 'cierre'))
+    pending.close(timeout=10)
+    written = AuditEntry.objects.count() - before
+    check(f'close() escribe lo pendiente antes de salir: {written}/500', written == 500)
+
+    # --- Falla de la DB: las entradas quedan en el log ---
+    logged = []
+    handler = logging.Handler()
+    handler.emit = lambda record: logged.append(getattr(record, 'event', None))
+    logger = logging.getLogger('products.audit')
+    logger.addHandler(handler)
+    previous, logger.propagate = logger.propagate, False
+    broken = audit.AuditTrail(asynchronous=False)
+    try:
+        with mock.patch.object(AuditEntry.objects, 'bulk_create', side_effect=RuntimeError('DB caída')):
+            for _ in range(3):
+                broken.submit(audit.build_entry(request, 'sin_db'))
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = previous
+    check(f"DB caída: {logged.count('audit_write_failed')} entradas al log (audit_write_failed)",
+          logged.count('audit_write_failed') == 3 and broken.stats()['failed'] == 3)
+
+    # --- Entradas que la DB rechazaría ---
+    hostile = mock.Mock(method='POST', path_info='/api/products/' + 'x' * 400, META={'REMOTE_ADDR': 'no-es-ip'},
+                        request_id='r' * 100, user_roles=('ADMIN',) * 60, user_info={'username': 'u' * 300})
+    entry = audit.build_entry(hostile, 'hostil', sku='s' * 200)
+    fits = all(len(entry[name]) <= AuditEntry._meta.get_field(name).max_length
+               for name in ('username', 'roles', 'sku', 'path', 'request_id'))
+    check('build_entry ajusta cada texto al modelo e ignora una IP inválida',
+          fits and entry['remote_addr'] is None)
+
+    logged.clear()
+    logger.addHandler(handler)
+    logger.propagate = False
+    before = AuditEntry.objects.count()
+    batch = audit.AuditTrail(asynchronous=False)
+    entries = [audit.build_entry(request, 'lote') for _ in range(5)]
+    entries[2]['product_id'] = 'no-es-numero'
+    start = time.perf_counter()
+    try:
+        batch.write(entries, audit.RETRY_DELAYS)
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = previous
+    elapsed = time.perf_counter() - start
+    written = AuditEntry.objects.count() - before
+    check(f'Una fila inválida no arrastra al lote: {written}/4 escritas, '
+          f"{logged.count('audit_write_failed')} al log, sin reintentos ({elapsed:.2f} s)",
+          written == 4 and logged.count('audit_write_failed') == 1 and elapsed < 0.1)
+
+    # --- Latencia: encolar vs escribir en la petición ---
+    product = products[0]
+    latencies = {}
+    for mode in ('asincrono', 'sincrono', 'asincrono', 'sincrono'):
+        audit.trail.asynchronous = mode == 'asincrono'
+        samples = latencies.setdefault(mode, [])
+        for index in range(args.requests):
+            start = time.perf_counter()
+            admin.patch(f'/api/products/{product.id}/', {'quantity': index}, content_type='application/json')
+            samples.append((time.perf_counter() - start) * 1000)
+    audit.trail.asynchronous = True
+    audit.trail.flush(timeout=30)
+
+    submit_us = {}
+    for mode, asynchronous in (('asincrono', True), ('sincrono', False)):
+        trail = audit.AuditTrail(asynchronous=asynchronous)
+        samples = []
+        for _ in range(args.requests):
+            entry = audit.build_entry(request, 'latencia')
+            start = time.perf_counter()
+            trail.submit(entry)
+            samples.append((time.perf_counter() - start) * 10 ** 6)
+        trail.close(timeout=10)
+        submit_us[mode] = percentile(samples, 50)
+
+    print(f"\n{'modo':<12}{'PATCH p50 ms':>14}{'PATCH p99 ms':>14}{'auditar µs':>12}")
+    for mode in ('asincrono', 'sincrono'):
+        print(f'{mode:<12}{percentile(latencies[mode], 50):>14.3f}{percentile(latencies[mode], 99):>14.3f}'
+              f'{submit_us[mode]:>12.0f}')
+    print('(auditar µs: mediana de AuditTrail.submit(); PATCH incluye la petición completa)')
+    check(f"Encolar ({submit_us['asincrono']:.0f} µs) es más barato que escribir en la petición "
+          f"({submit_us['sincrono']:.0f} µs)", submit_us['asincrono'] < submit_us['sincrono'])
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Feed incremental de cambios (/api/products/changes/) frente a volver a
+descargar el catálogo.
+
+Sobre un catálogo sintético, un cliente toma un cursor, se aplican unos
+cuantos cambios (PATCH, movimientos de stock, altas, borrado individual y
+masivo, también desde el admin) y se compara, a través de la API completa en proceso:
+  - resincronizar descargando todas las páginas del listado,
+  - sincronizar con el feed desde el cursor.
+
+Verifica que el feed entrega exactamente los cambios (incluidas las
+eliminaciones), que retiene los cambios recientes durante la ventana de
+asentamiento, que un cursor fuera de retención recibe 410 y que la consulta
+usa el índice (updated_at, id).
+
+    python3 tests/benchmarks/cambios.py --products 20000 --changes 50
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from harness import SERVICE_DIR, close_audit_trail, generate_tokens, mint_token
+
+SETTLE_SECONDS = 0.5
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Feed de cambios vs catálogo completo')
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--changes', type=int, default=50, help='Productos modificados por PATCH')
+    parser.add_argument('--page-size', type=int, default=100)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix='products-cambios-'))
+    os.environ.update({
+        'DB_ENGINE': 'sqlite',
+        'DB_NAME': str(workdir / 'cambios.sqlite3'),
+        'JWT_SECRET_KEY': generate_tokens.JWT_SECRET_KEY,
+        'PRODUCTS_CHANGES_SETTLE_SECONDS': str(SETTLE_SECONDS),
+        'PRODUCTS_MAX_PAGE_SIZE': str(args.page_size),
+        'DJANGO_SETTINGS_MODULE': 'products_service.settings',
+    })
+    sys.path.insert(0, str(SERVICE_DIR))
+    try:
+        import django
+        import logging
+        django.setup()
+        logging.disable(logging.WARNING)
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+        call_command('seed_products', count=args.products, verbosity=0)
+        return run(args)
+    finally:
+        close_audit_trail()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run(args):
+    from django.contrib import admin as django_admin
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from django.utils import timezone
+    from products.models import Product
+
+    failures = []
+
+    def check(description, condition):
+        print(f"{'✅' if condition else '❌'} {description}")
+        if not condition:
+            failures.append(description)
+
+    admin = Client(HTTP_AUTHORIZATION=f"Bearer {mint_token('ADMIN')}")
+    operario = Client(HTTP_AUTHORIZATION=f"Bearer {mint_token('OPERARIO')}")
+
+    def measure(sync):
+        with CaptureQueriesContext(connection) as queries:
+            begin = time.perf_counter()
+            received, size = sync()
+            elapsed = time.perf_counter() - begin
+        return received, size, len(queries), elapsed
+
+    def full_download():
+        received, size = {}, 0
+        url = f'/api/products/?page_size={args.page_size}'
+        while url:
+            response = operario.get(url)
+            size += len(response.content)
+            data = response.json()
+            received.update((item['id'], item) for item in data['results'])
+            url = data['next']
+        return received, size
+
+    def sync_changes(cursor):
+        changed, deleted, size = {}, set(), 0
+        while True:
+            response = operario.get('/api/products/changes/', {'cursor': cursor, 'page_size': args.page_size})
+            size += len(response.content)
+            data = response.json()
+            changed.update((item['id'], item) for item in data['results'])
+            deleted.update(item['id'] for item in data['deleted'])
+            cursor = data['cursor']
+            if not data['has_more']:
+                return (changed, deleted, cursor), size
+
+    # El cliente descarga el catálogo y toma el cursor actual (pasada la ventana
+    # de asentamiento del seed, que si no el feed volvería a entregar)
+    time.sleep(SETTLE_SECONDS + 0.1)
+    cursor = operario.get('/api/products/changes/').json()['cursor']
+
+    ids = list(Product.objects.order_by('id').values_list('id', flat=True)[:args.changes + 10])
+    patched = ids[:args.changes]
+    for pk in patched:
+        admin.patch(f'/api/products/{pk}/', {'name': f'cambio-{pk}'}, content_type='application/json')
+    sku = Product.objects.get(pk=ids[args.changes]).sku
+    admin.post('/api/products/stock-movements/', {'movements': [{'sku': sku, 'delta': 5}]},
+               content_type='application/json')
+    created = admin.post('/api/products/', {'name': 'nuevo', 'sku': 'NUEVO-1', 'quantity': 1, 'price': '9.99'},
+                         content_type='application/json').json()['id']
+    admin.delete(f'/api/products/{ids[args.changes + 1]}/')
+    admin.post('/api/products/bulk-delete/', {'ids': ids[args.changes + 2:args.changes + 4]},
+               content_type='application/json')
+    # Borrados desde el admin de Django (uno y acción masiva)
+    product_admin = django_admin.site._registry[Product]
+    detail = f'/api/products/{ids[args.changes + 4]}/'
+    cached = operario.get(detail).status_code
+    product_admin.delete_model(None, Product.objects.get(pk=ids[args.changes + 4]))
+    after = operario.get(detail).status_code
+    check(f'El borrado desde el admin invalida la caché de respuestas ({cached} -> {after})',
+          cached == 200 and after == 404)
+    detail = f'/api/products/{ids[args.changes + 7]}/'
+    statuses = [operario.get(detail).status_code, operario.get(detail, {'quantity_min': 10 ** 9}).status_code]
+    check(f'Detalle cacheado y filtros en la URL: clave propia ({statuses})', statuses == [200, 404])
+    product_admin.delete_queryset(None, Product.objects.filter(pk__in=ids[args.changes + 5:args.changes + 7]))
+    expected_changed = set(patched) | {ids[args.changes], created}
+    expected_deleted = set(ids[args.changes + 1:args.changes + 7])
+
+    (early, _, _), _ = sync_changes(cursor)
+    check(f'Cambios recientes retenidos durante la ventana de asentamiento ({len(early)} entregados)',
+          not (set(early) & expected_changed))
+    time.sleep(SETTLE_SECONDS + 0.1)
+
+    (changed, deleted, next_cursor), feed_bytes, feed_queries, feed_s = measure(lambda: sync_changes(cursor))
+    check(f'Feed entrega los {len(expected_changed)} productos modificados', set(changed) == expected_changed)
+    check(f'Feed entrega las {len(expected_deleted)} eliminaciones', deleted == expected_deleted)
+    check('PATCH reflejado en el feed', changed[patched[0]]['name'] == f'cambio-{patched[0]}')
+    check('Movimiento de stock reflejado en el feed', ids[args.changes] in changed)
+
+    again = operario.get('/api/products/changes/', {'cursor': next_cursor}).json()
+    check('Sin cambios nuevos, el cursor siguiente no devuelve nada',
+          not again['results'] and not again['deleted'] and not again['has_more'])
+
+    old = (timezone.now() - timedelta(days=365)).isoformat()
+    check('since fuera de la retención -> 410', operario.get('/api/products/changes/', {'since': old}).status_code == 410)
+    check('Cursor inválido -> 400', operario.get('/api/products/changes/', {'cursor': 'xx'}).status_code == 400)
+
+    with connection.cursor() as db:
+        db.execute(
+            'EXPLAIN QUERY PLAN SELECT id FROM products WHERE updated_at > %s ORDER BY updated_at, id LIMIT 10',
+            [timezone.now()],
+        )
+        plan = ' '.join(str(row) for row in db.fetchall())
+    check('La consulta del feed usa products_updated_id_idx', 'products_updated_id_idx' in plan)
+
+    full, full_bytes, full_queries, full_s = measure(full_download)
+    check(f'Descarga completa trae el catálogo ({len(full)} productos)', len(full) == Product.objects.count())
+
+    print(f"\n{'sincronización':<20}{'productos':>11}{'consultas':>11}{'KB':>10}{'ms':>10}")
+    print(f"{'catálogo completo':<20}{len(full):>11}{full_queries:>11}{full_bytes / 1024:>10.1f}{full_s * 1000:>10.1f}")
+    print(f"{'feed de cambios':<20}{len(changed) + len(deleted):>11}{feed_queries:>11}"
+          f"{feed_bytes / 1024:>10.1f}{feed_s * 1000:>10.1f}")
+
+    if failures:
+        print(f'\n❌ FALLO: {len(failures)} verificaciones fallidas')
+        return 1
+    print(f'\n✅ ÉXITO: feed de cambios correcto ({full_s / feed_s:.0f}x más rápido que el catálogo completo)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Eventos SSE de productos (/api/products/events/) frente a sondear el feed
+de cambios.
+
+En proceso (WSGI, django.test.Client) verifica que las escrituras de la API
+publican sus eventos al confirmarse (y no si se revierten), el orden y el
+contenido, la reanudación con Last-Event-ID, el `resync` cuando el id ya
+salió del buffer, el filtro por rol, el heartbeat, la reserva de plazas,
+el 503 en workers síncronos o con varios workers sin caché compartida y el
+backend `cache` (dos brokers que comparten la caché, como dos workers).
+
+Después levanta el servicio con uvicorn (1 worker ASGI), abre --subscribers
+streams, modifica productos por la API y mide cuánto tarda cada cambio en
+llegar a todos los suscriptores; sondeando cada 15 s la espera media sería
+de 7,5 s.
+
+    python3 tests/benchmarks/eventos.py --subscribers 200 --updates 20
+
+La parte ASGI requiere uvicorn instalado.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from harness import (
+    SERVICE_DIR, HTTPConnection, LocalService, close_audit_trail, generate_tokens, mint_token, percentile,
+)
+
+BUFFER = 50
+HEARTBEAT_SECONDS = 0.2
+POLL_INTERVAL_SECONDS = 15
+
+
+def parse_frames(content):
+    """Tramas SSE -> lista de (id, evento, datos); los comentarios como ('ping')."""
+    frames = []
+    for block in content.decode('utf-8').split('\n\n'):
+        if not block:
+            continue
+        fields = {}
+        for line in block.split('\n'):
+            field, _, value = line.partition(': ')
+            fields[field] = value
+        if '' in fields and len(fields) == 1:
+            frames.append((None, 'ping', None))
+        elif 'data' in fields:
+            frames.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Eventos SSE de productos')
+    parser.add_argument('--subscribers', type=int, default=200, help='Streams abiertos en la parte ASGI')
+    parser.add_argument('--updates', type=int, default=20, help='Cambios medidos en la parte ASGI')
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix='products-eventos-'))
+    os.environ.update({
+        'DB_ENGINE': 'sqlite',
+        'DB_NAME': str(workdir / 'eventos.sqlite3'),
+        'JWT_SECRET_KEY': generate_tokens.JWT_SECRET_KEY,
+        'PRODUCTS_EVENTS_BUFFER': str(BUFFER),
+        'PRODUCTS_EVENTS_HEARTBEAT_SECONDS': str(HEARTBEAT_SECONDS),
+        'PRODUCTS_EVENTS_STREAM_SECONDS': '0.5',
+        'PRODUCTS_EVENTS_POLL_INTERVAL': '0.05',
+        'PRODUCTS_EVENTS_MAX_PER_WRITE': '3',
+        'DJANGO_SETTINGS_MODULE': 'products_service.settings',
+    })
+    sys.path.insert(0, str(SERVICE_DIR))
+    try:
+        import django
+        import logging
+        django.setup()
+        # ERROR: el 503 del límite de streams se registra como error de django.request
+        logging.disable(logging.ERROR)
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+        call_command('seed_products', count=20, verbosity=0)
+        failures = run(args)
+    finally:
+        close_audit_trail()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if failures:
+        print(f'\n❌ FALLO: {len(failures)} verificaciones fallidas')
+        return 1
+    print('\n✅ ÉXITO: eventos SSE correctos')
+    return 0
+
+
+def run(args):
+    from django.contrib import admin as django_admin
+    from django.db import transaction
+    from django.test import Client, override_settings
+    from products import events
+    from products.models import Product
+
+    failures = []
+
+    def check(description, condition):
+        print(f"{'✅' if condition else '❌'} {description}")
+        if not condition:
+            failures.append(description)
+
+    admin = Client(HTTP_AUTHORIZATION=f"Bearer {mint_token('ADMIN')}")
+
+    def stream(role='OPERARIO', last_event_id=None):
+        # Como un worker gthread: en workers síncronos el stream responde 503
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {mint_token(role)}', 'wsgi.multithread': True}
+        if last_event_id is not None:
+            headers['HTTP_LAST_EVENT_ID'] = str(last_event_id)
+        response = Client().get('/api/products/events/', **headers)
+        if response.status_code != 200:
+            return response, []
+        return response, parse_frames(b''.join(response.streaming_content))
+
+    broker = events.get_broker()
+    start = broker.last_id
+    products = list(Product.objects.order_by('id')[:6])
+
+    created = admin.post('/api/products/', {'name': 'nuevo', 'sku': 'EVT-1', 'quantity': 1, 'price': '9.99'},
+                         content_type='application/json').json()
+    admin.patch(f'/api/products/{products[0].id}/', {'name': 'renombrado'}, content_type='application/json')
+    admin.post('/api/products/stock-movements/', {'movements': [{'sku': products[1].sku, 'delta': 7}]},
+               content_type='application/json')
+    admin.delete(f'/api/products/{products[2].id}/')
+    admin.post('/api/products/stock-movements/',
+               {'movements': [{'sku': product.sku, 'delta': 1} for product in products[3:6]] * 2},
+               content_type='application/json')
+    admin.post('/api/products/bulk-delete/', {'ids': [products[5].id]}, content_type='application/json')
+    with transaction.atomic():
+        admin.patch(f'/api/products/{products[4].id}/', {'name': 'revertido'}, content_type='application/json')
+        transaction.set_rollback(True)
+
+    response, frames = stream(last_event_id=start)
+    data = [frame for frame in frames if frame[1] != 'ping']
+    check(f'Stream 200 text/event-stream sin buffer ({response["Content-Type"]}, '
+          f'X-Accel-Buffering={response.get("X-Accel-Buffering")})',
+          response['Content-Type'] == 'text/event-stream' and response.get('X-Accel-Buffering') == 'no')
+    check(f'Eventos en orden: {[event for _, event, _ in data]}',
+          [event for _, event, _ in data] == ['product.created', 'product.updated', 'product.stock',
+                                              'product.deleted', 'product.stock', 'product.stock',
+                                              'product.stock', 'resync'])
+    check('Ids consecutivos desde Last-Event-ID', [frame[0] for frame in data] == list(range(start + 1, start + 9)))
+    check('product.created lleva el producto serializado', data[0][2] == created)
+    check('product.updated refleja el PATCH', data[1][2]['name'] == 'renombrado')
+    check('product.stock lleva la cantidad resultante',
+          data[2][2] == {'sku': products[1].sku, 'quantity': products[1].quantity + 7})
+    check('product.deleted lleva id y sku', data[3][2] == {'id': products[2].id, 'sku': products[2].sku})
+    check('Escritura masiva -> un único resync', data[7][2]['reason'] == 'bulk_delete')
+    check('Escritura revertida no publica evento', not any(
+        event == 'product.updated' and payload['id'] == products[4].id for _, event, payload in data))
+    check(f'Heartbeat mientras no hay eventos ({sum(frame[1] == "ping" for frame in frames)} pings)',
+          any(frame[1] == 'ping' for frame in frames))
+
+    _, resumed = stream(last_event_id=start + 4)
+    check('Reanudación: sólo los eventos posteriores a Last-Event-ID',
+          [frame[0] for frame in resumed if frame[1] != 'ping'] == list(range(start + 5, start + 9)))
+
+    _, head = stream()
+    check('Sin Last-Event-ID empieza en la cabeza (sólo heartbeats)', head and all(frame[1] == 'ping' for frame in head))
+
+    for index in range(BUFFER + 5):
+        events.publish('product.updated', {'id': index})
+    _, lost = stream(last_event_id=start)
+    check('Last-Event-ID fuera del buffer -> resync', lost[0][1] == 'resync' and lost[0][0] == broker.last_id)
+    _, future = stream(last_event_id=broker.last_id + 100)
+    check('Last-Event-ID de otro arranque (mayor que la cabeza) -> resync', future[0][1] == 'resync')
+
+    mark = broker.last_id
+    events.publish('cache.stats', {'hits': 1}, resource='cache')
+    _, operario = stream('OPERARIO', mark)
+    _, auditor = stream('AUDITOR', mark)
+    check('Filtro por rol: OPERARIO no recibe eventos de `cache`', operario and all(frame[1] == 'ping' for frame in operario))
+    check('Filtro por rol: AUDITOR sí los recibe', [frame[1] for frame in auditor][0] == 'cache.stats')
+    check('Rol sin lectura de productos -> 403', stream('INVITADO')[0].status_code == 403)
+    check('Sin token -> 403', Client().get('/api/products/events/').status_code == 403)
+
+    # Cambios desde el admin de Django
+    mark = broker.last_id
+    product_admin = django_admin.site._registry[Product]
+    renamed = Product.objects.get(pk=products[0].id)
+    renamed.name = 'desde-admin'
+    product_admin.save_model(None, renamed, None, True)
+    product_admin.delete_model(None, Product.objects.get(pk=products[3].id))
+    product_admin.delete_queryset(None, Product.objects.filter(pk=products[4].id))
+    _, from_admin = stream(last_event_id=mark)
+    published = [(event, payload.get('name') or payload['id']) for _, event, payload in from_admin if event != 'ping']
+    check(f'El admin publica sus cambios: {published}', published == [
+        ('product.updated', 'desde-admin'), ('product.deleted', products[3].id), ('product.deleted', products[4].id),
+    ])
+
+    broker.subscribers = 10 ** 6
+    response, _ = stream()
+    broker.subscribers = 0
+    check(f"Límite de streams -> 503 con Retry-After={response.get('Retry-After')}",
+          response.status_code == 503 and response.has_header('Retry-After'))
+    response = Client().get('/api/products/events/', HTTP_AUTHORIZATION=f"Bearer {mint_token('OPERARIO')}",
+                            **{'wsgi.multithread': True})
+    check(f'La plaza se reserva al abrir ({broker.subscribers} suscriptor)', broker.subscribers == 1)
+    response.close()
+    check('Respuesta cerrada sin leerse -> plaza liberada', broker.subscribers == 0)
+    check('Worker síncrono -> 503 sin stream', Client().get(
+        '/api/products/events/', HTTP_AUTHORIZATION=f"Bearer {mint_token('OPERARIO')}").status_code == 503)
+    with override_settings(SERVER_WORKERS=3):
+        check('Varios workers sin caché compartida -> 503', stream()[0].status_code == 503)
+
+    # Backend `cache`: dos brokers sobre la misma caché, como dos workers
+    publisher, subscriber = events.CacheBroker(), events.CacheBroker()
+    for index in range(3):
+        publisher.publish('product.updated', json.dumps({'id': -1}))
+    subscriber.start()
+    head = subscriber.last_id
+    check(f'Backend cache: la cabeza del broker es la secuencia compartida desde el arranque ({head})',
+          head == publisher.get_cache().get(events.CacheBroker.SEQUENCE_KEY) and head >= 3)
+    time.sleep(0.2)
+    for index in range(5):
+        publisher.publish('product.updated', json.dumps({'id': index}))
+    publisher.get_cache().incr(events.CacheBroker.SEQUENCE_KEY)  # número sin evento: publicador caído
+    publisher.publish('product.deleted', json.dumps({'id': 99}))
+    deadline = time.monotonic() + 5
+    while subscriber.last_id < publisher.get_cache().get(events.CacheBroker.SEQUENCE_KEY) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    received = parse_frames(subscriber.collect(head, frozenset({'products'}))[0])
+    check(f'Backend cache: eventos de otro worker en orden y sin resync ({len(received)} recibidos)',
+          [payload.get('id') for _, _, payload in received] == [0, 1, 2, 3, 4, 99])
+    check('Backend cache: un id sin evento se salta tras esperar', received[-1][0] == received[-2][0] + 2)
+
+    if importlib.util.find_spec('uvicorn') is None:
+        print('⚠️  uvicorn no está instalado: se omite la medición ASGI')
+        return failures
+    latencies, frame_bytes = asyncio.run(measure_asgi(args))
+    check(f'ASGI: {args.updates} cambios llegan a los {args.subscribers} suscriptores',
+          len(latencies) == args.updates * args.subscribers)
+    if latencies:
+        p50, p99 = percentile(latencies, 50), percentile(latencies, 99)
+        print(f"\n{'entrega de un cambio':<36}{'p50 ms':>10}{'p99 ms':>10}{'peticiones/h':>14}")
+        print(f"{f'SSE ({args.subscribers} suscriptores)':<36}{p50:>10.1f}{p99:>10.1f}"
+              f"{3600 / 300:>14.0f}")
+        print(f"{f'sondeo del feed cada {POLL_INTERVAL_SECONDS} s':<36}{POLL_INTERVAL_SECONDS * 500:>10.0f}"
+              f"{POLL_INTERVAL_SECONDS * 990:>10.0f}{3600 / POLL_INTERVAL_SECONDS:>14.0f}")
+        print(f'(trama SSE de un cambio: {frame_bytes} bytes; peticiones/h por cliente inactivo)')
+        check(f'SSE entrega en p99 {p99:.0f} ms (< 1 s)', p99 < 1000)
+    return failures
+
+
+async def open_stream(base_url, token):
+    connection = HTTPConnection(base_url)
+    await connection.connect()
+    connection.writer.write((
+        'GET /api/products/events/ HTTP/1.1\r\n'
+        f'Host: {connection.host}:{connection.port}\r\n'
+        f'Authorization: Bearer {token}\r\n'
+        'Accept: text/event-stream\r\n\r\n'
+    ).encode('latin-1'))
+    await connection.writer.drain()
+    status = int((await connection.reader.readline()).split()[1])
+    while (await connection.reader.readline()) not in (b'\r\n', b''):
+        pass
+    return connection, status
+
+
+async def read_stream(connection, expected, received):
+    """Lee el cuerpo chunked y anota (id del producto, instante) de cada product.updated."""
+    buffer = b''
+    while len(received) < expected:
+        size = int((await connection.reader.readline()).split(b';')[0], 16)
+        if size == 0:
+            return
+        buffer += await connection.reader.readexactly(size)
+        await connection.reader.readline()
+        *blocks, buffer = buffer.split(b'\n\n')
+        now = time.perf_counter()
+        for _, event, payload in parse_frames(b'\n\n'.join(blocks) + b'\n\n'):
+            if event == 'product.updated':
+                received.append((payload['name'], now))
+
+
+async def measure_asgi(args):
+    env = {
+        'PRODUCTS_EVENTS_STREAM_SECONDS': '120',
+        'PRODUCTS_EVENTS_HEARTBEAT_SECONDS': '15',
+        'PRODUCTS_EVENTS_MAX_SUBSCRIBERS': str(args.subscribers + 10),
+    }
+    service = LocalService(products=10, server='uvicorn', workers=1, env=env)
+    await asyncio.to_thread(service.start)
+    try:
+        token = mint_token('OPERARIO')
+        streams = [await open_stream(service.base_url, token) for _ in range(args.subscribers)]
+        if any(status != 200 for _, status in streams):
+            return [], 0
+        received = [[] for _ in streams]
+        readers = [asyncio.create_task(read_stream(connection, args.updates, box))
+                   for (connection, _), box in zip(streams, received)]
+
+        writer = HTTPConnection(service.base_url)
+        admin = {'Authorization': f"Bearer {mint_token('ADMIN')}", 'Content-Type': 'application/json'}
+        sent = {}
+        for index in range(args.updates):
+            name = f'sse-{index}'
+            body = json.dumps({'name': name}).encode()
+            sent[name] = time.perf_counter()
+            await writer.request('PATCH', '/api/products/1/', admin, body)
+            await asyncio.sleep(0.05)
+        await asyncio.wait_for(asyncio.gather(*readers), timeout=30)
+        await writer.close()
+        for connection, _ in streams:
+            await connection.close()
+
+        latencies = [(moment - sent[name]) * 1000 for box in received for name, moment in box]
+        frame = f'id: 1\nevent: product.updated\ndata: {json.dumps({"name": "sse-0"})}\n\n'
+        return latencies, len(frame.encode())
+    except asyncio.TimeoutError:
+        return [], 0
+    finally:
+        service.stop()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
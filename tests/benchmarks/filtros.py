@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark de búsqueda y filtros del listado de productos a escala.
+
+Genera (o reutiliza) un catálogo sintético grande y mide, a través de la
+API completa en proceso, la latencia de cada filtro de `ProductFilterBackend`.
+Para cada caso imprime además el plan de la consulta para comprobar que no
+hay recorridos secuenciales de la tabla.
+
+Por defecto usa un archivo SQLite; con --postgres usa la conexión de las
+variables DB_* (los índices de trigramas sólo existen en PostgreSQL):
+
+    python3 tests/benchmarks/filtros.py --products 1000000 --db /tmp/catalogo.sqlite3
+    DB_HOST=localhost DB_NAME=warehouse_bench python3 tests/benchmarks/filtros.py --postgres
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from harness import SERVICE_DIR, generate_tokens, mint_token, summarize
+
+CASES = [
+    ('sin filtros', ''),
+    ('prefijo de SKU', 'sku_prefix=SYN-GPU-00001'),
+    ('búsqueda en nombre/descripción', 'search=noctua'),
+    ('rango de cantidad', 'quantity_min=500&quantity_max=600'),
+    ('rango de precio', 'price_min=1000&price_max=1200'),
+    ('combinado', 'search=logitech&quantity_min=10&price_max=100'),
+]
+
+
+def setup_django(args):
+    if not args.postgres:
+        os.environ['DB_ENGINE'] = 'sqlite'
+        os.environ['DB_NAME'] = args.db or str(Path(tempfile.gettempdir()) / 'products-filtros.sqlite3')
+    os.environ['JWT_SECRET_KEY'] = generate_tokens.JWT_SECRET_KEY
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'products_service.settings')
+    sys.path.insert(0, str(SERVICE_DIR))
+
+    import django
+    import logging
+    django.setup()
+    logging.disable(logging.WARNING)
+
+
+def seed(count):
+    from django.core.management import call_command
+    from products.models import Product
+
+    call_command('migrate', verbosity=0)
+    existing = Product.objects.count()
+    if existing >= count:
+        print(f'Reutilizando catálogo existente de {existing} productos')
+        return
+    call_command('seed_products', count=count, truncate=True, batch_size=20000)
+
+
+def plan_for(query):
+    from django.test import RequestFactory
+    from rest_framework.request import Request
+    from products.filters import ProductFilterBackend
+    from products.models import Product
+
+    request = Request(RequestFactory().get(f'/api/products/?{query}'))
+    queryset = ProductFilterBackend().filter_queryset(request, Product.objects.all(), None)
+    return queryset.order_by('-created_at', '-id')[:21].explain()
+
+
+def has_sequential_scan(plan):
+    for line in plan.splitlines():
+        if 'Seq Scan on products' in line:
+            return True
+        # SQLite: "SCAN products" sin índice (con índice dice "USING INDEX")
+        if 'SCAN products' in line and 'USING' not in line:
+            return True
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de filtros de productos')
+    parser.add_argument('--products', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=20, help='Peticiones por caso')
+    parser.add_argument('--db', help='Archivo SQLite (se reutiliza si ya tiene el catálogo)')
+    parser.add_argument('--postgres', action='store_true', help='Usar la conexión PostgreSQL de DB_*')
+    parser.add_argument('--output', help='Archivo JSON donde guardar los resultados')
+    args = parser.parse_args()
+
+    setup_django(args)
+    seed(args.products)
+
+    from django.core.cache import caches
+    from django.db import connection
+    from django.test import Client
+
+    client = Client(HTTP_AUTHORIZATION=f"Bearer {mint_token('OPERARIO')}")
+    results = {'meta': {'products': args.products, 'vendor': connection.vendor}, 'cases': {}}
+
+    for name, query in CASES:
+        samples = []
+        statuses = {}
+        for _ in range(args.repeat):
+            # Sin caché de respuestas: se mide la consulta, no el hit
+            caches['products'].clear()
+            start = time.perf_counter()
+            response = client.get(f'/api/products/?{query}')
+            samples.append((time.perf_counter() - start) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        duration = sum(samples) / 1000
+        summary = summarize(samples, duration, statuses, sum(n for code, n in statuses.items() if code != 200))
+        plan = plan_for(query)
+        summary['sequential_scan'] = has_sequential_scan(plan)
+        summary['plan'] = plan
+        results['cases'][name] = summary
+
+        latency = summary['latency_ms']
+        print(f"\n== {name} ({query or '-'})")
+        print(f"p50={latency['p50']:.2f} ms  p99={latency['p99']:.2f} ms  "
+              f"recorrido secuencial: {'SÍ' if summary['sequential_scan'] else 'no'}")
+        print(plan)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'\nResultados guardados en {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Latencia de extremo a extremo con y sin el modo de gateway de confianza.
+
+Levanta el servicio (gunicorn) con GATEWAY_TRUSTED_IDENTITY activo y, delante,
+el sustituto local de Kong (gateway_local.py) en sus dos modos:
+  - jwt: el gateway verifica el token y el servicio lo vuelve a verificar,
+  - confianza: el gateway reenvía la identidad firmada con HMAC y el
+    servicio no decodifica el JWT.
+
+Mide el detalle de un producto (respuesta cacheada, para que la
+autenticación pese) con tokens HS256 y RS256, cada uno con un token nuevo
+por petición (lo que ve un worker con muchos usuarios: la caché de tokens
+no acierta) y con un token repetido. Antes verifica que el modo no abre
+huecos: cabeceras falsificadas, sin firma, expiradas, repetidas con otro
+método u otra ruta, con firma no ASCII o desde otra IP.
+
+    python3 tests/benchmarks/gateway_confianza.py --requests 2000
+
+Requiere gunicorn.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from harness import SERVICE_DIR, HTTPConnection, LocalService, free_port, mint_token, percentile
+from jwt_asimetrico import generate_keys, sign
+
+sys.path.insert(0, str(SERVICE_DIR))
+from products.gateway import sign_identity  # noqa: E402
+
+SECRET = 'secreto-de-benchmark'
+PRODUCT_PATH = '/api/products/1/'
+
+
+def identity_headers(subject, roles, expires, secret=SECRET, method='GET', path=PRODUCT_PATH):
+    return {
+        'X-Identity-Subject': subject,
+        'X-Identity-Roles': roles,
+        'X-Identity-Expires': str(expires),
+        'X-Identity-Signature': sign_identity(secret, method, path, subject, roles, str(expires)),
+    }
+
+
+async def status_of(base_url, method, path, headers):
+    connection = HTTPConnection(base_url)
+    try:
+        status, _, _ = await connection.request(method, path, headers)
+        return status
+    finally:
+        await connection.close()
+
+
+async def start_gateway(mode, upstream, jwks):
+    """gateway_local.py en su propio proceso, como Kong: no compite con el cliente."""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, str(Path(__file__).with_name('gateway_local.py')), '--upstream', upstream,
+         '--port', str(port), '--mode', mode, '--secret', SECRET, '--jwks', jwks],
+        stdout=subprocess.DEVNULL,
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    for _ in range(100):
+        try:
+            await status_of(base_url, 'GET', '/api/auth/test-users/', {})
+            return base_url, process
+        except OSError:
+            await asyncio.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f'El gateway {mode} no arrancó')
+
+
+def auth_stage_ms(server_timing):
+    """Duración de la etapa `jwt` (autenticación) según Server-Timing."""
+    for part in server_timing.split(','):
+        stage, _, duration = part.strip().partition(';dur=')
+        if stage == 'jwt':
+            return float(duration)
+    return 0.0
+
+
+async def load(base_url, tokens, concurrency):
+    """
+    Latencias (ms) de GET del detalle y de la etapa de autenticación en el
+    servicio; tokens[i] autentica la petición i.
+    """
+    samples, auth, errors = [], [], 0
+    queue = iter(tokens)
+
+    async def client():
+        nonlocal errors
+        connection = HTTPConnection(base_url)
+        try:
+            for token in queue:
+                start = time.perf_counter()
+                status, headers, _ = await connection.request(
+                    'GET', PRODUCT_PATH, {'Authorization': f'Bearer {token}'},
+                )
+                samples.append((time.perf_counter() - start) * 1000)
+                auth.append(auth_stage_ms(headers.get('server-timing', '')))
+                errors += status != 200
+        finally:
+            await connection.close()
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return samples, auth, errors
+
+
+async def run(args, keys_dir):
+    rsa_key, _, _ = generate_keys(keys_dir)
+    env = {
+        'GATEWAY_TRUSTED_IDENTITY': 'True',
+        'GATEWAY_HMAC_SECRETS': SECRET,
+        'GATEWAY_TRUSTED_PEERS': '127.0.0.1',
+        'JWT_JWKS_PATH': str(keys_dir),
+    }
+    service = LocalService(products=100, server='gunicorn', workers=args.workers, env=env)
+    await asyncio.to_thread(service.start)
+    processes = []
+    gateways = {}
+    failures = []
+
+    def check(description, condition):
+        print(f"{'✅' if condition else '❌'} {description}")
+        if not condition:
+            failures.append(description)
+
+    try:
+        for mode in ('jwt', 'confianza'):
+            gateways[mode], process = await start_gateway(mode, service.base_url, str(keys_dir / 'idp.json'))
+            processes.append(process)
+        operario, admin = mint_token('OPERARIO'), mint_token('ADMIN')
+        expires = int(time.time()) + 3600
+        trusted = gateways['confianza']
+        check('Vía gateway de confianza: lectura con OPERARIO -> 200',
+              await status_of(trusted, 'GET', PRODUCT_PATH, {'Authorization': f'Bearer {operario}'}) == 200)
+        check('Vía gateway de confianza: token RS256 del IdP -> 200', await status_of(
+            trusted, 'GET', PRODUCT_PATH, {'Authorization': f"Bearer {sign(rsa_key, 'RS256', 'rsa-1', 'OPERARIO')}"},
+        ) == 200)
+        check('El gateway descarta X-Identity-* del cliente (OPERARIO que dice ser ADMIN) -> 403', await status_of(
+            trusted, 'DELETE', PRODUCT_PATH,
+            {'Authorization': f'Bearer {operario}', **identity_headers('intruso', 'ADMIN', expires)},
+        ) == 403)
+        check('Vía gateway: token inválido -> 401 sin llegar al servicio',
+              await status_of(trusted, 'GET', PRODUCT_PATH, {'Authorization': 'Bearer x.y.z'}) == 401)
+
+        direct = service.base_url
+        forged = identity_headers('intruso', 'ADMIN', expires, secret='otro-secreto')
+        check('Directo: cabeceras con firma de otro secreto -> 403',
+              await status_of(direct, 'DELETE', PRODUCT_PATH, forged) == 403)
+        unsigned = dict(identity_headers('intruso', 'ADMIN', expires))
+        del unsigned['X-Identity-Signature']
+        check('Directo: cabeceras sin firma -> 403', await status_of(direct, 'DELETE', PRODUCT_PATH, unsigned) == 403)
+        check('Directo: identidad firmada pero expirada -> 403', await status_of(
+            direct, 'GET', PRODUCT_PATH, identity_headers('operario', 'OPERARIO', int(time.time()) - 1),
+        ) == 403)
+        check('Directo: identidad firmada con rol OPERARIO no puede borrar -> 403', await status_of(
+            direct, 'DELETE', PRODUCT_PATH, identity_headers('operario', 'OPERARIO', expires, method='DELETE'),
+        ) == 403)
+        check('Directo: identidad firmada de ADMIN para esta petición -> 200', await status_of(
+            direct, 'GET', PRODUCT_PATH, identity_headers('admin', 'ADMIN', expires),
+        ) == 200)
+        check('Directo: la misma identidad repetida con otro método -> 403', await status_of(
+            direct, 'DELETE', PRODUCT_PATH, identity_headers('admin', 'ADMIN', expires),
+        ) == 403)
+        check('Directo: la misma identidad repetida en otra ruta -> 403', await status_of(
+            direct, 'GET', '/api/products/2/', identity_headers('admin', 'ADMIN', expires),
+        ) == 403)
+        non_ascii = dict(identity_headers('admin', 'ADMIN', expires), **{'X-Identity-Signature': 'firmañ'})
+        check('Directo: firma con caracteres no ASCII -> 403 (no 500)',
+              await status_of(direct, 'GET', PRODUCT_PATH, non_ascii) == 403)
+        check('Sin cabeceras de identidad se verifica el JWT (ADMIN) -> 200',
+              await status_of(direct, 'GET', PRODUCT_PATH, {'Authorization': f'Bearer {admin}'}) == 200)
+
+        minters = {
+            'HS256': lambda index: mint_token('OPERARIO', f'usuario-{index}'),
+            'RS256': lambda index: sign(rsa_key, 'RS256', 'rsa-1', 'OPERARIO', f'usuario-{index}'),
+        }
+        results = {}
+        for algorithm, mint in minters.items():
+            unique = [mint(index) for index in range(args.requests * args.rounds * 2)]
+            scenarios = {'únicos': iter(unique), 'repetido': None}
+            for tokens_name, pool in scenarios.items():
+                for _ in range(args.rounds):
+                    # Rondas alternadas: el ruido de la máquina afecta igual a ambos modos
+                    for mode, base_url in gateways.items():
+                        tokens = ([next(pool) for _ in range(args.requests)] if pool
+                                  else [mint('repetido')] * args.requests)
+                        await load(base_url, [mint('calentamiento')] * (args.concurrency * 10), args.concurrency)
+                        samples, auth, errors = await load(base_url, tokens, args.concurrency)
+                        total = results.setdefault((algorithm, tokens_name, mode), ([], [], [0]))
+                        total[0].extend(samples)
+                        total[1].extend(auth)
+                        total[2][0] += errors
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+        service.stop()
+
+    print(f"\n{'token':<20}{'gateway':<12}{'p50 ms':>9}{'p99 ms':>9}{'auth µs':>10}{'errores':>9}")
+    summary = {}
+    for key, (samples, auth, (errors,)) in results.items():
+        summary[key] = percentile(auth, 50) * 1000
+        algorithm, tokens_name, mode = key
+        print(f"{f'{algorithm} {tokens_name}':<20}{mode:<12}{percentile(samples, 50):>9.3f}"
+              f"{percentile(samples, 99):>9.3f}{summary[key]:>10.0f}{errors:>9}")
+    print('(auth µs: mediana de la etapa `jwt` del servicio según Server-Timing)')
+    check('Sin errores en las mediciones', all(errors == 0 for _, _, (errors,) in results.values()))
+    for algorithm in ('HS256', 'RS256'):
+        verified, trusted_us = summary[(algorithm, 'únicos', 'jwt')], summary[(algorithm, 'únicos', 'confianza')]
+        check(f'{algorithm}, tokens únicos: autenticación {verified:.0f} µs -> {trusted_us:.0f} µs '
+              f'con el gateway de confianza', trusted_us < verified)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gateway de confianza vs re-verificar el JWT')
+    parser.add_argument('--requests', type=int, default=2000, help='Peticiones por ronda y escenario')
+    parser.add_argument('--concurrency', type=int, default=1, help='Clientes concurrentes (1: latencia sin colas)')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    if importlib.util.find_spec('gunicorn') is None:
+        print('❌ Falta gunicorn (pip install -r products-service/requirements.txt)')
+        return 1
+
+    keys_dir = Path(tempfile.mkdtemp(prefix='products-gateway-'))
+    try:
+        failures = asyncio.run(run(args, keys_dir))
+    finally:
+        shutil.rmtree(keys_dir, ignore_errors=True)
+
+    if failures:
+        print(f'\n❌ FALLO: {len(failures)} verificaciones fallidas')
+        return 1
+    print('\n✅ ÉXITO: modo de gateway de confianza correcto')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
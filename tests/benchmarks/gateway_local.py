@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Sustituto local de Kong para probar el modo de gateway de confianza.
+
+Proxy HTTP/1.1 mínimo sobre asyncio que hace lo mismo que Kong con el plugin
+`jwt` delante de /api/products/: verifica la firma y el `exp` del token en
+cada petición (401 si no es válido) y reenvía la petición al servicio.
+
+- Modo `jwt`: reenvía el token tal cual; el servicio vuelve a verificarlo.
+- Modo `confianza`: reenvía además la identidad en cabeceras X-Identity-*
+  firmadas con HMAC (products/gateway.py); el servicio no decodifica el JWT.
+
+En ambos modos descarta las cabeceras X-Identity-* que mande el cliente.
+
+    python3 tests/benchmarks/gateway_local.py --upstream http://127.0.0.1:8000 \\
+        --port 8080 --mode confianza --secret secreto-compartido
+
+Tokens RS256/ES256: --jwks con el mismo archivo que JWT_JWKS_PATH.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from http import HTTPStatus
+
+import jwt
+
+from harness import SERVICE_DIR, HTTPConnection, generate_tokens
+
+sys.path.insert(0, str(SERVICE_DIR))
+from products.gateway import sign_identity  # noqa: E402
+
+PROTECTED_PREFIX = '/api/products/'
+IDENTITY_HEADERS = ('x-identity-subject', 'x-identity-roles', 'x-identity-expires', 'x-identity-signature')
+# HTTPConnection pone Host, Connection y Content-Length hacia el servicio
+HOP_HEADERS = ('host', 'connection', 'keep-alive', 'content-length', 'transfer-encoding')
+ROLE_CLAIMS = ('role', 'roles', 'http://schemas.microsoft.com/ws/2008/06/identity/claims/role')
+
+
+class GatewayStandIn:
+
+    def __init__(self, upstream, mode='jwt', secret=None, jwks=None, host='127.0.0.1', port=0):
+        if mode == 'confianza' and not secret:
+            raise ValueError('El modo confianza requiere --secret')
+        self.upstream = upstream
+        self.mode = mode
+        self.secret = secret
+        self.host = host
+        self.port = port
+        self.server = None
+        self.keys = {}
+        if jwks:
+            with open(jwks) as f:
+                self.keys = {key['kid']: (jwt.PyJWK(key).key, key['alg']) for key in json.load(f)['keys']}
+
+    @property
+    def base_url(self):
+        return f'http://{self.host}:{self.port}'
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def verify(self, headers):
+        """Claims del token como los valida Kong (firma y exp), o (status, detalle)."""
+        authorization = headers.get('authorization', '')
+        if not authorization.startswith('Bearer '):
+            return None, (401, {'message': 'Unauthorized'})
+        token = authorization[len('Bearer '):]
+        try:
+            header = jwt.get_unverified_header(token)
+            if header.get('alg') == generate_tokens.JWT_ALGORITHM:
+                key, algorithm = generate_tokens.JWT_SECRET_KEY, header['alg']
+            else:
+                key, algorithm = self.keys[header.get('kid')]
+            claims = jwt.decode(token, key, algorithms=[algorithm], options={'verify_aud': False})
+        except jwt.ExpiredSignatureError:
+            return None, (401, {'exp': 'token expired'})
+        except (jwt.InvalidTokenError, KeyError):
+            return None, (401, {'message': 'Invalid signature'})
+        return claims, None
+
+    def identity_headers(self, claims, method, path):
+        roles = []
+        for claim in ROLE_CLAIMS:
+            value = claims.get(claim) or []
+            roles += [role for role in (value if isinstance(value, list) else [value]) if role not in roles]
+        subject = str(claims.get('sub') or claims.get('username') or '')
+        roles_value, expires = ','.join(roles), str(claims.get('exp', ''))
+        return {
+            'X-Identity-Subject': subject,
+            'X-Identity-Roles': roles_value,
+            'X-Identity-Expires': expires,
+            'X-Identity-Signature': sign_identity(self.secret, method, path, subject, roles_value, expires),
+        }
+
+    async def forward(self, connection, method, target, headers, body):
+        lowered = {name.lower(): value for name, value in headers.items()}
+        upstream_headers = {
+            name: value for name, value in headers.items()
+            if name.lower() not in HOP_HEADERS and name.lower() not in IDENTITY_HEADERS
+        }
+        if target.startswith(PROTECTED_PREFIX):
+            claims, error = self.verify(lowered)
+            if error:
+                status, detail = error
+                return status, {'content-type': 'application/json'}, json.dumps(detail).encode()
+            if self.mode == 'confianza':
+                upstream_headers.update(self.identity_headers(claims, method, target.split('?', 1)[0]))
+        return await connection.request(method, target, upstream_headers, body)
+
+    async def handle(self, reader, writer):
+        connection = HTTPConnection(self.upstream)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip()] = value.strip()
+                length = int({name.lower(): value for name, value in headers.items()}.get('content-length', 0))
+                body = await reader.readexactly(length) if length else b''
+
+                status, response_headers, response_body = await self.forward(
+                    connection, method, target, headers, body,
+                )
+                lines = [f'HTTP/1.1 {status} {HTTPStatus(status).phrase}']
+                lines += [
+                    f'{name}: {value}' for name, value in response_headers.items()
+                    if name not in HOP_HEADERS
+                ]
+                lines.append(f'Content-Length: {len(response_body)}')
+                writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + response_body)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            await connection.close()
+            writer.close()
+
+
+async def serve(args):
+    gateway = await GatewayStandIn(
+        args.upstream, args.mode, args.secret, args.jwks, args.host, args.port,
+    ).start()
+    print(f'Gateway ({args.mode}) en {gateway.base_url} -> {args.upstream}')
+    async with gateway.server:
+        await gateway.server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sustituto local de Kong')
+    parser.add_argument('--upstream', default='http://127.0.0.1:8000')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--mode', choices=['jwt', 'confianza'], default='jwt')
+    parser.add_argument('--secret', help='Secreto HMAC compartido (GATEWAY_HMAC_SECRETS del servicio)')
+    parser.add_argument('--jwks', help='Archivo JWKS para tokens RS256/ES256')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,311 @@
+"""
+Utilidades compartidas por los benchmarks del microservicio PRODUCTS.
+
+- Levanta el servicio localmente (gunicorn o `runserver`) sobre una base
+  SQLite temporal que sustituye a PostgreSQL.
+- Genera tokens JWT igual que `tests/generate_tokens.py`.
+- Cliente HTTP/1.1 mínimo sobre asyncio (keep-alive cuando el servidor lo
+  permite) para lanzar muchas peticiones concurrentes sin dependencias.
+- Cálculo de percentiles y resumen de latencias.
+"""
+
+import asyncio
+import importlib.util
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+TESTS_DIR = Path(__file__).resolve().parents[1]
+SERVICE_DIR = TESTS_DIR.parent / 'products-service'
+
+sys.path.insert(0, str(TESTS_DIR))
+import generate_tokens  # noqa: E402
+
+
+def mint_token(role, username=None, expiration_hours=24):
+    return generate_tokens.generate_token(role, username or f'{role.lower()}-bench', expiration_hours)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(samples_ms, duration_s, statuses, errors):
+    count = len(samples_ms)
+    return {
+        'requests': count,
+        'errors': errors,
+        'duration_s': round(duration_s, 4),
+        'throughput_rps': round(count / duration_s, 2) if duration_s else 0.0,
+        'latency_ms': {
+            'mean': round(sum(samples_ms) / count, 3) if count else 0.0,
+            'p50': round(percentile(samples_ms, 50), 3),
+            'p95': round(percentile(samples_ms, 95), 3),
+            'p99': round(percentile(samples_ms, 99), 3),
+            'max': round(max(samples_ms), 3) if count else 0.0,
+        },
+        'status_codes': {str(code): n for code, n in sorted(statuses.items())},
+    }
+
+
+def close_audit_trail():
+    """
+    Escribe lo pendiente del registro de auditoría de este proceso; los
+    benchmarks en proceso lo llaman antes de borrar su DB temporal.
+    """
+    audit = sys.modules.get('products.audit')
+    if audit is not None:
+        audit.trail.close()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class LocalService:
+    """
+    Servicio PRODUCTS levantado en un subproceso con una base SQLite temporal.
+
+    `server` puede ser 'gunicorn', 'uvicorn' (gunicorn con workers ASGI) o
+    'runserver'; 'auto' usa gunicorn si está instalado. `env` permite
+    sobrescribir variables de entorno (p. ej. DJANGO_SETTINGS_MODULE).
+    """
+
+    def __init__(self, products=1000, server='auto', workers=2, threads=1, env=None, seed=42):
+        self.products = products
+        self.server = server
+        self.workers = workers
+        self.threads = threads
+        self.extra_env = env or {}
+        self.seed = seed
+        self.port = free_port()
+        self.base_url = f'http://127.0.0.1:{self.port}'
+        self.workdir = Path(tempfile.mkdtemp(prefix='products-bench-'))
+        self.process = None
+        self.log_file = None
+
+    @property
+    def env(self):
+        env = dict(os.environ)
+        env.update({
+            'DB_ENGINE': 'sqlite',
+            'DB_NAME': str(self.workdir / 'bench.sqlite3'),
+            'DEBUG': 'False',
+            'JWT_SECRET_KEY': generate_tokens.JWT_SECRET_KEY,
+            'JWT_ALGORITHM': generate_tokens.JWT_ALGORITHM,
+            'PYTHONUNBUFFERED': '1',
+            # gunicorn.conf.py los exporta a los settings (SERVER_WORKERS)
+            'GUNICORN_WORKERS': str(self.workers),
+            'GUNICORN_THREADS': str(self.threads),
+        })
+        env.update(self.extra_env)
+        return env
+
+    def manage(self, *args):
+        subprocess.run(
+            [sys.executable, 'manage.py', *args],
+            cwd=SERVICE_DIR, env=self.env, check=True,
+            stdout=subprocess.DEVNULL,
+        )
+
+    def command(self):
+        server = self.server
+        if server == 'auto':
+            server = 'gunicorn' if importlib.util.find_spec('gunicorn') else 'runserver'
+        self.server = server
+
+        if server == 'runserver':
+            return [sys.executable, 'manage.py', 'runserver', '--noreload', f'127.0.0.1:{self.port}']
+
+        command = [
+            sys.executable, '-m', 'gunicorn',
+            '--bind', f'127.0.0.1:{self.port}',
+            '--workers', str(self.workers),
+        ]
+        if server == 'uvicorn':
+            command += ['--worker-class', 'uvicorn.workers.UvicornWorker', 'products_service.asgi:application']
+        else:
+            if self.threads > 1:
+                command += ['--threads', str(self.threads)]
+            command += ['products_service.wsgi:application']
+        return command
+
+    def start(self, timeout=60):
+        self.manage('migrate', '--noinput')
+        if self.products:
+            self.manage('seed_products', '--count', str(self.products), '--seed', str(self.seed))
+
+        self.log_file = open(self.workdir / 'server.log', 'wb')
+        self.process = subprocess.Popen(
+            self.command(), cwd=SERVICE_DIR, env=self.env,
+            stdout=self.log_file, stderr=subprocess.STDOUT,
+        )
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'El servidor terminó al iniciar; ver {self.workdir / "server.log"}')
+            try:
+                status, _, _ = asyncio.run(request_once(self.base_url, 'GET', '/api/auth/test-users/'))
+                if status == 200:
+                    return self
+            except OSError:
+                pass
+            time.sleep(0.2)
+
+        self.stop()
+        raise RuntimeError('El servidor no respondió a tiempo')
+
+    def process_ids(self):
+        """PID del proceso maestro y de sus workers, vía /proc."""
+        if self.process is None:
+            return []
+        pids, pending = [], [self.process.pid]
+        while pending:
+            pid = pending.pop()
+            try:
+                with open(f'/proc/{pid}/task/{pid}/children') as f:
+                    pending.extend(int(child) for child in f.read().split())
+            except (FileNotFoundError, ProcessLookupError):
+                continue
+            pids.append(pid)
+        return pids
+
+    def _memory_bytes(self, path, field):
+        total = 0
+        for pid in self.process_ids():
+            try:
+                with open(f'/proc/{pid}/{path}') as f:
+                    for line in f:
+                        if line.startswith(field):
+                            total += int(line.split()[1]) * 1024
+                            break
+            except (FileNotFoundError, ProcessLookupError):
+                continue
+        return total
+
+    def rss_bytes(self):
+        """Memoria residente del servidor (proceso maestro + workers), vía /proc."""
+        return self._memory_bytes('status', 'VmRSS:')
+
+    def pss_bytes(self):
+        """
+        Memoria proporcional (PSS) del servidor: cada página compartida entre
+        procesos (copy-on-write tras el fork) cuenta una sola vez en el total.
+        """
+        return self._memory_bytes('smaps_rollup', 'Pss:')
+
+    def stop(self, keep_files=False):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.log_file:
+            self.log_file.close()
+        if not keep_files:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class HTTPConnection:
+    """Conexión HTTP/1.1 persistente; se reabre si el servidor la cierra."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers=None, body=b''):
+        if self.writer is None:
+            await self.connect()
+
+        lines = [
+            f'{method} {path} HTTP/1.1',
+            f'Host: {self.host}:{self.port}',
+            'Connection: keep-alive',
+            f'Content-Length: {len(body)}',
+        ]
+        for name, value in (headers or {}).items():
+            lines.append(f'{name}: {value}')
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            # El servidor cerró una conexión reutilizada: reintentar una vez
+            await self.close()
+            await self.connect()
+            return await self.request(method, path, headers, body)
+
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            response_body = b''.join(chunks)
+        elif 'content-length' in response_headers:
+            response_body = await self.reader.readexactly(int(response_headers['content-length']))
+        elif status in (204, 304):
+            response_body = b''
+        else:
+            response_body = await self.reader.read()
+            await self.close()
+
+        if response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+
+        return status, response_headers, response_body
+
+
+async def request_once(base_url, method, path, headers=None, body=b''):
+    connection = HTTPConnection(base_url)
+    try:
+        return await connection.request(method, path, headers, body)
+    finally:
+        await connection.close()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Resumen de inventario incremental (/api/products/inventory/) frente a
+agregar el catálogo en cada petición.
+
+En proceso (django.test.Client, SQLite) verifica que el resumen coincide con
+un `aggregate()` sobre `products` después de cada tipo de escritura (alta,
+PATCH, PUT, eliminación, carga y borrado masivos, movimientos de stock,
+escrituras revertidas o rechazadas) y de una secuencia aleatoria de
+--operations operaciones; que `rebuild_inventory` corrige cambios hechos por
+fuera de la API; que con otro umbral se calcula al leer sin reconstruir; y que
+/api/products/low-stock/ devuelve sólo lo que está bajo el umbral usando el
+índice parcial.
+
+Mide el tiempo de leer el resumen y de agregar el catálogo con --products
+productos y con diez veces más: el resumen no depende del tamaño.
+
+    python3 tests/benchmarks/inventario.py --products 20000 --operations 300
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from harness import SERVICE_DIR, close_audit_trail, generate_tokens, mint_token, percentile
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Resumen de inventario incremental')
+    parser.add_argument('--products', type=int, default=20000, help='Catálogo de la primera medición')
+    parser.add_argument('--operations', type=int, default=300, help='Escrituras aleatorias a verificar')
+    parser.add_argument('--reads', type=int, default=200, help='Lecturas por medición')
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix='products-inventario-'))
+    os.environ.update({
+        'DB_ENGINE': 'sqlite',
+        'DB_NAME': str(workdir / 'inventario.sqlite3'),
+        'JWT_SECRET_KEY': generate_tokens.JWT_SECRET_KEY,
+        'DJANGO_SETTINGS_MODULE': 'products_service.settings',
+    })
+    sys.path.insert(0, str(SERVICE_DIR))
+    try:
+        import django
+        import logging
+        django.setup()
+        # Las peticiones rechazadas a propósito (404/409/400) registran advertencias
+        logging.disable(logging.WARNING)
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+        call_command('seed_products', count=200, verbosity=0)
+        failures = run(args)
+    finally:
+        close_audit_trail()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if failures:
+        print(f'\n❌ FALLO: {len(failures)} verificaciones fallidas')
+        return 1
+    print('\n✅ ÉXITO: resumen de inventario consistente')
+    return 0
+
+
+def run(args):
+    from django.core.management import call_command
+    from django.db import connection, transaction
+    from django.test import Client, override_settings
+    from products import inventory
+    from products.models import InventorySummary, Product
+
+    failures = []
+
+    def check(description, condition):
+        print(f"{'✅' if condition else '❌'} {description}")
+        if not condition:
+            failures.append(description)
+
+    def consistent():
+        stored = inventory.summary()
+        return all(stored[counter] == value for counter, value in inventory.compute().items())
+
+    def send(method, path, data=None):
+        return getattr(admin, method)(path, data, content_type='application/json')
+
+    admin = Client(HTTP_AUTHORIZATION=f"Bearer {mint_token('ADMIN')}")
+    operario = Client(HTTP_AUTHORIZATION=f"Bearer {mint_token('OPERARIO')}")
+    check('Resumen inicial (seed_products) igual al agregado', consistent())
+
+    products = list(Product.objects.order_by('id')[:10])
+    steps = [
+        ('Alta', lambda: send('post', '/api/products/', {
+            'name': 'nuevo', 'sku': 'INV-1', 'quantity': 3, 'price': '12.50'})),
+        ('Alta sin cantidad (0: sin stock)', lambda: send('post', '/api/products/', {
+            'name': 'vacío', 'sku': 'INV-2', 'price': '1.00'})),
+        ('PATCH de cantidad y precio', lambda: send('patch', f'/api/products/{products[0].id}/', {
+            'quantity': 4, 'price': '99.99'})),
+        ('PUT completo', lambda: send('put', f'/api/products/{products[1].id}/', {
+            'name': 'reemplazado', 'sku': products[1].sku, 'quantity': 500, 'price': '0.10'})),
+        ('Eliminación', lambda: send('delete', f'/api/products/{products[2].id}/')),
+        ('Carga masiva (altas y actualizaciones parciales)', lambda: send('post', '/api/products/bulk/', {
+            'products': [
+                {'name': 'masivo', 'sku': 'INV-3', 'quantity': 7, 'price': '3.30'},
+                {'name': products[3].name, 'sku': products[3].sku, 'quantity': 0},
+                {'name': products[4].name, 'sku': products[4].sku, 'price': '7.77'},
+                {'name': 'inválido', 'sku': 'INV-4', 'quantity': -1, 'price': 'x'},
+            ]})),
+        ('Borrado masivo', lambda: send('post', '/api/products/bulk-delete/', {
+            'ids': [products[5].id], 'skus': [products[6].sku]})),
+        ('Movimientos de stock', lambda: send('post', '/api/products/stock-movements/', {'movements': [
+            {'sku': products[7].sku, 'delta': -products[7].quantity},
+            {'sku': products[8].sku, 'delta': 25},
+            {'sku': products[8].sku, 'delta': -5},
+        ]})),
+        ('Movimiento a negativo permitido', lambda: send('post', '/api/products/stock-movements/', {
+            'movements': [{'sku': products[9].sku, 'delta': -(products[9].quantity + 3)}],
+            'allow_negative': True})),
+        ('Movimiento rechazado (409, stock insuficiente)', lambda: send('post', '/api/products/stock-movements/', {
+            'movements': [{'sku': products[8].sku, 'delta': 1}, {'sku': products[0].sku, 'delta': -10 ** 6}]})),
+        ('Movimiento rechazado (404, SKU inexistente)', lambda: send('post', '/api/products/stock-movements/', {
+            'movements': [{'sku': products[8].sku, 'delta': 1}, {'sku': 'NO-EXISTE', 'delta': 1}]})),
+    ]
+    for description, step in steps:
+        response = step()
+        check(f'{description} ({response.status_code}): resumen igual al agregado', consistent())
+
+    with transaction.atomic():
+        send('patch', f'/api/products/{products[0].id}/', {'quantity': 1000})
+        transaction.set_rollback(True)
+    check('Escritura revertida: el resumen también se revierte', consistent())
+
+    rng = random.Random(7)
+    skus = list(Product.objects.values_list('sku', flat=True))
+    for index in range(args.operations):
+        kind = rng.choice(['patch', 'stock', 'stock', 'create', 'delete', 'bulk'])
+        sku = rng.choice(skus)
+        if kind == 'patch':
+            pk = Product.objects.filter(sku=sku).values_list('id', flat=True).first()
+            send('patch', f'/api/products/{pk}/', {'quantity': rng.randint(0, 30),
+                                                  'price': f'{rng.randint(1, 5000) / 100:.2f}'})
+        elif kind == 'stock':
+            send('post', '/api/products/stock-movements/', {'movements': [
+                {'sku': rng.choice(skus), 'delta': rng.randint(-15, 15)} for _ in range(rng.randint(1, 5))
+            ]})
+        elif kind == 'create':
+            send('post', '/api/products/', {'name': 'aleatorio', 'sku': f'RND-{index}',
+                                           'quantity': rng.randint(0, 20), 'price': '5.00'})
+            skus.append(f'RND-{index}')
+        elif kind == 'delete':
+            send('post', '/api/products/bulk-delete/', {'skus': [sku]})
+        else:
+            send('post', '/api/products/bulk/', {'products': [
+                {'name': 'lote', 'sku': rng.choice(skus), 'quantity': rng.randint(0, 40)} for _ in range(5)
+            ] + [{'name': 'lote', 'sku': f'BLK-{index}', 'quantity': 2, 'price': '2.00'}]})
+            skus.append(f'BLK-{index}')
+    check(f'{args.operations} escrituras aleatorias: resumen igual al agregado', consistent())
+    slots = InventorySummary.objects.count()
+    check(f'Escrituras repartidas entre las filas del resumen ({slots} filas)',
+          InventorySummary.objects.exclude(slot=0).exclude(products=0).exists())
+
+    # Cambios por fuera de la API
+    with connection.cursor() as cursor:
+        cursor.execute(f'UPDATE {Product._meta.db_table} SET quantity = quantity + 1')
+    check('SQL directo desincroniza el resumen (esperado)', not consistent())
+    call_command('rebuild_inventory', verbosity=0, stdout=open(os.devnull, 'w'))
+    check('rebuild_inventory lo corrige', consistent())
+
+    stored = list(InventorySummary.objects.values_list('slot', 'updated_at'))
+    with override_settings(PRODUCTS_LOW_STOCK_THRESHOLD=5):
+        summary = inventory.summary()
+        check(f"Otro umbral: se calcula al leer ({summary['low_stock']} con quantity < 5)",
+              summary['low_stock_threshold'] == 5 and summary['low_stock'] == inventory.compute()['low_stock'])
+        check('Leer no reconstruye el resumen guardado',
+              list(InventorySummary.objects.values_list('slot', 'updated_at')) == stored)
+    check('Vuelta al umbral original', inventory.summary()['low_stock_threshold'] == inventory.get_threshold()
+          and consistent())
+
+    # Endpoints
+    response = operario.get('/api/products/inventory/')
+    body = response.json()
+    expected = inventory.compute()
+    check(f'GET /api/products/inventory/ (OPERARIO) -> {response.status_code}', response.status_code == 200)
+    check('Respuesta con los totales del agregado', body['products'] == expected['products']
+          and body['units'] == expected['units'] and Decimal(body['stock_value']) == expected['stock_value']
+          and body['low_stock'] == expected['low_stock'] and body['out_of_stock'] == expected['out_of_stock'])
+    check('Sin token -> 403', Client().get('/api/products/inventory/').status_code == 403)
+
+    threshold = inventory.get_threshold()
+    listed, url = [], '/api/products/low-stock/?page_size=100'
+    while url:
+        page = operario.get(url).json()
+        listed += page['results']
+        url = page['next']
+    check(f'low-stock: {len(listed)} productos, todos con quantity < {threshold}',
+          len(listed) == expected['low_stock'] and all(item['quantity'] < threshold for item in listed))
+    below = operario.get('/api/products/low-stock/', {'below': 1, 'page_size': 100}).json()['results']
+    check('low-stock?below=1: sólo sin stock', below and all(item['quantity'] < 1 for item in below))
+    check('below inválido -> 400', operario.get('/api/products/low-stock/', {'below': 'x'}).status_code == 400)
+
+    plan = Product.objects.filter(quantity__lt=threshold).order_by('-created_at', '-id')[:21].explain()
+    check(f'EXPLAIN de low-stock usa products_low_stock_idx ({plan.strip()})', 'products_low_stock_idx' in plan)
+
+    # Lectura del resumen frente al agregado, con el catálogo x1 y x10
+    results = []
+    for size in (args.products, args.products * 10):
+        call_command('seed_products', count=size, truncate=True, verbosity=0, stdout=open(os.devnull, 'w'))
+        timings = {}
+        for name, read in (('resumen', inventory.summary), ('aggregate()', inventory.compute)):
+            samples = []
+            for _ in range(args.reads):
+                start = time.perf_counter()
+                read()
+                samples.append((time.perf_counter() - start) * 1000)
+            timings[name] = percentile(samples, 50)
+        results.append((size, timings))
+
+    print(f"\n{'productos':>10}{'resumen ms':>13}{'aggregate() ms':>17}")
+    for size, timings in results:
+        print(f"{size:>10}{timings['resumen']:>13.3f}{timings['aggregate()']:>17.3f}")
+    (small, small_t), (large, large_t) = results
+    check(f"Resumen: {small_t['resumen']:.3f} ms con {small} y {large_t['resumen']:.3f} ms con {large} productos "
+          f"(aggregate() x{large_t['aggregate()'] / small_t['aggregate()']:.1f})",
+          large_t['resumen'] < small_t['resumen'] * 2 and large_t['resumen'] < large_t['aggregate()'])
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(main())
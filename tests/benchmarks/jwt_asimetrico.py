@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Verificación de tokens RS256/ES256 con el JWKS en caché (products/jwks.py)
+frente a HS256.
+
+Genera claves RSA 2048 y EC P-256 en un directorio temporal (un JWKS y un
+PEM), apunta JWT_JWKS_PATH a él y mide, sin la caché de tokens verificados
+(el costo de la primera vez que un worker ve un token), cuánto cuesta
+`decode_jwt_token` con:
+  - HS256 (secreto compartido),
+  - RS256 y ES256 con las claves ya parseadas,
+  - RS256 "ingenuo": leyendo y parseando el JWKS (o el PEM) en cada
+    verificación.
+
+Además verifica rotación de `kid`, caché negativa, rechazo de confusión de
+algoritmos y una petición completa con token RS256.
+
+    python3 tests/benchmarks/jwt_asimetrico.py --requests 2000
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from harness import SERVICE_DIR, close_audit_trail, generate_tokens, mint_token
+
+
+def generate_keys(directory):
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+    from jwt.algorithms import RSAAlgorithm
+
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ec_key = ec.generate_private_key(ec.SECP256R1())
+
+    jwk = json.loads(RSAAlgorithm.to_jwk(rsa_key.public_key()))
+    jwk.update(kid='rsa-1', alg='RS256', use='sig')
+    (directory / 'idp.json').write_text(json.dumps({'keys': [jwk]}))
+
+    public_pem = ec_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    (directory / 'ec-1.pem').write_bytes(public_pem)
+    rsa_pem = rsa_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    return rsa_key, ec_key, rsa_pem
+
+
+def sign(private_key, algorithm, kid, role='ADMIN', username='idp-bench'):
+    import jwt
+
+    payload = {
+        'sub': username,
+        'role': role,
+        'iat': datetime.utcnow(),
+        'exp': datetime.utcnow() + timedelta(hours=1),
+    }
+    return jwt.encode(payload, private_key, algorithm=algorithm, headers={'kid': kid})
+
+
+def median_us(call, requests):
+    samples = []
+    for _ in range(requests):
+        begin = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - begin)
+    return statistics.median(samples) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verificación JWT asimétrica vs HS256')
+    parser.add_argument('--requests', type=int, default=2000, help='Verificaciones medidas por caso')
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix='products-jwks-'))
+    keys_dir = workdir / 'jwks'
+    keys_dir.mkdir()
+    os.environ.update({
+        'DB_ENGINE': 'sqlite',
+        'DB_NAME': str(workdir / 'jwks.sqlite3'),
+        'JWT_SECRET_KEY': generate_tokens.JWT_SECRET_KEY,
+        'JWT_JWKS_PATH': str(keys_dir),
+        'DJANGO_SETTINGS_MODULE': 'products_service.settings',
+    })
+    sys.path.insert(0, str(SERVICE_DIR))
+    try:
+        rsa_key, ec_key, rsa_pem = generate_keys(keys_dir)
+        import django
+        import logging
+        django.setup()
+        logging.disable(logging.WARNING)
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+        call_command('seed_products', count=50, verbosity=0)
+        return run(args, keys_dir, rsa_key, ec_key, rsa_pem)
+    finally:
+        close_audit_trail()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run(args, keys_dir, rsa_key, ec_key, rsa_pem):
+    import jwt
+    from django.test import Client
+    from products.jwks import get_keyset
+    from products.utils import decode_jwt_token
+
+    failures = []
+
+    def check(description, condition):
+        print(f"{'✅' if condition else '❌'} {description}")
+        if not condition:
+            failures.append(description)
+
+    hs_token = mint_token('ADMIN')
+    rs_token = sign(rsa_key, 'RS256', 'rsa-1')
+    es_token = sign(ec_key, 'ES256', 'ec-1')
+    keyset = get_keyset()
+
+    check(f"Claves cargadas por kid: {sorted(keyset._keys)}", sorted(keyset._keys) == ['ec-1', 'rsa-1'])
+    check('HS256 verificado', decode_jwt_token(hs_token) is not None)
+    check('RS256 verificado con el JWKS', decode_jwt_token(rs_token) is not None)
+    check('ES256 verificado con el PEM', decode_jwt_token(es_token) is not None)
+
+    unknown = sign(rsa_key, 'RS256', 'rsa-desconocido')
+    before = keyset.stats()['unknown_kids']
+    for _ in range(100):
+        decode_jwt_token(unknown)
+    check('kid desconocido rechazado y en caché negativa (una sola búsqueda)',
+          decode_jwt_token(unknown) is None and keyset.stats()['unknown_kids'] == before + 1)
+
+    # PyJWT impide firmar HS256 con un PEM; se arma a mano el token de "confusión"
+    def b64(data):
+        return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+    signing_input = b64(json.dumps({'alg': 'HS256', 'kid': 'rsa-1', 'typ': 'JWT'}).encode()) + b'.' + \
+        b64(json.dumps({'sub': 'x', 'role': 'ADMIN', 'exp': int(time.time()) + 3600}).encode())
+    confused = (signing_input + b'.' + b64(hmac.new(rsa_pem, signing_input, hashlib.sha256).digest())).decode()
+    check('HS256 firmado con la clave pública rechazado', decode_jwt_token(confused) is None)
+    check('RS256 con kid de una clave EC rechazado', decode_jwt_token(sign(rsa_key, 'RS256', 'ec-1')) is None)
+
+    # Rotación: el proveedor publica una clave nueva
+    from cryptography.hazmat.primitives.asymmetric import rsa as rsa_module
+    from jwt.algorithms import RSAAlgorithm
+    new_key = rsa_module.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(RSAAlgorithm.to_jwk(new_key.public_key()))
+    jwk.update(kid='rsa-2', alg='RS256', use='sig')
+    (keys_dir / 'idp-2.json').write_text(json.dumps({'keys': [jwk]}))
+    time.sleep(1.1)
+    check('kid rotado aceptado sin reiniciar', decode_jwt_token(sign(new_key, 'RS256', 'rsa-2')) is not None)
+
+    client = Client(HTTP_AUTHORIZATION=f'Bearer {rs_token}')
+    check('Petición completa con token RS256', client.get('/api/products/').status_code == 200)
+    operario = Client(HTTP_AUTHORIZATION=f"Bearer {sign(ec_key, 'ES256', 'ec-1', role='OPERARIO')}")
+    check('OPERARIO con ES256 sigue sin poder borrar', operario.delete('/api/products/1/').status_code == 403)
+
+    pem_text = rsa_pem.decode()
+    jwks_file = keys_dir / 'idp.json'
+
+    def naive_jwks():
+        header = jwt.get_unverified_header(rs_token)
+        keys = jwt.PyJWKSet.from_json(jwks_file.read_text())
+        key = next(k for k in keys.keys if k.key_id == header['kid'])
+        jwt.decode(rs_token, key.key, algorithms=['RS256'])
+
+    def naive_pem():
+        jwt.decode(rs_token, pem_text, algorithms=['RS256'])
+
+    results = {
+        'HS256': median_us(lambda: decode_jwt_token(hs_token), args.requests),
+        'RS256 (JWKS en caché)': median_us(lambda: decode_jwt_token(rs_token), args.requests),
+        'ES256 (JWKS en caché)': median_us(lambda: decode_jwt_token(es_token), args.requests),
+        'RS256 (JWKS por petición)': median_us(naive_jwks, args.requests),
+        'RS256 (PEM por petición)': median_us(naive_pem, args.requests),
+    }
+    print(f"\n{'verificación':<29}{'mediana µs':>12}{'vs HS256':>10}")
+    for name, value in results.items():
+        print(f"{name:<29}{value:>12.1f}{value / results['HS256']:>9.1f}x")
+
+    cached, naive_cost = results['RS256 (JWKS en caché)'], results['RS256 (JWKS por petición)']
+    check(f'JWKS en caché más barato que parsearlo por petición ({naive_cost / cached:.1f}x)', cached < naive_cost)
+
+    if failures:
+        print(f'\n❌ FALLO: {len(failures)} verificaciones fallidas')
+        return 1
+    print('\n✅ ÉXITO: verificación asimétrica correcta')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Prueba de latencia del rechazo 403 (ASR de integridad).
+
+Envía peticiones DELETE con un token OPERARIO a través de la pila completa de
+middleware de Django (en proceso, sin red) y verifica que:
+  - el 100% de las respuestas sean 403 Forbidden,
+  - ninguna petición rechazada ejecute consultas a la base de datos,
+  - el p99 de la latencia quede por debajo del presupuesto configurado.
+
+Uso:
+    python3 tests/benchmarks/latencia_rechazo.py [--requests 2000] [--budget-ms 100]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from harness import SERVICE_DIR, percentile
+
+sys.path.insert(0, str(SERVICE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'products_service.settings')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--budget-ms', type=float, default=float(os.environ.get('LATENCY_BUDGET_MS', '100')))
+    parser.add_argument('--product-id', type=int, default=1)
+    args = parser.parse_args()
+
+    import django
+    import logging
+    django.setup()
+    # Los logs de cada rechazo a consola distorsionan la medición; sin una DB
+    # alcanzable, tampoco interesan los errores del registro de auditoría
+    logging.disable(logging.ERROR)
+
+    import jwt
+    from django.conf import settings
+    from django.db import connections
+    from django.test import Client
+
+    token = jwt.encode(
+        {
+            'sub': 'operario-user',
+            'username': 'operario-user',
+            'role': 'OPERARIO',
+            'email': 'operario-user@warehouse.com',
+            'iat': datetime.utcnow(),
+            'exp': datetime.utcnow() + timedelta(hours=1),
+        },
+        settings.JWT_SECRET_KEY,
+        algorithm=settings.JWT_ALGORITHM,
+    )
+
+    queries = []
+
+    def block_queries(execute, sql, params, many, context):
+        queries.append(sql)
+        raise AssertionError('El rechazo no debe consultar la base de datos')
+
+    client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+    url = f'/api/products/{args.product_id}/'
+    samples = []
+    statuses = {}
+
+    wrappers = [connections[alias].execute_wrapper(block_queries) for alias in connections]
+    for wrapper in wrappers:
+        wrapper.__enter__()
+    try:
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            response = client.delete(url)
+            samples.append((time.perf_counter() - start) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    finally:
+        for wrapper in wrappers:
+            wrapper.__exit__(None, None, None)
+
+    p50, p95, p99 = (percentile(samples, pct) for pct in (50, 95, 99))
+    rejected = statuses.get(403, 0)
+
+    print(f"Peticiones: {args.requests}  Códigos: {statuses}")
+    print(f"Latencia (ms): p50={p50:.3f} p95={p95:.3f} p99={p99:.3f} max={max(samples):.3f}")
+    print(f"Consultas a la DB: {len(queries)}")
+
+    if rejected != args.requests:
+        print(f"❌ FALLO: {args.requests - rejected} peticiones no fueron rechazadas con 403")
+        return 1
+    if queries:
+        print("❌ FALLO: el rechazo ejecutó consultas a la base de datos")
+        return 1
+    if p99 >= args.budget_ms:
+        print(f"❌ FALLO: p99 {p99:.3f} ms supera el presupuesto de {args.budget_ms} ms")
+        return 1
+
+    print(f"✅ ÉXITO: 100% rechazado con 403, p99 {p99:.3f} ms < {args.budget_ms} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
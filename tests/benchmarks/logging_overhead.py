@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Costo de logging en el hilo de la petición.
+
+Compara, por llamada a `logger.info/warning`, el StreamHandler síncrono
+original (f-string + formato verbose) con `QueueLogHandler` + JSONFormatter
+(estilo % + muestreo de `access_granted`). El destino es un stream que
+simula una consola lenta (--write-delay-us por escritura).
+
+    python3 tests/benchmarks/logging_overhead.py --records 20000 --write-delay-us 50
+"""
+
+import argparse
+import io
+import logging
+import sys
+import time
+
+from harness import SERVICE_DIR
+
+
+class SlowStream(io.StringIO):
+
+    def __init__(self, delay_s):
+        super().__init__()
+        self.delay_s = delay_s
+
+    def write(self, text):
+        time.sleep(self.delay_s)
+        return super().write(text)
+
+
+def measure(logger, records, emit):
+    start = time.perf_counter()
+    for index in range(records):
+        emit(logger, index)
+    return (time.perf_counter() - start) / records * 1e6
+
+
+def emit_fstring(logger, index):
+    role, method = 'OPERARIO', 'GET'
+    logger.info(f"Acceso autorizado: Usuario autenticado con rol '{role}' puede realizar {method}")
+    if index % 100 == 0:
+        logger.warning(f"Acceso denegado: Usuario con rol '{role}' intentó realizar DELETE. Se requiere rol 'ADMIN'.")
+
+
+def emit_structured(logger, index):
+    role, method = 'OPERARIO', 'GET'
+    logger.info(
+        "Acceso autorizado: Usuario autenticado con rol '%s' puede realizar %s", role, method,
+        extra={'event': 'access_granted', 'role': role, 'method': method},
+    )
+    if index % 100 == 0:
+        logger.warning(
+            "Acceso denegado: Usuario con rol '%s' intentó realizar %s. Se requiere rol 'ADMIN'.", role, 'DELETE',
+            extra={'event': 'access_denied', 'role': role, 'method': 'DELETE'},
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Overhead de logging por petición')
+    parser.add_argument('--records', type=int, default=20000)
+    parser.add_argument('--write-delay-us', type=float, default=50.0, help='Latencia simulada por escritura')
+    parser.add_argument('--sample-rate', type=float, default=0.01, help='Tasa de muestreo de access_granted')
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(SERVICE_DIR))
+    from products.logging_utils import EventSamplingFilter, JSONFormatter, QueueLogHandler
+
+    delay = args.write_delay_us / 1e6
+
+    sync_stream = SlowStream(delay)
+    sync_handler = logging.StreamHandler(sync_stream)
+    sync_handler.setFormatter(logging.Formatter('{levelname} {asctime} {module} {message}', style='{'))
+    sync_logger = logging.getLogger('bench.sync')
+    sync_logger.addHandler(sync_handler)
+    sync_logger.setLevel(logging.INFO)
+    sync_logger.propagate = False
+
+    queue_stream = SlowStream(delay)
+    queue_handler = QueueLogHandler(stream=queue_stream, queue_size=100000)
+    queue_handler.setFormatter(JSONFormatter())
+    queue_handler.addFilter(EventSamplingFilter({'access_granted': args.sample_rate}))
+    queue_logger = logging.getLogger('bench.queue')
+    queue_logger.addHandler(queue_handler)
+    queue_logger.setLevel(logging.INFO)
+    queue_logger.propagate = False
+
+    sync_us = measure(sync_logger, args.records, emit_fstring)
+    queue_us = measure(queue_logger, args.records, emit_structured)
+    queue_handler.stop()
+
+    denials = len(range(0, args.records, 100))
+    written = queue_stream.getvalue().count('\n')
+    kept_denials = queue_stream.getvalue().count('"access_denied"')
+
+    print(f'síncrono (f-string, StreamHandler):  {sync_us:8.2f} µs/petición, {sync_stream.getvalue().count(chr(10))} líneas')
+    print(f'cola + JSON + muestreo:               {queue_us:8.2f} µs/petición, {written} líneas '
+          f'({queue_handler.dropped} descartadas)')
+    print(f'denegaciones conservadas: {kept_denials}/{denials}')
+
+    if kept_denials != denials:
+        print('❌ FALLO: se perdieron eventos de seguridad')
+        return 1
+    print(f'✅ x{sync_us / queue_us:.1f} menos tiempo de logging en el hilo de la petición')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Arranque y costo por petición: perfil completo (`settings`) frente al perfil
+"api" (`settings_api`).
+
+Para cada perfil lanza varios procesos nuevos que miden:
+  - arranque en frío: `django.setup()` + carga de middleware + primera
+    petición respondida (lo que paga un worker nuevo al escalar),
+  - módulos importados,
+  - mediana por petición de un GET cacheado del listado y del DELETE
+    rechazado (403) de un OPERARIO, a través de la pila completa en proceso.
+
+    python3 tests/benchmarks/perfil_api.py --runs 5 --requests 2000
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from harness import SERVICE_DIR, close_audit_trail, generate_tokens, mint_token
+
+PROFILES = {
+    'completo': 'products_service.settings',
+    'api': 'products_service.settings_api',
+}
+
+# Se ejecuta en un proceso nuevo por medición
+PROBE = r'''
+import json, statistics, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+from django.core.handlers.wsgi import WSGIHandler
+handler = WSGIHandler()
+from django.test import Client
+import logging
+logging.disable(logging.WARNING)
+admin = Client(HTTP_AUTHORIZATION='Bearer ' + sys.argv[1])
+operario = Client(HTTP_AUTHORIZATION='Bearer ' + sys.argv[2])
+assert admin.get('/api/products/?page_size=20').status_code == 200
+cold_start = time.perf_counter() - start
+
+def median_us(call, requests):
+    samples = []
+    for _ in range(requests):
+        begin = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - begin)
+    return statistics.median(samples) * 1e6
+
+requests = int(sys.argv[3])
+print(json.dumps({
+    'cold_start_ms': cold_start * 1000,
+    'modules': len(sys.modules),
+    'list_us': median_us(lambda: admin.get('/api/products/?page_size=20'), requests),
+    'reject_us': median_us(lambda: operario.delete('/api/products/1/'), requests),
+}))
+'''
+
+
+def run_probe(settings_module, env, args):
+    env = dict(env, DJANGO_SETTINGS_MODULE=settings_module)
+    output = subprocess.check_output(
+        [sys.executable, '-c', PROBE, mint_token('ADMIN'), mint_token('OPERARIO'), str(args.requests)],
+        cwd=SERVICE_DIR, env=env,
+    )
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Perfil completo vs perfil api')
+    parser.add_argument('--runs', type=int, default=5, help='Procesos nuevos por perfil')
+    parser.add_argument('--requests', type=int, default=2000, help='Peticiones medidas por proceso')
+    parser.add_argument('--products', type=int, default=1000)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix='products-perfil-'))
+    env = dict(
+        os.environ,
+        DB_ENGINE='sqlite',
+        DB_NAME=str(workdir / 'perfil.sqlite3'),
+        DEBUG='False',
+        JWT_SECRET_KEY=generate_tokens.JWT_SECRET_KEY,
+        JWT_ALGORITHM=generate_tokens.JWT_ALGORITHM,
+    )
+    try:
+        for command in (['migrate', '--noinput'], ['seed_products', '--count', str(args.products)]):
+            subprocess.run([sys.executable, 'manage.py', *command], cwd=SERVICE_DIR, env=env,
+                           check=True, stdout=subprocess.DEVNULL)
+
+        results = {}
+        for name, settings_module in PROFILES.items():
+            probes = [run_probe(settings_module, env, args) for _ in range(args.runs)]
+            results[name] = {key: statistics.median(probe[key] for probe in probes) for key in probes[0]}
+    finally:
+        close_audit_trail()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{'perfil':<10}{'arranque ms':>13}{'módulos':>10}{'GET lista µs':>15}{'403 µs':>10}")
+    for name, data in results.items():
+        print(f"{name:<10}{data['cold_start_ms']:>13.1f}{data['modules']:>10.0f}"
+              f"{data['list_us']:>15.1f}{data['reject_us']:>10.1f}")
+
+    full, api = results['completo'], results['api']
+
+    def saving(key):
+        return 100 * (1 - api[key] / full[key])
+
+    print(f"\nPerfil api: arranque {saving('cold_start_ms'):.1f}% menos, "
+          f"GET {saving('list_us'):.1f}% menos, 403 {saving('reject_us'):.1f}% menos")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Política RBAC compilada (products/policy.py).
+
+Verifica, a través de la API completa en proceso, la matriz de permisos de
+products/policy.json (ADMIN, OPERARIO, SUPERVISOR, AUDITOR), los tokens con
+varios roles y el rechazo temprano en el middleware. Después mide el costo
+de una decisión (`authorize`) con la política real y con una sintética de
+cientos de roles, recursos y reglas: debe ser el mismo.
+
+    python3 tests/benchmarks/rbac_politica.py --requests 200000
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from harness import SERVICE_DIR, close_audit_trail, generate_tokens
+
+import jwt
+
+
+def token(roles, username='rbac-bench'):
+    claims = {
+        'sub': username,
+        'exp': int(time.time()) + 3600,
+        'role' if isinstance(roles, str) else 'roles': roles,
+    }
+    return jwt.encode(claims, generate_tokens.JWT_SECRET_KEY, algorithm=generate_tokens.JWT_ALGORITHM)
+
+
+def synthetic_policy(roles, resources):
+    actions = ['read', 'write', 'delete']
+    return {
+        'resources': {f'r{index}': actions for index in range(resources)},
+        # Las rutas dependen de las URLs, no de los roles: tantas como la real
+        'routes': [{'path': f'/api/r{index}/', 'resource': f'r{index}'} for index in range(1, 4)]
+        + [{'path': '/api/products/', 'resource': 'r0'}],
+        'rules': [
+            {'roles': [f'ROL{role}'], 'resource': f'r{(role * 7) % resources}', 'actions': actions[:1 + role % 3]}
+            for role in range(roles)
+        ] + [{'roles': ['ADMIN'], 'resource': '*', 'actions': ['*']}],
+    }
+
+
+class FakeRequest:
+    method = 'DELETE'
+    path_info = '/api/products/1/'
+
+    def __init__(self, roles):
+        self.user_roles = roles
+
+
+def decision_ns(authorize, roles, requests, rounds=5):
+    request = FakeRequest(roles)
+    best = float('inf')
+    for _ in range(rounds):
+        begin = time.perf_counter()
+        for _ in range(requests):
+            authorize(request)
+        best = min(best, time.perf_counter() - begin)
+    return best / requests * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Política RBAC compilada')
+    parser.add_argument('--requests', type=int, default=200000, help='Decisiones por medición')
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix='products-rbac-'))
+    os.environ.update({
+        'DB_ENGINE': 'sqlite',
+        'DB_NAME': str(workdir / 'rbac.sqlite3'),
+        'JWT_SECRET_KEY': generate_tokens.JWT_SECRET_KEY,
+        'DJANGO_SETTINGS_MODULE': 'products_service.settings',
+    })
+    sys.path.insert(0, str(SERVICE_DIR))
+    try:
+        import django
+        import logging
+        django.setup()
+        logging.disable(logging.WARNING)
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+        call_command('seed_products', count=20, verbosity=0)
+        return run(args)
+    finally:
+        close_audit_trail()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run(args):
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from products import policy
+    from products.models import Product
+    from products.permissions import authorize
+
+    failures = []
+
+    def check(description, condition):
+        print(f"{'✅' if condition else '❌'} {description}")
+        if not condition:
+            failures.append(description)
+
+    product = Product.objects.order_by('id').first()
+    detail = f'/api/products/{product.id}/'
+    movement = {'movements': [{'sku': product.sku, 'delta': 1}]}
+
+    def call(roles, method, path, data=None):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token(roles)}'} if roles else {}
+        return getattr(Client(), method)(path, data, content_type='application/json', **headers).status_code
+
+    matrix = [
+        ('ADMIN', 'delete', detail, None, 204),
+        ('OPERARIO', 'get', '/api/products/', None, 200),
+        ('OPERARIO', 'patch', detail, {'name': 'x'}, 403),
+        ('OPERARIO', 'post', '/api/products/stock-movements/', movement, 403),
+        ('SUPERVISOR', 'post', '/api/products/stock-movements/', movement, 200),
+        ('SUPERVISOR', 'post', '/api/products/bulk-delete/', {'ids': [1]}, 403),
+        ('AUDITOR', 'get', '/api/products/cache-stats/', None, 200),
+        ('AUDITOR', 'post', '/api/products/stock-movements/', movement, 403),
+        ('OPERARIO', 'get', '/api/products/cache-stats/', None, 403),
+        (['OPERARIO', 'SUPERVISOR'], 'post', '/api/products/stock-movements/', movement, 200),
+        (['OPERARIO', 'AUDITOR'], 'get', '/api/products/cache-stats/', None, 200),
+        (['OPERARIO', 'AUDITOR'], 'delete', detail, None, 403),
+        ('INVITADO', 'get', '/api/products/', None, 403),
+        (None, 'get', '/api/products/', None, 403),
+    ]
+    for roles, method, path, data, expected in matrix:
+        if expected == 204:
+            path = f'/api/products/{Product.objects.order_by("-id").first().id}/'
+        status = call(roles, method, path, data)
+        check(f'{roles} {method.upper()} {path} -> {status} (esperado {expected})', status == expected)
+
+    with CaptureQueriesContext(connection) as queries:
+        call('SUPERVISOR', 'delete', detail)
+    check('Rechazo por política en el middleware, sin consultas a la DB', len(queries) == 0)
+
+    response = Client(HTTP_AUTHORIZATION=f"Bearer {token('OPERARIO')}").delete(detail)
+    check(f"Mensaje derivado de la política: {response.json()['detail']!r}",
+          response.json()['detail'] == "Acción no autorizada. Requiere rol 'ADMIN'.")
+
+    real = decision_ns(authorize, ('OPERARIO',), args.requests)
+    multi = decision_ns(authorize, ('OPERARIO', 'AUDITOR', 'SUPERVISOR'), args.requests)
+    large = policy.Policy.compile(synthetic_policy(roles=500, resources=200))
+    policy._policy = large
+    try:
+        large_ns = decision_ns(authorize, ('ROL3',), args.requests)
+    finally:
+        policy.reset_policy()
+    # Se repite tras la sintética para que el orden no favorezca a ninguna
+    real = min(real, decision_ns(authorize, ('OPERARIO',), args.requests))
+
+    print(f"\n{'política':<36}{'reglas':>8}{'ns/decisión':>14}")
+    print(f"{'products/policy.json, 1 rol':<36}{len(policy.get_policy().allowed):>8}{real:>14.0f}")
+    print(f"{'products/policy.json, 3 roles':<36}{len(policy.get_policy().allowed):>8}{multi:>14.0f}")
+    print(f"{'sintética 500 roles x 200 recursos':<36}{len(large.allowed):>8}{large_ns:>14.0f}")
+    check(f'Costo por decisión no crece con la política ({large_ns / real:.2f}x)', large_ns / real < 1.5)
+
+    if failures:
+        print(f'\n❌ FALLO: {len(failures)} verificaciones fallidas')
+        return 1
+    print('\n✅ ÉXITO: política RBAC correcta')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Prueba local del enrutamiento a réplicas de lectura (products/db_router.py).
+
+Crea un primario SQLite con un catálogo pequeño y dos "réplicas" (copias del
+archivo) en las que el producto de prueba tiene otro nombre, de modo que la
+respuesta indica de qué base se leyó. Verifica, a través de la API completa
+en proceso, que:
+  - los GET de productos se reparten entre las réplicas,
+  - las escrituras van al primario,
+  - el autor de una escritura lee del primario durante READ_YOUR_WRITES_SECONDS,
+    sin pasar por respuestas cacheadas desde una réplica (en ASGI, con la
+    API async de la caché: sin E/S en el hilo del bucle),
+  - una réplica con retraso (simulado) sale de la rotación y, sin réplicas
+    sanas, se lee del primario.
+
+Uso:
+    python3 tests/benchmarks/replicas.py
+"""
+
+import asyncio
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from harness import SERVICE_DIR, close_audit_trail, generate_tokens, mint_token
+
+STICKY_SECONDS = 1
+
+
+def setup_django(workdir):
+    primary = workdir / 'primary.sqlite3'
+    replicas = [workdir / 'replica1.sqlite3', workdir / 'replica2.sqlite3']
+    os.environ.update({
+        'DB_ENGINE': 'sqlite',
+        'DB_NAME': str(primary),
+        'DB_REPLICAS': ','.join(str(path) for path in replicas),
+        'READ_YOUR_WRITES_SECONDS': str(STICKY_SECONDS),
+        'REPLICA_LAG_CHECK_INTERVAL': '0',
+        'JWT_SECRET_KEY': generate_tokens.JWT_SECRET_KEY,
+        'DJANGO_SETTINGS_MODULE': 'products_service.settings',
+    })
+    sys.path.insert(0, str(SERVICE_DIR))
+
+    import django
+    import logging
+    django.setup()
+    logging.disable(logging.WARNING)
+
+    from django.core.management import call_command
+    from django.db import connections
+    from products.models import Product
+
+    call_command('migrate', verbosity=0)
+    call_command('seed_products', count=50, verbosity=0)
+    product_id = Product.objects.order_by('id').values_list('id', flat=True).first()
+    connections.close_all()
+
+    for index, path in enumerate(replicas, start=1):
+        shutil.copyfile(primary, path)
+        with sqlite3.connect(path) as db:
+            db.execute('UPDATE products SET name = ? WHERE id = ?', (f'replica{index}', product_id))
+    return product_id
+
+
+def main():
+    workdir = Path(tempfile.mkdtemp(prefix='products-replicas-'))
+    try:
+        product_id = setup_django(workdir)
+        return run_checks(product_id)
+    finally:
+        close_audit_trail()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+async def async_routing():
+    """Destinos de GET, PATCH y GET por el middleware async y accesos a la caché desde el hilo del bucle."""
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from products import cache as product_cache
+    from products.db_router import ReplicaRoutingMiddleware, read_target
+
+    loop_thread = threading.get_ident()
+    cache_class = type(product_cache.get_cache())
+    calls = []
+    targets = []
+
+    def spy(method):
+        def wrapper(self, *args, **kwargs):
+            calls.append(threading.get_ident())
+            return method(self, *args, **kwargs)
+        return wrapper
+
+    async def view(request):
+        targets.append(read_target.get())
+        return HttpResponse()
+
+    middleware = ReplicaRoutingMiddleware(view)
+    factory = RequestFactory()
+    with mock.patch.object(cache_class, 'get', spy(cache_class.get)), \
+            mock.patch.object(cache_class, 'set', spy(cache_class.set)):
+        for method in ('get', 'patch', 'get'):
+            request = getattr(factory, method)('/api/products/')
+            request.user_info = {'username': 'asgi-replicas'}
+            await middleware(request)
+    return targets, calls.count(loop_thread)
+
+
+def run_checks(product_id):
+    from django.conf import settings
+    from django.db import router
+    from django.test import Client
+    from products import cache as product_cache
+
+    replica_router = router.routers[0]
+    admin = Client(HTTP_AUTHORIZATION=f"Bearer {mint_token('ADMIN', 'admin-replicas')}")
+    operario = Client(HTTP_AUTHORIZATION=f"Bearer {mint_token('OPERARIO', 'operario-replicas')}")
+    path = f'/api/products/{product_id}/'
+    failures = []
+
+    def read(client):
+        # Nueva versión de la caché: cada lectura llega a la base de datos
+        product_cache._bump_version()
+        return client.get(path).json()['name']
+
+    def check(description, condition):
+        print(f"{'✅' if condition else '❌'} {description}")
+        if not condition:
+            failures.append(description)
+
+    names = {read(operario) for _ in range(4)}
+    check(f'Lecturas repartidas entre réplicas: {sorted(names)}', names == {'replica1', 'replica2'})
+
+    response = admin.patch(path, {'name': 'primario'}, content_type='application/json')
+    check('Escritura aceptada en el primario', response.status_code == 200)
+    check('El autor de la escritura lee del primario', read(admin) == 'primario')
+    check('Otro usuario sigue leyendo de las réplicas', read(operario) in {'replica1', 'replica2'})
+    # Sin cambiar la versión: la entrada que dejó la lectura de la réplica
+    cached = operario.get(path).json()['name']
+    check(f'El autor no recibe la respuesta cacheada desde una réplica ({cached!r})',
+          admin.get(path).json()['name'] == 'primario' and product_cache.stats.bypassed)
+    check('Su lectura del primario reemplaza la entrada', operario.get(path).json()['name'] == 'primario')
+
+    time.sleep(STICKY_SECONDS + 0.1)
+    check('Pasado READ_YOUR_WRITES_SECONDS el autor vuelve a las réplicas', read(admin) in {'replica1', 'replica2'})
+
+    targets, on_loop = asyncio.run(async_routing())
+    check(f'ASGI: leer lo propio con la API async de la caché ({targets}, {on_loop} accesos en el bucle)',
+          targets == ['replica', 'default', 'default'] and on_loop == 0)
+
+    settings.REPLICA_SIMULATED_LAG = {'replica1': settings.REPLICA_MAX_LAG_SECONDS + 10}
+    replica_router.reset()
+    names = {read(operario) for _ in range(4)}
+    check(f'Réplica con retraso fuera de rotación: {sorted(names)}', names == {'replica2'})
+
+    settings.REPLICA_SIMULATED_LAG = {alias: 60 for alias in replica_router.replicas}
+    replica_router.reset()
+    check('Sin réplicas sanas se lee del primario', read(operario) == 'primario')
+
+    if failures:
+        print(f'\n❌ FALLO: {len(failures)} verificaciones fallidas')
+        return 1
+    print('\n✅ ÉXITO: enrutamiento a réplicas correcto')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
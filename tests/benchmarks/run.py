@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga y latencia de la API de productos.
+
+Levanta el servicio localmente sobre SQLite (sustituto de PostgreSQL), genera
+un catálogo sintético con `seed_products --count`, y lanza clientes asyncio
+concurrentes con tokens generados como en `tests/generate_tokens.py`.
+
+Escenarios:
+  operario_delete  DELETE de un OPERARIO (se espera 403, ASR de integridad)
+  admin_crud       POST -> GET -> PATCH -> DELETE de un ADMIN
+  list             GET del listado siguiendo los cursores `next`
+  retrieve         GET de productos al azar
+  stock_hot        POST /stock-movements/ de 5 deltas sobre pocos SKUs calientes
+  stock_patch      lo mismo con GET + PATCH de quantity (flujo anterior)
+
+Por escenario reporta throughput y latencias p50/p95/p99 y las guarda en JSON
+para comparar entre commits:
+
+    python3 tests/benchmarks/run.py --output resultados.json
+    python3 tests/benchmarks/run.py --compare resultados.json
+
+Con --url se mide un servicio ya levantado (p. ej. detrás de Kong) en lugar
+de iniciar uno local; los tokens deben coincidir con su JWT_SECRET_KEY.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from harness import HTTPConnection, LocalService, mint_token, summarize
+
+SCENARIOS = ['operario_delete', 'admin_crud', 'list', 'retrieve', 'stock_hot', 'stock_patch']
+
+
+class Recorder:
+
+    def __init__(self):
+        self.samples = []
+        self.statuses = {}
+        self.errors = 0
+
+    async def call(self, connection, method, path, expected, headers, body=b''):
+        start = time.perf_counter()
+        status, response_headers, response_body = await connection.request(method, path, headers, body)
+        self.samples.append((time.perf_counter() - start) * 1000)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status != expected:
+            self.errors += 1
+        return status, response_headers, response_body
+
+
+class Scenarios:
+
+    def __init__(self, products, page_size):
+        self.products = products
+        self.page_size = page_size
+        self.admin = {'Authorization': f"Bearer {mint_token('ADMIN', 'admin-user')}"}
+        self.operario = {'Authorization': f"Bearer {mint_token('OPERARIO', 'operario-user')}"}
+        self.json_admin = dict(self.admin, **{'Content-Type': 'application/json'})
+        self.counter = 0
+        self.hot_products = None
+
+    def random_id(self, rng):
+        return rng.randint(1, max(1, self.products))
+
+    async def operario_delete(self, recorder, connection, rng, state):
+        await recorder.call(connection, 'DELETE', f'/api/products/{self.random_id(rng)}/', 403, self.operario)
+
+    async def admin_crud(self, recorder, connection, rng, state):
+        self.counter += 1
+        sku = f'BENCH-{id(state)}-{self.counter}'
+        body = json.dumps({'name': 'Benchmark', 'sku': sku, 'quantity': 10, 'price': '9.99'}).encode()
+        status, _, response = await recorder.call(connection, 'POST', '/api/products/', 201, self.json_admin, body)
+        if status != 201:
+            return
+        path = f"/api/products/{json.loads(response)['id']}/"
+        await recorder.call(connection, 'GET', path, 200, self.admin)
+        await recorder.call(connection, 'PATCH', path, 200, self.json_admin, b'{"quantity": 11}')
+        await recorder.call(connection, 'DELETE', path, 204, self.admin)
+
+    async def list(self, recorder, connection, rng, state):
+        path = state.get('next') or f'/api/products/?page_size={self.page_size}'
+        status, _, response = await recorder.call(connection, 'GET', path, 200, self.admin)
+        next_url = json.loads(response).get('next') if status == 200 else None
+        # Se recorren hasta 10 páginas seguidas y luego se vuelve al inicio
+        state['depth'] = state.get('depth', 0) + 1
+        if next_url and state['depth'] < 10:
+            parts = urlsplit(next_url)
+            state['next'] = f'{parts.path}?{parts.query}'
+        else:
+            state['next'] = None
+            state['depth'] = 0
+
+    async def retrieve(self, recorder, connection, rng, state):
+        await recorder.call(connection, 'GET', f'/api/products/{self.random_id(rng)}/', 200, self.admin)
+
+    async def get_hot_products(self, connection):
+        # Los 10 productos más recientes hacen de SKUs calientes
+        if self.hot_products is None:
+            _, _, response = await connection.request('GET', '/api/products/?page_size=10&fields=id,sku', self.admin)
+            self.hot_products = [(item['id'], item['sku']) for item in json.loads(response)['results']]
+        return self.hot_products
+
+    async def stock_hot(self, recorder, connection, rng, state):
+        hot = await self.get_hot_products(connection)
+        movements = [{'sku': rng.choice(hot)[1], 'delta': rng.choice((-2, -1, 1, 2))} for _ in range(5)]
+        body = json.dumps({'movements': movements, 'allow_negative': True}).encode()
+        await recorder.call(connection, 'POST', '/api/products/stock-movements/', 200, self.json_admin, body)
+
+    async def stock_patch(self, recorder, connection, rng, state):
+        hot = await self.get_hot_products(connection)
+        for _ in range(5):
+            path = f'/api/products/{rng.choice(hot)[0]}/?fields=quantity'
+            status, _, response = await recorder.call(connection, 'GET', path, 200, self.admin)
+            if status != 200:
+                return
+            quantity = json.loads(response)['quantity'] + rng.choice((-2, -1, 1, 2))
+            body = json.dumps({'quantity': quantity}).encode()
+            await recorder.call(connection, 'PATCH', path, 200, self.json_admin, body)
+
+
+async def run_scenario(base_url, operation, total, concurrency, warmup, seed):
+    recorder = Recorder()
+
+    async def client(index, warmup_requests=0):
+        connection = HTTPConnection(base_url)
+        rng = random.Random(seed + index)
+        state = {}
+        try:
+            if warmup_requests:
+                discarded = Recorder()
+                while len(discarded.samples) < warmup_requests:
+                    await operation(discarded, connection, rng, state)
+                return
+            while len(recorder.samples) < total:
+                await operation(recorder, connection, rng, state)
+        finally:
+            await connection.close()
+
+    if warmup:
+        await client(-1, warmup)
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    duration = time.perf_counter() - start
+    return summarize(recorder.samples, duration, recorder.statuses, recorder.errors)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    print(f"{'escenario':<18}{'req':>8}{'err':>6}{'rps':>10}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)")
+    for name, data in results['scenarios'].items():
+        latency = data['latency_ms']
+        print(
+            f"{name:<18}{data['requests']:>8}{data['errors']:>6}{data['throughput_rps']:>10.1f}"
+            f"{latency['p50']:>9.2f}{latency['p95']:>9.2f}{latency['p99']:>9.2f}"
+        )
+
+
+def print_comparison(baseline, results):
+    print(f"\nComparación con {baseline['meta'].get('commit') or 'referencia'} (cambio %, negativo = mejor en latencia)")
+    for name, data in results['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if not before:
+            continue
+
+        def delta(new, old):
+            return (new - old) / old * 100 if old else 0.0
+
+        print(
+            f"{name:<18}"
+            f"rps {delta(data['throughput_rps'], before['throughput_rps']):+7.1f}%  "
+            f"p50 {delta(data['latency_ms']['p50'], before['latency_ms']['p50']):+7.1f}%  "
+            f"p99 {delta(data['latency_ms']['p99'], before['latency_ms']['p99']):+7.1f}%"
+        )
+
+
+async def run_all(args, base_url):
+    scenarios = Scenarios(args.products, args.page_size)
+    results = {}
+    for name in args.scenarios:
+        results[name] = await run_scenario(
+            base_url, getattr(scenarios, name), args.requests, args.concurrency, args.warmup, args.seed,
+        )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de la API de productos')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--requests', type=int, default=2000, help='Peticiones medidas por escenario')
+    parser.add_argument('--concurrency', type=int, default=32, help='Clientes concurrentes')
+    parser.add_argument('--warmup', type=int, default=100, help='Peticiones de calentamiento por escenario')
+    parser.add_argument('--products', type=int, default=10000, help='Tamaño del catálogo sintético')
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--server', choices=['auto', 'gunicorn', 'uvicorn', 'runserver'], default='auto')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--env', action='append', default=[], metavar='VAR=VALOR',
+                        help='Variables de entorno extra para el servidor local')
+    parser.add_argument('--url', help='Medir un servicio ya levantado en lugar de iniciar uno local')
+    parser.add_argument('--output', help='Archivo JSON donde guardar los resultados')
+    parser.add_argument('--compare', help='Archivo JSON de resultados previos para comparar')
+    args = parser.parse_args(argv)
+
+    meta = {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'concurrency': args.concurrency,
+        'requests': args.requests,
+        'products': args.products,
+        'env': args.env,
+    }
+
+    if args.url:
+        meta['server'] = args.url
+        scenario_results = asyncio.run(run_all(args, args.url.rstrip('/')))
+    else:
+        extra_env = dict(item.split('=', 1) for item in args.env)
+        service = LocalService(
+            products=args.products, server=args.server, workers=args.workers,
+            threads=args.threads, env=extra_env, seed=args.seed,
+        )
+        with service:
+            meta['server'] = service.server
+            meta['workers'] = args.workers
+            scenario_results = asyncio.run(run_all(args, service.base_url))
+
+    results = {'meta': meta, 'scenarios': scenario_results}
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'\nResultados guardados en {args.output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark del camino rápido de lectura frente a ProductSerializer.
+
+Compara, sobre las mismas filas:
+  - serializer: modelos completos + ProductSerializer(many=True)
+  - encoder:    values() + ProductReadEncoder (lo que usan list/retrieve)
+  - sparse:     values() + ProductReadEncoder con ?fields=id,sku,quantity
+
+y verifica que el JSON renderizado por `serializer` y `encoder` sea idéntico
+byte a byte. Usa una base SQLite temporal con un catálogo sintético.
+
+    python3 tests/benchmarks/serializacion.py --rows 1000 --repeat 50
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from harness import SERVICE_DIR
+
+
+def setup_django(args):
+    os.environ['DB_ENGINE'] = 'sqlite'
+    os.environ['DB_NAME'] = args.db or str(Path(tempfile.mkdtemp()) / 'serializacion.sqlite3')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'products_service.settings')
+    sys.path.insert(0, str(SERVICE_DIR))
+
+    import django
+    import logging
+    django.setup()
+    logging.disable(logging.WARNING)
+
+    from django.core.management import call_command
+    from products.models import Product
+    call_command('migrate', verbosity=0)
+    if Product.objects.count() < args.rows:
+        call_command('seed_products', count=args.rows, truncate=True, verbosity=0)
+
+
+def measure(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de serialización de lectura')
+    parser.add_argument('--rows', type=int, default=1000, help='Filas serializadas por iteración')
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--db', help='Archivo SQLite a reutilizar')
+    args = parser.parse_args()
+
+    setup_django(args)
+
+    from rest_framework.renderers import JSONRenderer
+    from products.models import Product
+    from products.serializers import ProductSerializer, get_read_encoder, parse_sparse_fields
+
+    renderer = JSONRenderer()
+    queryset = Product.objects.order_by('-created_at', '-id')
+    full = get_read_encoder(parse_sparse_fields(None))
+    sparse = get_read_encoder(parse_sparse_fields('id,sku,quantity'))
+
+    instances = list(queryset[:args.rows])
+    rows = list(queryset.values(*full.query_fields)[:args.rows])
+    sparse_rows = list(queryset.values(*sparse.query_fields)[:args.rows])
+
+    expected = renderer.render(ProductSerializer(instances, many=True).data)
+    actual = renderer.render([full.encode(row) for row in rows])
+    if expected != actual:
+        print('❌ FALLO: la salida del encoder no es idéntica a la de ProductSerializer')
+        return 1
+    print(f'✅ Salida idéntica byte a byte ({len(expected)} bytes, {args.rows} filas)\n')
+
+    cases = [
+        ('serializer (sólo serializar)', lambda: ProductSerializer(instances, many=True).data),
+        ('encoder (sólo serializar)', lambda: [full.encode(row) for row in rows]),
+        ('sparse (sólo serializar)', lambda: [sparse.encode(row) for row in sparse_rows]),
+        ('serializer (consulta + serializar + render)',
+         lambda: renderer.render(ProductSerializer(list(queryset[:args.rows]), many=True).data)),
+        ('encoder (consulta + serializar + render)',
+         lambda: renderer.render([full.encode(row) for row in queryset.values(*full.query_fields)[:args.rows]])),
+        ('sparse (consulta + serializar + render)',
+         lambda: renderer.render([sparse.encode(row) for row in queryset.values(*sparse.query_fields)[:args.rows]])),
+    ]
+
+    baseline = {}
+    for name, function in cases:
+        median = measure(function, args.repeat)
+        kind = name.split(' ', 1)[1]
+        baseline.setdefault(kind, median)
+        speedup = baseline[kind] / median if median else 0
+        print(f'{name:<46} {median:9.3f} ms  x{speedup:.1f}')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())